@@ -1,6 +1,7 @@
 from .file_formats.adt_chunks import *
 from .file_formats.wow_common_types import ChunkHeader
 from .enums.adt_enums import *
+from .io_utils.types import ByteCursor
 from io import BufferedReader
 
 __reload_order_index__ = 3
@@ -8,9 +9,10 @@ __reload_order_index__ = 3
 
 class ADTFile:
 	# def __init__(self, version, filepath=None):
-	def __init__(self, filepath=None, highres=True):
+	def __init__(self, filepath=None, highres=True, use_mmap=False):
 
 		self.filepath = filepath
+		self.use_mmap = use_mmap
 		self._mobile_chunks = []
 		self._offsets = []
 
@@ -34,8 +36,7 @@ class ADTFile:
 		self.mcnk = [[MCNK(self) for _ in range(16)] for _ in range(16)]
 
 		if self.filepath:
-			with open(self.filepath, 'rb') as f:
-				self.read(f)
+			self.read(ByteCursor.from_path(self.filepath, self.use_mmap))
 
 	def _register_mobile_chunk(self, chunk):
 		self._mobile_chunks.append(chunk)
@@ -59,7 +59,7 @@ def build_project(debug: bool, clean: bool):
     try:
         import Cython
     except ImportError:
-        raise Exception("\nCython is required to build this project.")
+        raise Exception("\nCython is required to build this project, see requirements-build.txt.")
 
     try:
         from pip import main as pipmain
@@ -77,7 +77,8 @@ def build_project(debug: bool, clean: bool):
         "archives/casc/",
         "archives/mpq/native/",
         "blp/BLP2PNG/",
-        "blp/PNG2BLP/"
+        "blp/PNG2BLP/",
+        "tools/vertex_cache/"
     )
 
     os.chdir(root_path)
@@ -122,7 +123,7 @@ if __name__ == "__main__":
                                                  "\nRequired dependencies are:"
                                                  "\n    All:"
                                                  "\n    * pip (https://pip.pypa.io/en/stable/installation/)"
-                                                 "\n    * Cython (pip install Cython)"
+                                                 "\n    * Cython and NumPy (pip install -r requirements-build.txt)"
                                                  "\n    * CMake (commandline CMake is required, see: https://cmake.org"
                                                  "\n    * C++ compiler (MSVC for Windows, GCC/Clang for Linux/Mac)"
                                                  "\n"
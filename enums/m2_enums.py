@@ -131,6 +131,22 @@ class M2CompBoneFlags(IntEnum):
     helmet_anim_scaled = 0x1000,                                # set blend_modificator to helmetAnimScalingRec.m_amount for this bone
 
 
+class M2PhysShapeTypes(IntEnum):
+    BOX = 0                                                     # BOXS
+    CAPSULE = 1                                                 # CAPS
+    SPHERE = 2                                                  # SPHS
+    POLYTOPE = 3                                                # PLYT
+
+
+class M2PhysJointTypes(IntEnum):
+    SPHERICAL = 0                                               # SPHJ
+    SHOULDER = 1                                                # SHOJ / SHJ2
+    WELD = 2                                                    # WELJ / WLJ2
+    REVOLUTE = 3                                                # REVJ / REV2
+    PRISMATIC = 4                                               # PRSJ / PRS2
+    DISTANCE = 5                                                # DSTJ
+
+
 class M2SkinMeshPartID(Enum):
     Skin = range(0, 1)
     Hair = range(1, 35)
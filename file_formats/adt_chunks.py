@@ -909,11 +909,11 @@ class MCVT(MOBILE_CHUNK):
 	def read(self, f):
 		self.set_address(f.tell())
 		self.header.read(f)
-		self.height = [float32.read(f) for _ in range(145)]
+		self.height = float32.read_many(f, 145)
 
 	def write(self, f):
 		self.header.write(f)
-		for value in self.height: float32.write(f, value)
+		float32.write_many(f, self.height)
 
 
 class MCLV(MOBILE_CHUNK):
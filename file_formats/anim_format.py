@@ -3,6 +3,7 @@ import struct
 from io import BytesIO
 
 from .wow_common_types import M2RawChunk
+from ..io_utils.types import ByteCursor
 
 
 class AFM2(M2RawChunk):
@@ -33,8 +34,8 @@ class AnimFile:
     def read(self, f):
 
         if self.old:
-            self.raw_data.write(f.read())
-            self.raw_data.seek(0)
+            # zero-copy when reading from a cursor, the payload stays a slice of the source buffer (or mapping)
+            self.raw_data = f.sub(len(f) - f.tell()) if f.__class__ is ByteCursor else ByteCursor.from_file(f)
 
         else:
 
@@ -62,7 +63,7 @@ class AnimFile:
                 local_chunk = getattr(self, magic_lower)
 
                 if not local_chunk:
-                    setattr(self, magic_lower, chunk().read(f))
+                    setattr(self, magic_lower, globals()[magic]().read(f))
                 else:
                     local_chunk.read(f)
 
@@ -71,7 +72,8 @@ class AnimFile:
     def write(self, f):
 
         if self.old:
-            f.write(bytes(self.raw_data.getbuffer()))
+            with self.raw_data.getbuffer() as payload:
+                f.write(payload)
 
         else:
 
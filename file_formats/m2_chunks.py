@@ -397,24 +397,29 @@ class MD21(M2Header, M2ContentChunk):
 
     def read(self, f):
         M2ContentChunk.read(self, f)
-        md20_raw = f.read(self.size)
 
-        with BytesIO(md20_raw) as f2:
-            magic = f2.read(4)
-            assert magic != 'MD20'
+        # offsets inside MD21 are relative to the embedded MD20 data
+        f2 = ByteCursor.of(f, self.size)
 
-            M2Header.read(self, f2)
+        magic = f2.read(4)
+        assert magic != 'MD20'
+
+        M2Header.read(self, f2)
 
         return self
 
     def write(self, f):
 
-        with BytesIO() as f2:
+        # offsets inside MD21 are relative to the embedded MD20 data
+        with ByteWriter() as f2:
             M2Header.write(self, f2)
-            md20_raw = f2.read()
-            self.size = len(md20_raw)
-            M2ContentChunk.write(self, f)
-            f.write(md20_raw)
+            self.size = len(f2)
+
+            f.write(b'MD21')
+            uint32.write(f, self.size)
+
+            with f2.getbuffer() as md20_raw:
+                f.write(md20_raw)
 
         return self
 
@@ -1,7 +1,9 @@
-from collections import OrderedDict
+import numpy as np
+
+from typing import Tuple
 
 from .wow_common_types import CAaBox, CRange, M2Array, M2Versions, fixed16, fixed_point, MemoryManager, \
-    M2VersionsManager, M2ExternalSequenceCache
+    M2VersionsManager, M2ExternalSequenceCache, M2ReadModeManager, M2TrackCache, M2ParseContext, as_numpy
 from ..io_utils.types import *
 from .skin_format import M2SkinProfile
 from ..enums.m2_enums import M2KeyBones, M2GlobalFlags, M2AttachmentTypes, M2EventTokens
@@ -33,17 +35,21 @@ class M2String:
         self.value = ""
 
     def read(self, f):
-        n_characters = uint32.read(f)
-        ofs_characters = uint32.read(f)
+        n_characters, ofs_characters = uint32.read(f, 2)
+
+        if f.__class__ is ByteCursor:
+            raw = f.buffer[ofs_characters:ofs_characters + n_characters]
+        else:
+            pos = f.tell()
+            f.seek(ofs_characters)
+            raw = f.read(n_characters)
+            f.seek(pos)
 
-        pos = f.tell()
-        f.seek(ofs_characters)
         try:
-            self.value = f.read(n_characters).decode('utf-8').rstrip('\0')
+            self.value = str(raw, 'utf-8').rstrip('\0')
         except UnicodeDecodeError as e:
             print("UnicodeDecodeError occurred, probably fuckported m2, using no name:", e)
             self.value = ""
-        f.seek(pos)
 
         return self
 
@@ -55,7 +61,7 @@ class M2String:
 
         pos = f.tell()
         f.seek(ofs)
-        self.value = f.write((self.value + '\0').encode('utf-8'))
+        f.write((self.value + '\0').encode('utf-8'))
         f.seek(pos)
         
         return self
@@ -118,7 +124,7 @@ class M2TrackBase:
     
     def __init__(self):
 
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.interpolation_type = 0
         self.global_sequence = -1
@@ -135,7 +141,10 @@ class M2TrackBase:
 
         if self.m2_version < M2Versions.WOTLK:
             self.interpolation_ranges.read(f)
-        self.timestamps.read(f, is_anim_data=False)
+            self.timestamps.read(f)
+        else:
+            # data of sequences stored in .anim files is only read when those are processed
+            self.timestamps.read(f, is_anim_data=self.global_sequence < 0)
 
         return self
 
@@ -158,27 +167,28 @@ class M2TrackBase:
 
     @staticmethod
     def size():
-        return 12 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 20
+        return 12 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 20
 
 
 class M2Track(M2TrackBase, metaclass=Template):
 
     def __init__(self, *args):
 
-        type_, self.creator = args
-        self.m2_version = M2VersionsManager().m2_version
+        self.value_type, self.creator = args
+        self.m2_version = M2ParseContext.current().m2_version
 
         super(M2Track, self).__init__()
         if self.creator is not M2Event:
-            self.values = M2Array(type_) if self.m2_version < M2Versions.WOTLK else M2Array(M2Array << type_)
+            self.values = M2Array(self.value_type) if self.m2_version < M2Versions.WOTLK \
+                else M2Array(M2Array << self.value_type)
 
     def read(self, f):
 
         super(M2Track, self).read(f)
         if self.creator is not M2Event:
-            self.values.read(f, is_anim_data=False)
+            self.values.read(f, is_anim_data=self.m2_version >= M2Versions.WOTLK and self.global_sequence < 0)
 
-        M2TrackCache().add_track(self, self.creator)
+        M2ParseContext.current().add_track(self, self.creator)
 
         return self
 
@@ -189,9 +199,33 @@ class M2Track(M2TrackBase, metaclass=Template):
 
         return self
 
+    def get_sequence(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Get timestamps and values of a sequence as NumPy arrays (WotLK+).
+            Arrays read in NumPy mode are returned as is, without copying.
+        """
+
+        return as_numpy(self.timestamps[index].values, uint32), \
+            as_numpy(self.values[index].values, self.value_type)
+
+    def set_sequence(self, index: int, timestamps, values):
+        """ Set timestamps and values of a sequence from array-likes (WotLK+), adding empty sequences if needed. """
+
+        while len(self.timestamps) <= index:
+            self.timestamps.new()
+            self.values.new()
+
+        timestamps_array, values_array = self.timestamps[index], self.values[index]
+        timestamps_array.values = as_numpy(timestamps, uint32)
+        values_array.values = as_numpy(values, self.value_type)
+
+        # outside of NumPy mode arrays hold lists of values, as if they were read from a file
+        if not M2ParseContext.current().numpy_arrays:
+            timestamps_array._as_list()
+            values_array._as_list()
+
     @staticmethod
     def size():
-        return 20 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 28
+        return 20 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 28
 
 class M2PartTrack:
     def __init__(self, type_):
@@ -277,7 +311,9 @@ class M2Box:
 
 
 class M2CompQuaternion:
-    
+    # layout of the raw file data, components are stored as (y, -x, z, w)
+    dtype = np.dtype(('<i2', 4))
+
     def __init__(self, quaternion=(-1, 0, 0, 0)):
         self.x = quaternion[1]
         self.y = quaternion[2]
@@ -311,9 +347,45 @@ class M2CompQuaternion:
             )
         )
 
-    def from_quaternion(self):
-        pass
-        # TODO: implement
+    def from_quaternion(self, quaternion):
+        """ Compress a (w, x, y, z) float quaternion, inverse of to_quaternion(). """
+        self.w, self.x, self.y, self.z = (self._compress_component(value) for value in quaternion)
+        return self
+
+    @staticmethod
+    def _compress_component(value):
+        value = round(min(max(value, -1.0), 1.0) * 32767)
+        return value + 32767 if value <= 0 else value - 32768
+
+    @staticmethod
+    def decompress(values) -> np.ndarray:
+        """ Batch version of to_quaternion().
+            Converts raw (N, 4) int16 data in file layout (see dtype) to (N, 4) float32 (w, x, y, z) quaternions.
+        """
+
+        raw = np.asarray(values, dtype=np.int32).reshape(-1, 4)
+
+        # file layout is (y, -x, z, w)
+        components = raw[:, [3, 1, 0, 2]]
+        components[:, 1] *= -1
+
+        return (np.where(components < 0, components + 32768, components - 32767) / 32767).astype(np.float32)
+
+    @staticmethod
+    def compress(quaternions) -> np.ndarray:
+        """ Batch version of from_quaternion().
+            Converts (N, 4) float (w, x, y, z) quaternions to raw (N, 4) int16 data in file layout (see dtype).
+        """
+
+        # components out of [-1, 1] would wrap around in the int16 range
+        values = np.clip(np.asarray(quaternions, dtype=np.float64).reshape(-1, 4), -1.0, 1.0)
+        values = np.rint(values * 32767).astype(np.int32)
+        values = np.where(values <= 0, values + 32767, values - 32768)
+
+        raw = values[:, [2, 1, 3, 0]]
+        raw[:, 1] *= -1
+
+        return raw.astype(np.int16)
 
 
 #############################################################
@@ -334,7 +406,7 @@ class M2SequenceFlags:
 class M2Sequence:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.id = 0                                             # Animation id in AnimationData.dbc
         self.variation_index = 0                                # Sub-animation id: Which number in a row of animations this one is.
@@ -418,7 +490,7 @@ class M2Sequence:
 
     @staticmethod
     def size():
-        return 32 if M2VersionsManager().m2_version <= M2Versions.TBC else 28
+        return 32 if M2ParseContext.current().m2_version <= M2Versions.TBC else 28
 
 
 #############################################################
@@ -428,7 +500,7 @@ class M2Sequence:
 class M2CompBone:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.key_bone_id = 0                                                                                      # Back-reference to the key bone lookup table. -1 if this is no key bone.
         self.flags = 0
@@ -511,9 +583,18 @@ class M2CompBone:
             return 0
         return sum(map(lambda x: x.get_depth(), self.children)) + len(self.children)
 
+    def get_rotation_sequence(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Get rotation keys of a sequence as timestamps and decompressed (N, 4) float32 (w, x, y, z) quaternions. """
+        timestamps, values = self.rotation.get_sequence(index)
+        return timestamps, M2CompQuaternion.decompress(values)
+
+    def set_rotation_sequence(self, index: int, timestamps, quaternions):
+        """ Set rotation keys of a sequence from timestamps and (N, 4) float (w, x, y, z) quaternions. """
+        self.rotation.set_sequence(index, timestamps, M2CompQuaternion.compress(quaternions))
+
     @staticmethod
     def size():
-        return 88 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 110
+        return 88 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 110
 
 
 #############################################################
@@ -526,6 +607,14 @@ class M2Vertex:
     __slots__ = ('pos', 'bone_weights', 'bone_indices',
                  'normal', 'tex_coords', 'tex_coords2')
 
+    # record layout used by M2Array in NumPy mode
+    dtype = np.dtype([('pos', '<f4', 3),
+                      ('bone_weights', 'u1', 4),
+                      ('bone_indices', 'u1', 4),
+                      ('normal', '<f4', 3),
+                      ('tex_coords', '<f4', 2),
+                      ('tex_coords2', '<f4', 2)])
+
     def __init__(self):
         self.pos = (0.0, 0.0, 0.0)
         self.bone_weights = (0, 0, 0, 0)
@@ -599,7 +688,7 @@ class M2Color:
 
     @staticmethod
     def size():
-        return 40 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 56
+        return 40 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 56
 
 
 class M2Texture:
@@ -658,13 +747,13 @@ class M2TextureTransform:
 
     @staticmethod
     def size():
-        return 60 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 84
+        return 60 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 84
 
 
 class M2Ribbon:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.ribbon_id = -1                                     # Always (as I have seen): -1.
         self.bone_index = 0                                     # A bone to attach to.
@@ -737,13 +826,13 @@ class M2Ribbon:
 
     @staticmethod
     def size():
-        return 176 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 220
+        return 176 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 220
 
 
 class M2Particle:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.particle_id = 0                                    # Always (as I have seen): -1.
         self.flags = 0                                          # See Below
@@ -1023,7 +1112,7 @@ class M2Particle:
     
     @staticmethod
     def size():
-        return 476 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 492    
+        return 476 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 492    
 
 
 #############################################################
@@ -1076,7 +1165,7 @@ class M2Light:
 
     @staticmethod
     def size():
-        return 156 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 212
+        return 156 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 212
 
 
 ###### Cameras ######
@@ -1084,7 +1173,7 @@ class M2Light:
 class M2Camera:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.type = 0                                                     # 0: portrait, 1: characterinfo; -1: else (flyby etc.); referenced backwards in the lookup table.
         if self.m2_version < M2Versions.CATA:
@@ -1134,8 +1223,8 @@ class M2Camera:
 
     @staticmethod
     def size():
-        tracks = 60 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 84
-        return tracks + 40 if M2VersionsManager().m2_version < M2Versions.CATA else tracks + 64
+        tracks = 60 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 84
+        return tracks + 40 if M2ParseContext.current().m2_version < M2Versions.CATA else tracks + 64
 
 
 ###### Attachments ######
@@ -1169,7 +1258,7 @@ class M2Attachment:
 
     @staticmethod
     def size():
-        return 40 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 48
+        return 40 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 48
 
 
 ###### Events ######
@@ -1203,7 +1292,7 @@ class M2Event:
 
     @staticmethod
     def size():
-        return 36 if M2VersionsManager().m2_version >= M2Versions.WOTLK else 44
+        return 36 if M2ParseContext.current().m2_version >= M2Versions.WOTLK else 44
 
 
 #############################################################
@@ -1213,7 +1302,7 @@ class M2Event:
 class M2Header:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self._size = 324 if self.m2_version <= M2Versions.TBC else 304
 
@@ -1280,7 +1369,7 @@ class M2Header:
     def read(self, f):
         self.version = uint32.read(f)
 
-        M2VersionsManager().set_m2_version(self.version)
+        M2ParseContext.current().m2_version = self.version
 
         self.name.read(f)
         self.global_flags = uint32.read(f)
@@ -1291,7 +1380,7 @@ class M2Header:
         if self.m2_version <= M2Versions.TBC:
             self.playable_animation_lookup.read(f)
 
-        M2ExternalSequenceCache(self)
+        M2ParseContext.current().set_external_sequences(self.sequences)
 
         self.bones.read(f)
 
@@ -1437,30 +1526,3 @@ class M2Header:
             bone.index = i
             bone.build_relations(self.bones)
             bone.load_bone_name(bone_type_dict)
-
-
-#############################################################
-######               M2 Parsing Helpers                ######
-#############################################################
-
-@singleton
-class M2TrackCache:
-    def __init__(self):
-        self.m2_tracks = OrderedDict()
-
-    def add_track(self, track, creator):
-        self.m2_tracks.setdefault(creator, []).append(track)
-
-    def purge(self):
-        self.m2_tracks.clear()
-
-
-
-
-
-        
-        
-
-        
-
-
@@ -1,176 +1,317 @@
-from io import BytesIO
-from .wow_common_types import ChunkHeader
-from .m2_format import *
-from .m2_chunks import AFID, BFID
+import struct
+import numpy as np
 
+from collections import OrderedDict
+from typing import Optional
+from .wow_common_types import M2ContentChunk, M2RawChunk
+from ..io_utils.types import ByteCursor, int16
 
-class PHYS:
 
-    def __init__(self, size=4):
-        self.header = ChunkHeader(magic='SYHP')
-        self.header.size = size
+#############################################################
+######                  M2 Physics                     ######
+#############################################################
+
+# Record layouts follow the .phys documentation on wowdev.wiki, fields of unknown meaning are named unk_<offset>.
+# Array chunks are decoded with a single np.frombuffer() call, arrays read from a ByteCursor share its memory
+# and are read-only: copy them before editing.
+
+vec3 = ('<f4', 3)
+mat3x4 = ('<f4', (3, 4))
+
+
+class PHYS(M2ContentChunk):
+
+    def __init__(self):
+        super().__init__()
         self.version = 0
 
     def read(self, f):
-        self.version = int16.read(f)
+        super().read(f)
+        with ByteCursor.of(f, self.size) as f2:
+            self.version = int16.read(f2)
+
+        return self
 
     def write(self, f):
-        self.header.size = 4
-        self.header.write(f)
+        self.size = 2
+        super().write(f)
         int16.write(f, self.version)
 
+        return self
+
 
-class PHYV:
+class PhysArrayChunk(M2ContentChunk):  # for inheriting only
+    """ Chunk holding an array of fixed size records, stored as a NumPy structured array in content. """
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='VYHP')
-        self.header.size = size
+    dtype: np.dtype = None
+
+    def __init__(self):
+        super().__init__()
+        self.content = np.zeros(0, dtype=self.dtype)
 
     def read(self, f):
-        pass
-    def write(self, f):
-        pass
+        super().read(f)
 
-class PHYT:
+        # a partial record means the record layout does not match the file
+        if self.size % self.dtype.itemsize:
+            raise ValueError('{} chunk of {} bytes is not a whole number of {} byte records.'
+                             .format(self.magic, self.size, self.dtype.itemsize))
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='TYHP')
-        self.header.size = size
+        raw_data = f.view(self.size) if f.__class__ is ByteCursor else f.read(self.size)
+        self.content = np.frombuffer(raw_data, dtype=self.dtype)
+
+        return self
 
-    def read(self, f):
-        pass
     def write(self, f):
-        pass
+        content = np.ascontiguousarray(self.content, dtype=self.dtype)
 
-class BODY:
+        self.size = content.nbytes
+        super().write(f)
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='YDOB')
-        self.header.size = size
+        f.write(content.tobytes())
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
+        return self
 
-class BDY2(BODY):
-    pass
 
-class BDY3(BODY):
-    pass
+class PHYV(PhysArrayChunk):
+    dtype = np.dtype([('values', '<f4', 6)])
 
-class BDY4(BODY):
-    pass
 
+class PHYT(PhysArrayChunk):
+    dtype = np.dtype([('phyt', '<u4')])
 
-class SHAP:
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='PAHS')
-        self.header.size = size
+# bodies
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
+class BODY(PhysArrayChunk):
+    dtype = np.dtype([('type', '<u2'),                          # 0: root / static, 1: dynamic
+                      ('bone_index', '<u2'),
+                      ('position', vec3),
+                      ('shapes_index', '<u2'),
+                      ('_pad', '<u2'),
+                      ('shapes_count', '<i4')])
 
-class SHP2(SHAP):
-    pass
 
+class BDY2(PhysArrayChunk):
+    dtype = np.dtype(BODY.dtype.descr + [('unk_18', '<f4'),
+                                         ('unk_1c', '<f4'),
+                                         ('unk_20', '<f4')])
 
-#TODO: create shape types enum
 
+class BDY3(PhysArrayChunk):
+    dtype = np.dtype(BDY2.dtype.descr + [('drag', '<f4'),
+                                         ('unk_28', '<f4'),
+                                         ('unk_2c', '<f4')])
 
-class PLYT:
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='TYLP')
-        self.header.size = size
+class BDY4(PhysArrayChunk):
+    dtype = np.dtype(BDY3.dtype.descr + [('unk_30', '<u4')])
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
 
-class JOIN:
+# shapes
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='NIOJ')
-        self.header.size = size
+class SHAP(PhysArrayChunk):
+    dtype = np.dtype([('shape_type', '<u2'),                    # see M2PhysShapeTypes
+                      ('shapes_index', '<u2'),                  # index into the chunk of the shape type
+                      ('unk_04', '<u4'),
+                      ('friction', '<f4'),
+                      ('restitution', '<f4'),
+                      ('density', '<f4')])
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
 
-#TODO: create joint types enum
+class SHP2(PhysArrayChunk):
+    dtype = np.dtype(SHAP.dtype.descr + [('unk_14', '<u4'),
+                                         ('unk_18', '<f4'),
+                                         ('unk_1c', '<u2'),
+                                         ('_pad', '<u2')])
 
 
-class WELJ:
+class BOXS(PhysArrayChunk):
+    dtype = np.dtype([('a', mat3x4),
+                      ('c', vec3)])
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='JLEW')
-        self.header.size = size
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
+class CAPS(PhysArrayChunk):
+    dtype = np.dtype([('local_position_1', vec3),
+                      ('local_position_2', vec3),
+                      ('radius', '<f4')])
 
-class WLJ2(WELJ):
-    pass
 
-class SPHJ:
+class SPHS(PhysArrayChunk):
+    dtype = np.dtype([('local_position', vec3),
+                      ('radius', '<f4')])
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='JHPS')
-        self.header.size = size
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
+class PLYT(M2RawChunk):
+    """ Polytope shapes: headers followed by variable size vertex, plane and index data, kept as raw bytes. """
 
-class SHOJ:
+    @property
+    def count(self) -> int:
+        with self.raw_data.getbuffer() as payload:
+            return struct.unpack_from('<I', payload)[0] if len(payload) >= 4 else 0
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='JHOS')
-        self.header.size = size
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
+# joints
 
-class PRSJ:
+class JOIN(PhysArrayChunk):
+    dtype = np.dtype([('body_a_index', '<u4'),
+                      ('body_b_index', '<u4'),
+                      ('unk_08', '<u1', 4),
+                      ('joint_type', '<u2'),                    # see M2PhysJointTypes
+                      ('joint_id', '<u2')])                     # index into the chunk of the joint type
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='JSRP')
-        self.header.size = size
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
+class WELJ(PhysArrayChunk):
+    dtype = np.dtype([('frame_a', mat3x4),
+                      ('frame_b', mat3x4),
+                      ('angular_frequency', '<f4'),
+                      ('angular_damping', '<f4'),
+                      ('linear_frequency', '<f4'),
+                      ('linear_damping', '<f4')])
 
-class REVJ:
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='JVER')
-        self.header.size = size
+class WLJ2(PhysArrayChunk):
+    dtype = np.dtype(WELJ.dtype.descr + [('unk_70', '<f4')])
+
+
+class SPHJ(PhysArrayChunk):
+    dtype = np.dtype([('anchor_a', vec3),
+                      ('anchor_b', vec3),
+                      ('friction_torque', '<f4')])
+
+
+class SHOJ(PhysArrayChunk):
+    dtype = np.dtype([('frame_a', mat3x4),
+                      ('frame_b', mat3x4),
+                      ('lower_twist_angle', '<f4'),
+                      ('upper_twist_angle', '<f4'),
+                      ('cone_angle', '<f4')])
+
+
+class SHJ2(PhysArrayChunk):
+    dtype = np.dtype(SHOJ.dtype.descr + [('max_motor_torque', '<f4'),
+                                         ('motor_mode', '<u4')])
 
-    def read(self, f):
-        pass
-    def write(self, f):
-        pass
 
-class DSTJ:
+class PRSJ(PhysArrayChunk):
+    dtype = np.dtype([('frame_a', mat3x4),
+                      ('frame_b', mat3x4),
+                      ('lower_limit', '<f4'),
+                      ('upper_limit', '<f4'),
+                      ('unk_68', '<f4'),
+                      ('max_motor_force', '<f4'),
+                      ('unk_70', '<f4'),
+                      ('motor_mode', '<u4')])
 
-    def __init__(self, size=0):
-        self.header = ChunkHeader(magic='JTSD')
-        self.header.size = size
+
+class PRS2(PhysArrayChunk):
+    dtype = np.dtype(PRSJ.dtype.descr + [('motor_frequency', '<f4'),
+                                         ('motor_damping', '<f4')])
+
+
+class REVJ(PhysArrayChunk):
+    dtype = np.dtype([('frame_a', mat3x4),
+                      ('frame_b', mat3x4),
+                      ('lower_angle', '<f4'),
+                      ('upper_angle', '<f4'),
+                      ('max_motor_torque', '<f4'),
+                      ('motor_mode', '<u4')])
+
+
+class REV2(PhysArrayChunk):
+    dtype = np.dtype(REVJ.dtype.descr + [('motor_frequency', '<f4'),
+                                         ('motor_damping', '<f4')])
+
+
+class DSTJ(PhysArrayChunk):
+    dtype = np.dtype([('local_anchor_a', vec3),
+                      ('local_anchor_b', vec3),
+                      ('distance_factor', '<f4')])
+
+
+class PhysUnknownChunk(M2RawChunk):
+    """ Chunk not known to this module, kept as raw bytes to be written back unchanged. """
+
+    def __init__(self, magic: str = ''):
+        super().__init__()
+        self.magic = magic
+
+
+class PhysFile:
+    """ .phys file of an M2 model: rigid bodies of bones, their collision shapes and the joints between them.
+
+    Chunks are kept in file order in chunks, keyed by magic. Bodies, shapes and joints are exposed as
+    structured arrays of the newest chunk version present.
+    """
+
+    body_chunks = ('BDY4', 'BDY3', 'BDY2', 'BODY')
+    shape_chunks = ('SHP2', 'SHAP')
+
+    def __init__(self):
+        self.chunks = OrderedDict(PHYS=PHYS())
+
+    @property
+    def version(self) -> int:
+        return self.chunks['PHYS'].version
+
+    def _content(self, magics) -> np.ndarray:
+        for magic in magics:
+            chunk = self.chunks.get(magic)
+            if chunk is not None:
+                return chunk.content
+
+        return np.zeros(0, dtype=globals()[magics[-1]].dtype)
+
+    @property
+    def bodies(self) -> np.ndarray:
+        return self._content(self.body_chunks)
+
+    @property
+    def shapes(self) -> np.ndarray:
+        return self._content(self.shape_chunks)
+
+    @property
+    def joints(self) -> np.ndarray:
+        return self._content(('JOIN',))
+
+    def get_chunk(self, magic: str) -> Optional[M2ContentChunk]:
+        return self.chunks.get(magic)
 
     def read(self, f):
-        pass
+        self.chunks = OrderedDict()
+
+        while True:
+
+            try:
+                magic = f.read(4).decode('utf-8')
+
+            except EOFError:
+                break
+
+            except struct.error:
+                break
+
+            except UnicodeDecodeError:
+                print('\nAttempted reading non-chunked data.')
+                break
+
+            # end of file or trailing alignment padding
+            if not magic.strip('\0'):
+                break
+
+            chunk = globals().get(magic)
+
+            if isinstance(chunk, type) and issubclass(chunk, M2ContentChunk) and chunk.__name__ == magic:
+                self.chunks[magic] = chunk().read(f)
+            else:
+                print("\nEncountered unknown chunk \"{}\"".format(magic))
+                self.chunks[magic] = PhysUnknownChunk(magic).read(f)
+
+        return self
+
     def write(self, f):
-        pass
\ No newline at end of file
+
+        for chunk in self.chunks.values():
+            chunk.write(f)
+
+        return self
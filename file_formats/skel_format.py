@@ -1,9 +1,13 @@
 import os
 import sys
+import copy
 import struct
+import threading
 
 from io import BytesIO
-from .wow_common_types import M2ContentChunk
+from functools import partial, lru_cache
+from collections import OrderedDict, deque
+from .wow_common_types import M2ContentChunk, M2ParseContext
 from .m2_format import *
 from .m2_chunks import AFID, BFID
 
@@ -19,9 +23,7 @@ class SKL1(M2ContentChunk):
 
     def read(self, f):
         super().read(f)
-        raw_data = f.read(self.size)
-
-        with BytesIO(raw_data) as f2:
+        with ByteCursor.of(f, self.size) as f2:
             self.unk1 = uint32.read(f2)
             self.name.read(f2)
             self.unk2 = [uint8.read(f2) for _ in range(4)]
@@ -57,9 +59,7 @@ class SKA1(M2ContentChunk):
 
     def read(self, f):
         super().read(f)
-        raw_data = f.read(self.size)
-
-        with BytesIO(raw_data) as f2:
+        with ByteCursor.of(f, self.size) as f2:
             self.attachments.read(f2)
             self.attachment_lookup_table.read(f2)
 
@@ -91,9 +91,7 @@ class SKB1(M2ContentChunk):
 
     def read(self, f):
         super().read(f)
-        raw_data = f.read(self.size)
-
-        with BytesIO(raw_data) as f2:
+        with ByteCursor.of(f, self.size) as f2:
             self.bones.read(f2)
             self.key_bone_lookup.read(f2)
 
@@ -126,9 +124,7 @@ class SKS1(M2ContentChunk):
 
     def read(self, f):
         super().read(f)
-        raw_data = f.read(self.size)
-
-        with BytesIO(raw_data) as f2:
+        with ByteCursor.of(f, self.size) as f2:
             self.global_loops.read(f2)
             self.sequences.read(f2)
             self.sequence_lookups.read(f2)
@@ -255,4 +251,193 @@ class SkelFile:
         return self
 
 
+class _CachedSkel:
+    """ A parsed SkelFile kept by SkelFileCache, together with the tracks it contains. """
+
+    # values shared between views instead of being copied: immutable values, read-only data and type descriptors
+    _shared_types = (int, float, str, bytes, tuple, type(None), memoryview, ByteCursor, GenericType, type, partial)
+
+    def __init__(self, skel: SkelFile, context: M2ParseContext):
+        self.skel = skel
+        self.tracks = [(track, creator) for creator, tracks in context.m2_tracks.items() for track in tracks]
+
+        # objects holding tracks, these are copied right away so that the tracks can be registered
+        self.spine = set()
+        self._find_tracks(skel, set())
+
+    def _find_tracks(self, obj, visited) -> bool:
+        if id(obj) in visited:
+            return id(obj) in self.spine
+
+        visited.add(id(obj))
+
+        if isinstance(obj, M2Track):
+            has_tracks = True
+        elif isinstance(obj, self._shared_types) or isinstance(obj, np.ndarray):
+            has_tracks = False
+        elif isinstance(obj, (list, deque)):
+            has_tracks = any([self._find_tracks(item, visited) for item in obj])
+        elif isinstance(obj, dict):
+            has_tracks = any([self._find_tracks(value, visited) for value in obj.values()])
+        else:
+            has_tracks = any([self._find_tracks(value, visited) for value in self._attributes(obj)])
+
+        if has_tracks:
+            self.spine.add(id(obj))
+
+        return has_tracks
+
+    @staticmethod
+    def _attributes(obj):
+        yield from getattr(obj, '__dict__', {}).values()
+
+        for name in getattr(type(obj), '__slots__', ()):
+            yield getattr(obj, name, None)
+
+    def _copy(self, obj, copies):
+        if isinstance(obj, self._shared_types):
+            return obj
+
+        new_obj = copies.get(id(obj))
+        if new_obj is not None:
+            return new_obj
+
+        if isinstance(obj, np.ndarray):
+            new_obj = copies[id(obj)] = obj.copy() if obj.flags.writeable else obj
+
+        elif isinstance(obj, M2Array):
+            new_obj = copies[id(obj)] = object.__new__(type(obj))
+            new_obj.__dict__.update(obj.__dict__)
+
+            if id(obj) in self.spine:
+                new_obj.values = self._copy_values(obj, copies)
+            else:
+                # copy-on-write: values are copied from the cached array on first access
+                new_obj.__dict__.pop('values', None)
+                new_obj.n_elements = len(obj.values)
+                new_obj._lazy_source = partial(self._copy_values, obj, copies)
+
+        elif isinstance(obj, (list, deque)):
+            new_obj = copies[id(obj)] = type(obj)()
+            new_obj.extend([self._copy(item, copies) for item in obj])
+
+        elif isinstance(obj, dict):
+            new_obj = copies[id(obj)] = type(obj)()
+            new_obj.update({key: self._copy(value, copies) for key, value in obj.items()})
+
+        elif self._has_plain_dict(type(obj)):
+            new_obj = self._copy_object(obj, copies)
+
+        else:
+            new_obj = copies[id(obj)] = copy.copy(obj)
+
+            for name, value in getattr(obj, '__dict__', {}).items():
+                setattr(new_obj, name, self._copy(value, copies))
+
+            for name in getattr(type(obj), '__slots__', ()):
+                if hasattr(obj, name):
+                    setattr(new_obj, name, self._copy(getattr(obj, name), copies))
+
+        return new_obj
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _has_plain_dict(cls) -> bool:
+        return bool(cls.__dictoffset__) and not hasattr(cls, '__slots__')
+
+    def _copy_object(self, obj, copies):
+        # cheaper than copy.copy() for the many small objects of a skel, e.g. the keys of rotation tracks
+        new_obj = copies[id(obj)] = object.__new__(type(obj))
+
+        attributes = new_obj.__dict__
+        attributes.update(obj.__dict__)
+
+        for name, value in attributes.items():
+            if not isinstance(value, self._shared_types):
+                attributes[name] = self._copy(value, copies)
+
+        return new_obj
+
+    def _copy_values(self, array: M2Array, copies):
+        values = array.values
+
+        if isinstance(values, np.ndarray):
+            return self._copy(values, copies)
+
+        # elements of generic types are immutable numbers, strings and tuples
+        if type(array.type) is GenericType:
+            return list(values)
+
+        # elements read from the file belong to their array, so they are copied without looking them up first
+        if isinstance(array.type, type) and not issubclass(array.type, M2Array) and self._has_plain_dict(array.type):
+            return [self._copy_object(item, copies) for item in values]
+
+        return [self._copy(item, copies) for item in values]
+
+    def view(self) -> SkelFile:
+        """ Get a copy-on-write view of the skel. Objects holding tracks are copied right away, other arrays copy
+            their values from the cached skel on first access. Copied tracks are registered in the active parse context.
+        """
+
+        copies = {}
+        skel = self._copy(self.skel, copies)
+
+        context = M2ParseContext.current()
+        for track, creator in self.tracks:
+            context.add_track(copies[id(track)], creator)
+
+        return skel
+
+
+@singleton
+class SkelFileCache:
+    """ Process-wide LRU cache of parsed .skel files, keyed by file data id or path.
+
+    Returns copy-on-write views of the cached skels (see _CachedSkel.view()), so models can edit them and load .anim
+    data into them freely. Only immutable values, read-only NumPy arrays and buffers are shared between models.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, path: str, file_id: int = 0, use_mmap: bool = False) -> SkelFile:
+        """ Get a view of a parsed .skel file, parsing it with the options of the active context on a cache miss. """
+
+        context = M2ParseContext.current()
+
+        # paths are keyed with their modification time, so changed files are parsed again
+        key = file_id if file_id else (os.path.normcase(os.path.abspath(path)), os.path.getmtime(path))
+        key = (key, context.m2_version, context.numpy_arrays, tuple(context.external_sequences))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            # cached skels are parsed eagerly in their own context, so views never decode shared arrays
+            skel_context = M2ParseContext(context.m2_version, context.numpy_arrays)
+            skel_context.external_sequences = dict(context.external_sequences)
+
+            with skel_context.activate():
+                skel = SkelFile(path).read(ByteCursor.from_path(path, use_mmap))
+
+            entry = _CachedSkel(skel, skel_context)
+
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
 
+        return entry.view()
@@ -12,7 +12,7 @@ __reload_order_index__ = 2
 class M2SkinSubmesh:
     
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self.skin_section_id = 0                                # Mesh part ID, see below.
         self.level = 0                                          # (level << 16) is added (|ed) to startTriangle and alike to avoid having to increase those fields to uint32s.
@@ -51,10 +51,10 @@ class M2SkinSubmesh:
         
     def write(self, f):
         uint16.write(f, self.skin_section_id)
-        uint16.write(f, self.level)
+        uint16.write(f, self.index_start >> 16)                   # level, the high bits of index_start
         uint16.write(f, self.vertex_start)
         uint16.write(f, self.vertex_count)
-        uint16.write(f, self.index_start)
+        uint16.write(f, self.index_start & 0xFFFF)
         uint16.write(f, self.index_count)
         uint16.write(f, self.bone_count)
         uint16.write(f, self.bone_combo_index)
@@ -156,10 +156,14 @@ class M2ShadowBatch:
         return self
 
 
+# bone counts known to be used for bone_count_max by the client
+BONE_COUNT_MAX_VALUES = (21, 53, 64, 256)
+
+
 class M2SkinProfile:
 
     def __init__(self):
-        self.m2_version = M2VersionsManager().m2_version
+        self.m2_version = M2ParseContext.current().m2_version
 
         self._size = 48 if self.m2_version >= M2Versions.WOTLK else 44
 
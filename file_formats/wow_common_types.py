@@ -1,7 +1,11 @@
 import struct
+import numpy as np
 
 from ..io_utils.types import *
 from io import SEEK_CUR, BytesIO
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from collections.abc import Iterable
 from typing import Optional, Protocol
 
@@ -13,23 +17,6 @@ class Self:
 
 ###### M2 file versions ######
 
-@singleton
-class M2VersionsManager:
-
-    def __init__(self):
-        self.m2_version = M2Versions.WOTLK
-
-    def set_m2_version(self, version: int):
-        self.m2_version = version
-
-
-@singleton
-class M2ExternalSequenceCache:
-    def __init__(self, m2_header):
-        self.external_sequences = {i: sequence for i, sequence in enumerate(m2_header.sequences)
-                                   if not sequence.flags & 0x130}
-
-
 class M2Versions:
     CLASSIC = 256
     TBC = 263
@@ -57,6 +44,120 @@ class M2Versions:
         return v_dict[exp_num]
 
 
+###### M2 parse context ######
+
+class M2ParseContext:
+    """ Per-model parsing state: M2 version, read options, registered tracks and external sequences.
+
+    Every M2File owns a context and activates it while reading, writing or building the model.
+    The active context is stored in a context variable, so models can be processed concurrently in threads.
+    """
+
+    def __init__(self, m2_version: int = M2Versions.WOTLK, numpy_arrays: bool = False, lazy_arrays: bool = False):
+        self.m2_version = m2_version
+        self.numpy_arrays = numpy_arrays
+        self.lazy_arrays = lazy_arrays
+        self.m2_tracks = OrderedDict()
+        self.external_sequences = {}
+
+    @staticmethod
+    def current() -> 'M2ParseContext':
+        """ Get the active context. Code running outside of activate() gets a default context of its own thread. """
+
+        context = _m2_parse_context.get(None)
+
+        if context is None:
+            context = M2ParseContext()
+            _m2_parse_context.set(context)
+
+        return context
+
+    @contextmanager
+    def activate(self):
+        token = _m2_parse_context.set(self)
+
+        try:
+            yield self
+        finally:
+            _m2_parse_context.reset(token)
+
+    def reset(self):
+        """ Forget tracks and external sequences registered by a previous read. """
+
+        self.m2_tracks = OrderedDict()
+        self.external_sequences = {}
+
+    def add_track(self, track, creator):
+        self.m2_tracks.setdefault(creator, []).append(track)
+
+    def set_external_sequences(self, sequences):
+        self.external_sequences = {i: sequence for i, sequence in enumerate(sequences)
+                                   if not sequence.flags & 0x130}
+
+
+# unset until a context is activated, or created by M2ParseContext.current() for code outside of an M2File
+_m2_parse_context = ContextVar('m2_parse_context')
+
+
+# The managers below are kept for compatibility, they operate on the active parse context.
+
+@singleton
+class M2VersionsManager:
+
+    @property
+    def m2_version(self):
+        return M2ParseContext.current().m2_version
+
+    @m2_version.setter
+    def m2_version(self, version: int):
+        M2ParseContext.current().m2_version = version
+
+    def set_m2_version(self, version: int):
+        M2ParseContext.current().m2_version = version
+
+
+@singleton
+class M2ReadModeManager:
+
+    @property
+    def numpy_arrays(self):
+        return M2ParseContext.current().numpy_arrays
+
+    @property
+    def lazy_arrays(self):
+        return M2ParseContext.current().lazy_arrays
+
+    def set_numpy_arrays(self, enabled: bool):
+        M2ParseContext.current().numpy_arrays = enabled
+
+    def set_lazy_arrays(self, enabled: bool):
+        M2ParseContext.current().lazy_arrays = enabled
+
+
+@singleton
+class M2TrackCache:
+
+    @property
+    def m2_tracks(self):
+        return M2ParseContext.current().m2_tracks
+
+    def add_track(self, track, creator):
+        M2ParseContext.current().add_track(track, creator)
+
+    def purge(self):
+        M2ParseContext.current().m2_tracks = OrderedDict()
+
+
+class M2ExternalSequenceCache:
+    def __init__(self, m2_header=None):
+        if m2_header is not None:
+            M2ParseContext.current().set_external_sequences(m2_header.sequences)
+
+    @property
+    def external_sequences(self):
+        return M2ParseContext.current().external_sequences
+
+
 #############################################################
 ######                WoW Common Types                 ######
 #############################################################
@@ -212,7 +313,11 @@ class MemoryManager:
         
     @staticmethod
     def mem_reserve(f, n_bytes):
-        if n_bytes:
+        if n_bytes and f.__class__ is ByteWriter:
+            f.pos = MemoryManager.align_position(f.pos)
+            f.zero_fill(f.pos, n_bytes)
+
+        elif n_bytes:
             pos = f.tell()
             aligned_pos = MemoryManager.align_position(pos)
             f.seek(aligned_pos)
@@ -221,6 +326,13 @@ class MemoryManager:
 
     @staticmethod
     def ofs_request(f):
+        if f.__class__ is ByteWriter:
+            ofs = f.end
+            aligned_ofs = MemoryManager.align_position(ofs)
+            if aligned_ofs != ofs:
+                f.zero_fill(aligned_ofs, 1)
+            return aligned_ofs
+
         pos = f.tell()
         ofs = f.seek(0, 2)
         aligned_ofs = MemoryManager.align_position(ofs)
@@ -231,7 +343,65 @@ class MemoryManager:
         return aligned_ofs
 
 
+_numpy_dtypes = {}
+
+
+def get_numpy_dtype(type_) -> Optional[np.dtype]:
+    """ Get NumPy dtype matching the binary layout of an element type, or None if it is not fixed-layout. """
+
+    if type(type_) is GenericType:
+        dtype = _numpy_dtypes.get(type_.format)
+
+        if dtype is None and len(set(type_.format)) == 1:
+            base = np.dtype('S1') if type_.format[0] == 's' else np.dtype('<' + type_.format[0])
+            dtype = base if len(type_.format) == 1 else np.dtype((base, len(type_.format)))
+            _numpy_dtypes[type_.format] = dtype
+
+        return dtype
+
+    # fixed-length arrays of plain values, e.g. Array << (uint8, 4)
+    if type(type_) is partial and type_.func is Array:
+        base = get_numpy_dtype(type_.args[0])
+        return None if base is None or base.shape else np.dtype((base, type_.args[1]))
+
+    return getattr(type_, 'dtype', None)
+
+
+def as_numpy(values, type_) -> np.ndarray:
+    """ Convert values of an element type into a NumPy array matching its binary layout (see get_numpy_dtype). """
+
+    dtype = get_numpy_dtype(type_)
+
+    if dtype is None:
+        raise TypeError('Type {} does not have a fixed binary layout.'.format(type_))
+
+    if type(type_) is GenericType or isinstance(values, np.ndarray):
+        if dtype.names:
+            return np.ascontiguousarray(values).view(dtype)
+
+        array = np.asarray(values)
+
+        # integers out of the range of the element type would wrap around silently in the cast
+        if dtype.base.kind in 'iu' and array.dtype.kind in 'iu' and array.size and array.dtype != dtype.base:
+            limits = np.iinfo(dtype.base)
+
+            if array.min() < limits.min or array.max() > limits.max:
+                raise ValueError('Values in range [{}, {}] do not fit into {} elements.'
+                                 .format(array.min(), array.max(), dtype.base))
+
+        return np.ascontiguousarray(array, dtype=dtype.base).reshape((-1,) + dtype.shape)
+
+    # serialize the objects with their own write method, then reinterpret the bytes
+    f = ByteWriter(len(values) * dtype.itemsize)
+    for value in values:
+        value.write(f)
+
+    return np.frombuffer(f.getvalue(), dtype=dtype)
+
+
 class M2Array(metaclass=Template):
+    _lazy_source = None
+
     def __init__(self, type_):
         self.n_elements = 0
         self.ofs_elements = 0
@@ -243,37 +413,81 @@ class M2Array(metaclass=Template):
     def read(self, f, ignore_header=False, ignore_data=False, is_anim_data=False):
 
         if not ignore_header:
-            self.n_elements = uint32.read(f)
-            self.ofs_elements = uint32.read(f)
+            self.n_elements, self.ofs_elements = uint32.read(f, 2)
 
         if ignore_data:
             return self
 
+        context = M2ParseContext.current()
+
+        # lazy mode: keep the buffer and the parse context around, values are decoded on first access
+        if context.lazy_arrays and not is_anim_data and f.__class__ is ByteCursor:
+            self.__dict__.pop('values', None)
+            self._lazy_source = (f, context)
+
+            return self
+
+        self._read_values(f, is_anim_data)
+
+        return self
+
+    def _read_values(self, f, is_anim_data=False):
         pos = f.tell()
 
         f.seek(self.ofs_elements)
 
+        try:
+            self._decode_values(f, is_anim_data)
+        finally:
+            f.seek(pos)
+
+    def _decode_values(self, f, is_anim_data):
         if not is_anim_data:
 
             type_t = type(self.type)
+            dtype = get_numpy_dtype(self.type) if M2ParseContext.current().numpy_arrays else None
+
+            if dtype is not None:
+                self.values = self._read_numpy(f, dtype)
 
-            if type_t is GenericType:
-                self.values = [self.type.read(f) for _ in range(self.n_elements)]
+            elif type_t is GenericType:
+                self.values = self.type.read_many(f, self.n_elements)
             else:
                 self.values = [self.type().read(f) for _ in range(self.n_elements)]
 
         else:
-            self.values = [self.type().read(f, ignore_data=bool(M2ExternalSequenceCache().external_sequences.get(i)))
+            external_sequences = M2ParseContext.current().external_sequences
+            self.values = [self.type().read(f, ignore_data=bool(external_sequences.get(i)))
                            for i in range(self.n_elements)]
 
-        f.seek(pos)
+    def decode(self):
+        """ Decode the values of a lazily read array right away. Does nothing if they are decoded already. """
+
+        if 'values' not in self.__dict__ and self._lazy_source is not None:
+            if callable(self._lazy_source):
+                # values supplied on demand, e.g. copies of a cached array made by SkelFileCache
+                self.values = self._lazy_source()
+            else:
+                f, context = self._lazy_source
+
+                with context.activate():
+                    self._read_values(f)
+
+            # only dropped once decoded, a failed decode can be retried
+            self._lazy_source = None
 
         return self
 
+    def __getattr__(self, item):
+        # only reached for missing attributes, values of a lazily read array are missing until decoded
+        if item == 'values' and self._lazy_source is not None:
+            return self.decode().values
+
+        raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, item))
+
     def write(self, f):
         ofs = MemoryManager.ofs_request(f)
-        uint32.write(f, len(self.values))
-        uint32.write(f, ofs if len(self.values) else 0)
+        uint32.write(f, (len(self.values), ofs if len(self.values) else 0), 2)
 
         pos = f.tell()
         f.seek(ofs)
@@ -286,9 +500,10 @@ class M2Array(metaclass=Template):
         elif hasattr(self.type.func, 'size'):
             MemoryManager.mem_reserve(f, len(self.values) * self.type.func.size())
 
-        if type_t is GenericType:
-            for value in self.values:
-                self.type.write(f, value)
+        if isinstance(self.values, np.ndarray):
+            f.write(self.values.tobytes())
+        elif type_t is GenericType:
+            self.type.write_many(f, self.values)
         else:
             for value in self.values:
                 value.write(f)
@@ -296,24 +511,47 @@ class M2Array(metaclass=Template):
 
         return self
 
+    def _read_numpy(self, f, dtype):
+        n_bytes = self.n_elements * dtype.itemsize
+        array = np.frombuffer(f.view(n_bytes) if f.__class__ is ByteCursor else f.read(n_bytes), dtype=dtype)
+        return array.view(np.recarray) if dtype.names else array
+
+    def _as_list(self):
+        """ Convert values held as a NumPy array back to a list of elements, so that they can be edited in place. """
+
+        if isinstance(self.values, np.ndarray):
+            f = ByteCursor(self.values.tobytes())
+
+            if type(self.type) is GenericType:
+                self.values = self.type.read_many(f, len(self.values))
+            else:
+                self.values = [self.type().read(f) for _ in range(len(self.values))]
+
+        return self.values
+
     def __getitem__(self, item):
         return self.values[item]
 
     def append(self, value):
-        self.values.append(value)
+        self._as_list().append(value)
 
     def add(self, value):
-        self.values.append(value)
+        self._as_list().append(value)
         return len(self.values) - 1
 
     def extend(self, itrbl):
-        self.values.extend(itrbl)
+        # NumPy input keeps the values a NumPy array
+        if isinstance(itrbl, np.ndarray):
+            values = as_numpy(itrbl, self.type)
+            self.values = np.concatenate((as_numpy(self.values, self.type), values)) if len(self.values) else values
+        else:
+            self._as_list().extend(itrbl)
 
     def prepend(self, itrbl):
         self.values = itrbl[:].extend(self.values)
 
     def new(self):
-        self.values.append(self.type())
+        self._as_list().append(self.type())
         return self.values[-1]
 
     def from_iterable(self, itrbl):
@@ -326,7 +564,8 @@ class M2Array(metaclass=Template):
         self.values = itrbl
 
     def __len__(self):
-        return len(self.values)
+        values = self.__dict__.get('values')
+        return self.n_elements if values is None else len(values)
 
     def __iter__(self):
         return self.values.__iter__()
@@ -425,19 +664,19 @@ class M2RawChunk(M2ContentChunk):
     def read(self, f):
         super().read(f)
 
-        self.raw_data.write(f.read(self.size))
-        self.raw_data.seek(0)
+        # zero-copy when reading from a cursor, the payload stays a slice of the source buffer
+        self.raw_data = ByteCursor.of(f, self.size)
 
         return self
 
     def write(self, f):
 
-        self.raw_data.seek(0, 2)
-        self.size = self.raw_data.tell()
-        self.raw_data.seek(0)
-        super().write(f)
+        # payload is either a cursor over the source buffer or a BytesIO filled by the caller, neither is copied
+        with self.raw_data.getbuffer() as payload:
+            self.size = len(payload)
+            super().write(f)
 
-        f.write(self.raw_data.read())
+            f.write(payload)
 
         return self
 
@@ -477,11 +716,14 @@ class ArrayChunkBase:  # for internal use only
 
             setattr(self, self.data, [tuple([var().read(f) for var in self.item]) for _ in range(self.size // size)])
 
+        elif isinstance(self.item, GenericType):
+            setattr(self, self.data, self.item.read_many(f, self.size // self.item.size()))
+
         else:
             setattr(self, self.data, [self.item().read(f) for _ in range(self.size // self.item.size())])
 
     def _read_content_raw(self, f):
-        self.raw_data = f.read(self.size)
+        self.raw_data = f.view(self.size) if f.__class__ is ByteCursor else f.read(self.size)
 
     def write(self, f) -> Self:
         self.size = 0
@@ -529,13 +771,11 @@ class ArrayChunkBase:  # for internal use only
                 f.write(self.raw_data)
                 return self
 
-            for var in content:
+            if isinstance(self.item, GenericType):
+                self.item.write_many(f, content)
 
-                if isinstance(self.item, GenericType):
-
-                    self.item.write(f, var)
-
-                else:
+            else:
+                for var in content:
                     var.write(f)
 
         return self
@@ -543,7 +783,7 @@ class ArrayChunkBase:  # for internal use only
     def __getattribute__(self, item):
         raw_data = super().__getattribute__('raw_data')
         if item == super().__getattribute__('data') and raw_data is not None:
-            f = BytesIO(raw_data)
+            f = ByteCursor(raw_data)
             self.size = len(raw_data)
             self._read_content(f)
             self.raw_data = None
@@ -5,9 +5,21 @@ import builtins
 
 class StructsContextManagerMeta(type):
     _orig_build_class = builtins.__build_class__
+    _orig_byte_order = StructMeta._struct_default_byte_order
+    _byte_order = None
+
+    def __call__(cls, byte_order: str = '<'):
+        """ Set the byte order of structs declared in the next with-block: with Structs(byte_order='>'): ... """
+        cls._byte_order = byte_order
+        return cls
 
     def __enter__(cls):
         cls._orig_build_class = builtins.__build_class__
+        cls._orig_byte_order = StructMeta._struct_default_byte_order
+
+        if cls._byte_order is not None:
+            StructMeta._struct_default_byte_order = cls._byte_order
+            cls._byte_order = None
 
         def my_build_class(func, name, *bases, **kwargs):
             if not any(isinstance(b, type) for b in bases):
@@ -40,6 +52,7 @@ class StructsContextManagerMeta(type):
 
     def __exit__(cls, exc_type, exc_val, exc_tb):
         builtins.__build_class__ = cls._orig_build_class
+        StructMeta._struct_default_byte_order = cls._orig_byte_order
 
 
 class Structs(metaclass=StructsContextManagerMeta):
@@ -6,7 +6,12 @@ from .exceptions import StructError
 from .class_namespace_hook import NameSpaceHook
 
 from io import IOBase
-from typing import Set, Tuple, Type, Dict, Union, Optional
+from struct import Struct
+from typing import Any, Callable, List, Set, Tuple, Type, Dict, Union, Optional
+
+
+# byte order prefixes of the struct module a Struct can be declared with, '@' is excluded as it changes the layout
+BYTE_ORDERS = ('<', '>', '!', '=')
 
 
 def recurse_format_chunks(format_chunks: StructFormatType) -> str:
@@ -28,6 +33,153 @@ def recurse_format_chunks(format_chunks: StructFormatType) -> str:
                 yield from recurse_format_chunks(format)
 
 
+def _array_layout(struct_array: StructArray) -> Tuple[List[int], Any]:
+    """ Flatten nested StructArrays into a list of dimensions (outermost first) and the element type. """
+
+    dims = []
+    u_type = struct_array
+
+    while isinstance(u_type, StructArray):
+        dims.append(u_type._struct_array_qualifier)
+        u_type = u_type._struct_array_type
+
+    return dims, u_type
+
+
+class _StructCodeGenerator:
+    """ Emits the source of specialized read / write functions for a fully resolved Struct layout.
+        The whole struct is decoded with a single unpack_from() call and encoded with a single pack() call.
+    """
+
+    def __init__(self, byte_order: str = '<'):
+        self.byte_order = byte_order
+        self.tokens: List[str] = []
+        self.read_lines: List[str] = []
+        self.write_args: List[str] = []
+        self.namespace: Dict[str, Any] = {}
+        self.n_values = 0
+        self.n_temps = 0
+
+    def _new_instance(self, struct_type: Any) -> str:
+        type_name = f"_t{len(self.namespace)}"
+        self.namespace[type_name] = struct_type
+
+        temp = f"_o{self.n_temps}"
+        self.n_temps += 1
+        self.read_lines.append(f"{temp} = {type_name}.__new__({type_name})")
+
+        return temp
+
+    def emit_struct(self, annotations: Dict[str, Any], read_target: str, write_target: str):
+        for attr_name, annotation_type in annotations.items():
+            self.emit_field(annotation_type, f"{read_target}.{attr_name}", f"{write_target}.{attr_name}")
+
+    def emit_field(self, annotation_type: Any, read_target: str, write_target: str):
+
+        if isinstance(annotation_type, GenericType):
+            self.tokens.append(annotation_type.format)
+            self.read_lines.append(f"{read_target} = v[{self.n_values}]")
+            self.write_args.append(write_target)
+            self.n_values += 1
+
+        elif isinstance(annotation_type, StructArray):
+            dims, u_type = _array_layout(annotation_type)
+
+            if isinstance(u_type, GenericType):
+                self._emit_generic_array(dims, u_type, read_target, write_target)
+            else:
+                self.read_lines.append(f"{read_target} = {self._emit_struct_array(dims, 0, u_type, write_target)}")
+
+        elif isinstance(annotation_type, StructMeta):
+            self._check_byte_order(annotation_type)
+            temp = self._new_instance(annotation_type)
+            self.emit_struct(annotation_type.__annotations__, temp, write_target)
+            self.read_lines.append(f"{read_target} = {temp}")
+
+        else:
+            raise StructError(f"Unsupported field type <'{annotation_type}'> in a resolved Struct.")
+
+    def _check_byte_order(self, struct_type: Any):
+        # a single codec encodes the whole layout, nested structs can't use a byte order of their own
+        if struct_type._struct_byte_order != self.byte_order:
+            raise StructError(f"Struct <'{struct_type.__name__}'> declared with byte order "
+                              f"'{struct_type._struct_byte_order}' can't be nested into a struct declared "
+                              f"with byte order '{self.byte_order}'.")
+
+    def _emit_generic_array(self, dims: List[int], u_type: GenericType, read_target: str, write_target: str):
+        total = 1
+        for dim in dims:
+            total *= dim
+
+        # character arrays are read as a single bytes object
+        if u_type.format == 's':
+            self.tokens.append(f"{total}s")
+            self.read_lines.append(f"{read_target} = v[{self.n_values}]")
+            self.write_args.append(write_target)
+            self.n_values += 1
+            return
+
+        self.tokens.append(f"{total}{u_type.format}")
+        self.read_lines.append(f"{read_target} = {self._nested_slices(dims, self.n_values)}")
+        self.write_args.extend(self._nested_items(dims, write_target))
+        self.n_values += total
+
+    def _emit_struct_array(self, dims: List[int], depth: int, u_type: Any, write_target: str) -> str:
+        if depth == len(dims):
+            self._check_byte_order(u_type)
+            temp = self._new_instance(u_type)
+            self.emit_struct(u_type.__annotations__, temp, write_target)
+            return temp
+
+        return "[" + ", ".join(self._emit_struct_array(dims, depth + 1, u_type, f"{write_target}[{i}]")
+                               for i in range(dims[depth])) + "]"
+
+    @staticmethod
+    def _nested_slices(dims: List[int], start: int) -> str:
+        if len(dims) == 1:
+            return f"list(v[{start}:{start + dims[0]}])"
+
+        stride = 1
+        for dim in dims[1:]:
+            stride *= dim
+
+        return "[" + ", ".join(_StructCodeGenerator._nested_slices(dims[1:], start + i * stride)
+                               for i in range(dims[0])) + "]"
+
+    @staticmethod
+    def _nested_items(dims: List[int], write_target: str) -> List[str]:
+        if len(dims) == 1:
+            return [f"*{write_target}"]
+
+        items = []
+        for i in range(dims[0]):
+            items.extend(_StructCodeGenerator._nested_items(dims[1:], f"{write_target}[{i}]"))
+
+        return items
+
+    def build(self, name: str) -> Tuple[Struct, Callable, Callable]:
+        codec = Struct(self.byte_order + "".join(self.tokens))
+
+        namespace = dict(self.namespace)
+        namespace['_unpack_from'] = codec.unpack_from
+        namespace['_pack'] = codec.pack
+        namespace['_size'] = codec.size
+
+        read_body = "\n    ".join(self.read_lines) or "pass"
+        source = (f"def read(self, f):\n"
+                  f"    v = _unpack_from(f.read(_size))\n"
+                  f"    {read_body}\n"
+                  f"    return self\n"
+                  f"\n"
+                  f"def write(self, f):\n"
+                  f"    f.write(_pack({', '.join(self.write_args)}))\n"
+                  f"    return self\n")
+
+        exec(compile(source, f"<Struct {name} codec>", "exec"), namespace)
+
+        return codec, namespace['read'], namespace['write']
+
+
 class StructMeta(type):
     _struct_format_chunks: Optional[StructFormatType]
     _struct_is_template: bool
@@ -37,6 +189,12 @@ class StructMeta(type):
     _struct_original: Optional[StructIOProtocol]
 
     _struct_template_definitions: Optional[Dict[Tuple[Tuple[str, Any]], StructIOProtocol]]
+    _struct_codec_definitions: Optional[Dict[Tuple[Tuple[str, Any]], Struct]]
+    _struct_codec: Optional[Struct]
+    _struct_byte_order: str
+
+    # byte order of structs not declaring their own, set by the Structs context manager
+    _struct_default_byte_order: str = '<'
 
     def __new__(mcs, classname, bases, cls_dict, original: Optional[StructIOProtocol] = None):
         # first turning the cls_dict into a normal Python dict, as we no longer need hooked functionality here
@@ -90,14 +248,29 @@ class StructMeta(type):
 
         if is_template and original is None:
             cls_dict['_struct_template_definitions'] = {}
+            cls_dict['_struct_codec_definitions'] = {}
+
+        byte_order = cls_dict.setdefault('_struct_byte_order', StructMeta._struct_default_byte_order)
+        if byte_order not in BYTE_ORDERS:
+            raise StructError(f"Struct <'{classname}'>: Unsupported byte order '{byte_order}', "
+                              f"expected one of {', '.join(BYTE_ORDERS)}.")
 
         # pack format
         format_processed = "".join(recurse_format_chunks(format_chunks)) if format_chunks else None
 
         cls_dict['_struct_format_chunks'] = format_chunks
         cls_dict['_struct_token_string'] = None if not is_resolved else format_processed
-        cls_dict['read'] = StructMeta.read
-        cls_dict['write'] = StructMeta.write
+
+        # resolved structs get read / write functions specialized for their exact layout
+        if is_resolved:
+            generator = _StructCodeGenerator(byte_order)
+            generator.emit_struct(annotations, 'self', 'self')
+            cls_dict['_struct_codec'], cls_dict['read'], cls_dict['write'] = generator.build(classname)
+        else:
+            cls_dict['_struct_codec'] = None
+            cls_dict['read'] = StructMeta.read
+            cls_dict['write'] = StructMeta.write
+
         cls_dict['_struct_is_template'] = is_template
         cls_dict['_struct_is_plain_old_data'] = is_plain_old_data
 
@@ -227,6 +400,7 @@ class StructMeta(type):
 
             if '_struct_template_definitions' in new_dict:
                 del new_dict['_struct_template_definitions']
+                del new_dict['_struct_codec_definitions']
 
         args = ', '.join(name + '=' + (str(t) if isinstance(t, int) else (t.__name__ if isinstance(t, StructIOProtocol)
                                                   or isinstance(t, VarTypeProtocol) else t.name))
@@ -237,9 +411,12 @@ class StructMeta(type):
                                       f"<{args}>",
            cls.__bases__, new_dict, cls)
 
-        # store known specialization to avoid duplicating types
+        # store known specialization to avoid duplicating types, and the codec of resolved ones next to it
         orig_type._struct_template_definitions[params_hashable] = new_type
 
+        if new_type._struct_codec is not None:
+            orig_type._struct_codec_definitions[params_hashable] = new_type._struct_codec
+
         return new_type
 
     def __getitem__(cls, item: Union[str, int, VarTypeProtocol]) -> StructArray:
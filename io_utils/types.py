@@ -1,6 +1,8 @@
-from struct import pack, unpack
+import mmap
+
+from struct import Struct
 from functools import partial
-from collections.abc import Iterable
+from itertools import chain
 
 __reload_order_index__ = 0
 
@@ -47,14 +49,247 @@ class Template(type):
             return partial(cls, *args)
 
 
+class ByteCursor:
+    """ File-like reader over an in-memory buffer (bytes, bytearray, mmap, ...).
+
+    Supports the read / seek / tell subset of the file protocol, so it can be passed to any read() method,
+    and additionally provides unpack_from() based typed reads and zero-copy views for the hot paths.
+    Positions are relative to the start of the cursor window, which makes sub-cursors behave like separate files.
+    """
+
+    __slots__ = ('data', 'buffer', 'base', 'pos')
+
+    def __init__(self, data, base=0, size=None):
+        self.data = data
+        view = memoryview(data)
+
+        if view.ndim != 1 or view.itemsize != 1:
+            view = view.cast('B')
+
+        end = len(view) if size is None else base + size
+        self.buffer = view[base:end] if base or end != len(view) else view
+        self.base = base
+        self.pos = 0
+
+    @classmethod
+    def from_file(cls, f):
+        """ Read the remainder of a file object into memory and return a cursor over it. """
+        return cls(f.read())
+
+    @classmethod
+    def from_path(cls, path, use_mmap=False):
+        """ Get a cursor over the contents of a file, either read into memory or memory-mapped.
+
+        A mapping is not closed explicitly, it is released once the cursor and every view
+        (including NumPy arrays) created from it are gone. Do not overwrite the source file while they are alive.
+        """
+        with open(path, 'rb') as f:
+            if not use_mmap:
+                return cls(f.read())
+
+            try:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except ValueError:  # empty files can not be mapped
+                return cls(b'')
+
+    def read(self, n=-1):
+        start = self.pos
+        end = len(self.buffer) if n is None or n < 0 else min(start + n, len(self.buffer))
+        self.pos = end
+
+        return self.buffer[start:end].tobytes()
+
+    def view(self, n):
+        """ Zero-copy variant of read(). The returned memoryview shares memory with the underlying buffer. """
+        start = self.pos
+        self.pos = min(start + n, len(self.buffer))
+
+        return self.buffer[start:self.pos]
+
+    def getbuffer(self):
+        """ Get the whole cursor window as a new memoryview, like BytesIO.getbuffer(). Releasing it keeps the cursor intact. """
+        return self.buffer[:]
+
+    def unpack(self, struct_):
+        """ Unpack a precompiled struct.Struct at the current position and advance past it. """
+        ret = struct_.unpack_from(self.buffer, self.pos)
+        self.pos += struct_.size
+
+        return ret
+
+    def unpack_from(self, struct_, ofs):
+        """ Unpack a precompiled struct.Struct at an absolute position, keeping the current one. """
+        return struct_.unpack_from(self.buffer, ofs)
+
+    def cstring(self, ofs):
+        """ Get a null-terminated byte string starting at the given position, keeping the current one. """
+        find = getattr(self.data, 'find', None)
+
+        if find is None:
+            return self.buffer[ofs:].tobytes().split(b'\0', 1)[0]
+
+        end = find(b'\0', self.base + ofs, self.base + len(self.buffer))
+
+        return self.buffer[ofs:(end - self.base if end >= 0 else len(self.buffer))].tobytes()
+
+    def sub(self, n):
+        """ Get a cursor over the next n bytes (sharing memory) and advance past them. """
+        sub = ByteCursor(self.data, self.base + self.pos, min(n, len(self.buffer) - self.pos))
+        self.pos += len(sub.buffer)
+
+        return sub
+
+    @staticmethod
+    def of(f, n):
+        """ Get a cursor over the next n bytes of any reader. Zero-copy for cursors, a single read() for files. """
+        return f.sub(n) if f.__class__ is ByteCursor else ByteCursor(f.read(n))
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, ofs, whence=0):
+        if whence == 0:
+            self.pos = ofs
+        elif whence == 1:
+            self.pos += ofs
+        else:
+            self.pos = len(self.buffer) + ofs
+
+        return self.pos
+
+    def skip(self, n):
+        self.pos += n
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class ByteWriter:
+    """ File-like writer into a growable in-memory buffer.
+
+    Supports the write / seek / tell subset of the file protocol, so it can be passed to any write() method,
+    and additionally provides pack_into() based typed writes. Like in a regular file, seeking past the end
+    and writing leaves a zero-filled gap. The buffer grows geometrically, so the whole file is assembled
+    with amortized O(1) appends and can be emitted with a single write call.
+    """
+
+    __slots__ = ('buffer', 'pos', 'end')
+
+    def __init__(self, capacity=0):
+        self.buffer = bytearray(capacity)
+        self.pos = 0
+        self.end = 0
+
+    def _reserve(self, size):
+        capacity = len(self.buffer)
+
+        if size > capacity:
+            self.buffer.extend(bytes(max(size, capacity * 2) - capacity))
+
+    def write(self, data):
+        pos = self.pos
+        n = len(data)
+        new_pos = pos + n
+
+        if new_pos > len(self.buffer):
+            self._reserve(new_pos)
+
+        self.buffer[pos:new_pos] = data
+        self.pos = new_pos
+
+        if new_pos > self.end:
+            self.end = new_pos
+
+        return n
+
+    def pack(self, struct_, *values):
+        """ Pack values with a precompiled struct.Struct at the current position and advance past them. """
+        pos = self.pos
+        new_pos = pos + struct_.size
+
+        if new_pos > len(self.buffer):
+            self._reserve(new_pos)
+
+        struct_.pack_into(self.buffer, pos, *values)
+        self.pos = new_pos
+
+        if new_pos > self.end:
+            self.end = new_pos
+
+    def zero_fill(self, ofs, n):
+        """ Equivalent of writing n zero bytes at the given position, keeping the current one. """
+        end = ofs + n
+
+        if end > len(self.buffer):
+            self._reserve(end)
+
+        # everything past the end of written data is zero already
+        if ofs < self.end:
+            self.buffer[ofs:min(end, self.end)] = bytes(min(end, self.end) - ofs)
+
+        if end > self.end:
+            self.end = end
+
+    def getbuffer(self):
+        """ Get a view of the written data. Release it before writing anything else. """
+        return memoryview(self.buffer)[:self.end]
+
+    def getvalue(self):
+        return bytes(self.buffer[:self.end])
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, ofs, whence=0):
+        if whence == 0:
+            self.pos = ofs
+        elif whence == 1:
+            self.pos += ofs
+        else:
+            self.pos = self.end + ofs
+
+        return self.pos
+
+    def __len__(self):
+        return self.end
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
 class GenericType:
-    __slots__ = ('format', 'size_', 'default_value')
+    __slots__ = ('format', 'size_', 'default_value', 'struct', 'n_components', '_structs')
 
     def __init__(self, format, size, default_value=0):
         self.format = format
         self.size_ = size
         self.default_value = default_value
 
+        # precompiled codec, shared by all reads and writes of this type
+        self.struct = Struct(format)
+        self.n_components = len(self.struct.unpack(bytes(self.struct.size)))
+        self._structs = {1: self.struct}
+
+    def _get_struct(self, n):
+        s = self._structs.get(n)
+
+        if s is None:
+            s = Struct(str(n) + self.format if self.n_components == 1 else self.format * n)
+
+            if len(self._structs) < 64:
+                self._structs[n] = s
+
+        return s
+
     def read(self, f, n=1):
         if type(n) is not int:
             raise TypeError('Length can only be represented by an integer value.')
@@ -62,12 +297,29 @@ class GenericType:
         if n <= 0:
             raise TypeError('Length should be an integer value above 0.')
 
-        if n == 1:
-            ret = unpack(self.format, f.read(self.size_))
+        s = self.struct if n == 1 else self._get_struct(n)
+
+        if f.__class__ is ByteCursor:
+            ret = s.unpack_from(f.buffer, f.pos)
+            f.pos += s.size
         else:
-            ret = unpack(str(n) + self.format, f.read(self.size_ * n))
+            ret = s.unpack(f.read(s.size))
+
         return ret[0] if len(ret) == 1 else ret
 
+    def read_many(self, f, n):
+        """ Read n consecutive values. Equivalent to [self.read(f) for _ in range(n)]. """
+        if not n:
+            return []
+
+        it = self.struct.iter_unpack(f.view(self.size_ * n) if f.__class__ is ByteCursor
+                                     else f.read(self.size_ * n))
+
+        if self.n_components == 1:
+            return [value for value, in it]
+
+        return list(it)
+
     def write(self, f, value, n=1):
         if type(n) is not int:
             raise TypeError('Length can only be represented by an integer value.')
@@ -76,16 +328,35 @@ class GenericType:
             raise TypeError('Length should be an integer value above 0.')
 
         if n == 1:
-            if isinstance(value, Iterable):
-                f.write(pack(self.format, *value))
-            else:
-                if len(self.format) > 1: # very bad fix
-                    for x in value:
-                        f.write(pack(self.format[0], x))
-                else:
-                    f.write(pack(self.format, value))
+            s = self.struct
+            values = (value,) if self.n_components == 1 else value
+        else:
+            s = self._get_struct(n)
+            values = value
+
+        if f.__class__ is ByteWriter:
+            f.pack(s, *values)
         else:
-            f.write(pack(str(n) + self.format, *value))
+            f.write(s.pack(*values))
+
+    def write_many(self, f, values):
+        """ Write a sequence of values with a single pack call. """
+        if not len(values):
+            return
+
+        if self.format == 's':
+            f.write(b''.join(values))
+            return
+
+        s = self._get_struct(len(values))
+
+        if self.n_components != 1:
+            values = chain.from_iterable(values)
+
+        if f.__class__ is ByteWriter:
+            f.pack(s, *values)
+        else:
+            f.write(s.pack(*values))
 
     def __call__(self, *args, **kwargs):
         return self
@@ -107,7 +378,7 @@ class Array(metaclass=Template):
 
     def read(self, f):
         if type(self.type) is GenericType:
-            self.values = [self.type.read(f) for _ in range(self.length)]
+            self.values = self.type.read_many(f, self.length)
         else:
             for val in self.values:
                 val.read(f)
@@ -117,8 +388,7 @@ class Array(metaclass=Template):
     def write(self, f):
 
         if type(self.type) is GenericType:
-            for val in self.values:
-                self.type.write(f, val)
+            self.type.write_many(f, self.values)
         else:
             for val in self.values:
                 val.write(f)
@@ -137,7 +407,7 @@ uint32 = GenericType('I', 4)
 int64 = GenericType('q', 8)
 uint64 = GenericType('Q', 8)
 float32 = GenericType('f', 4, 0.0)
-float64 = GenericType('f', 8, 0.0)
+float64 = GenericType('d', 8, 0.0)
 char = GenericType('s', 1, '')
 boolean = GenericType('?', 1, False)
 vec3D = GenericType('fff', 12, (0.0, 0.0, 0.0))
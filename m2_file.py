@@ -1,18 +1,23 @@
 import os
 import struct
+import numpy as np
 
-from typing import List
+from typing import List, NamedTuple, Tuple
 from itertools import chain
+from functools import wraps
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from .enums.m2_enums import M2TextureTypes
 from .file_formats import m2_chunks
 from .file_formats.m2_format import *
 from .file_formats.m2_chunks import *
-from .file_formats.skin_format import M2SkinProfile, M2SkinSubmesh, M2SkinTextureUnit
-from .file_formats.skel_format import SkelFile
+from .file_formats.skin_format import M2SkinProfile, M2SkinSubmesh, M2SkinTextureUnit, BONE_COUNT_MAX_VALUES
+from .file_formats.skel_format import SkelFile, SkelFileCache
 from .file_formats.anim_format import AnimFile
-from .file_formats.wow_common_types import M2Versions
+from .file_formats.phys_format import PhysFile
+from .file_formats.wow_common_types import M2Versions, M2ParseContext
+from .io_utils.types import ByteCursor, ByteWriter
 
 
 class M2Dependencies:
@@ -23,20 +28,59 @@ class M2Dependencies:
         self.anims = {}
         self.bones = []
         self.lod_skins = []
+        self.phys = None
+
+
+class M2ProbeInfo(NamedTuple):
+    """ Summary of an M2 file gathered by M2File.probe() without parsing the model. """
+    version: int
+    global_flags: int
+    name: str
+    n_vertices: int
+    n_bones: int
+    n_sequences: int
+    n_textures: int
+    num_skin_profiles: int
+    texture_names: Tuple[str, ...]
+    texture_file_ids: Tuple[int, ...]                   # TXID chunk (Legion+)
+    chunks: Tuple[Tuple[str, int, int], ...]            # (magic, offset, size) of chunks following MD21 (Legion+)
+
+
+def _in_parse_context(method):
+    """ Run an M2File method with the parse context of the file active. """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.context.activate():
+            return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class M2File:
-    def __init__(self, version, filepath=None):
+    def __init__(self, version, filepath=None, use_numpy=False, use_mmap=False, lazy=False):
         self.version = M2Versions.from_expansion_number(version)
-        self.root = MD21() if self.version >= M2Versions.LEGION else MD20()
         self.filepath = filepath
 
-        track_cache = M2TrackCache()
-        track_cache.purge()
-        
+        # per-file parsing state, makes M2File instances independent of each other
+        self.context = M2ParseContext(self.version, use_numpy, lazy)
+
+        with self.context.activate():
+            self.root = MD21() if self.version >= M2Versions.LEGION else MD20()
+            self.skins = [M2SkinProfile()]
+
+        # read plain-typed arrays (indices, vectors, vertices) as read-only NumPy arrays
+        self.use_numpy = use_numpy
+
+        # parse files straight from a read-only memory mapping instead of reading them into memory
+        self.use_mmap = use_mmap
+
+        # only record array headers when reading, decode each array when it is first accessed
+        self.lazy = lazy
+
         self.dependencies = M2Dependencies()
-        self.skins = [M2SkinProfile()]
         self.skels = deque()
+        self.phys = None                                        # PhysFile, see read_phys()
         self.texture_path_map = {}
 
         self.pfid = None
@@ -57,48 +101,135 @@ class M2File:
             self.raw_path = os.path.splitext(filepath)[0]
             self.read()
 
-    def read(self):
-        self.skins = []
+    @staticmethod
+    def probe(filepath) -> M2ProbeInfo:
+        """ Read version, counts and texture names of an M2 file from its fixed header, without parsing the model. """
 
-        with open(self.filepath, 'rb') as f:
-            magic = f.read(4).decode('utf-8')
+        with open(filepath, 'rb') as f:
+            magic, md21_size = struct.unpack('<4sI', f.read(8))
 
-            if magic == 'MD20':
-                self.root = MD20().read(f)
+            # offsets of the embedded MD20 data are relative to its start
+            base = 8 if magic == b'MD21' else 0
+            if magic not in (b'MD20', b'MD21'):
+                raise TypeError('\nNot an M2 file: \"{}\"'.format(filepath))
+
+            f.seek(base)
+            header = f.read(112)
+
+            version, n_name, ofs_name, global_flags = struct.unpack_from('<4xIIII', header)
+            n_sequences = struct.unpack_from('<I', header, 28)[0]
+
+            # TBC and older store the playable animation lookup and a skin profile array instead of a count
+            if version <= M2Versions.TBC:
+                ofs_bones, ofs_vertices, ofs_skin_profiles, ofs_textures_array = 52, 68, 76, 92
             else:
-                self.root = MD21().read(f)
+                ofs_bones, ofs_vertices, ofs_skin_profiles, ofs_textures_array = 44, 60, 68, 80
+
+            n_bones, = struct.unpack_from('<I', header, ofs_bones)
+            n_vertices, = struct.unpack_from('<I', header, ofs_vertices)
+            num_skin_profiles, = struct.unpack_from('<I', header, ofs_skin_profiles)
+            n_textures, ofs_textures = struct.unpack_from('<II', header, ofs_textures_array)
 
+            def read_string(n, ofs):
+                f.seek(base + ofs)
+                return f.read(n).decode('utf-8', 'replace').rstrip('\0')
+
+            name = read_string(n_name, ofs_name) if n_name else ''
+
+            f.seek(base + ofs_textures)
+            textures = f.read(n_textures * M2Texture.size())
+            texture_names = tuple(read_string(n, ofs) if n else ''
+                                  for _, _, n, ofs in struct.iter_unpack('<IIII', textures))
+
+            chunks = []
+            texture_file_ids = ()
+
+            if base:
+                pos = base + md21_size
                 while True:
-                    try:
-                        magic = f.read(4).decode('utf-8')
+                    f.seek(pos)
+                    chunk_header = f.read(8)
 
-                    except EOFError:
+                    # end of file or trailing alignment padding
+                    if len(chunk_header) < 8 or not chunk_header[:4].strip(b'\0'):
                         break
 
-                    except struct.error:
-                        break
+                    chunk_magic, chunk_size = struct.unpack('<4sI', chunk_header)
+                    chunk_magic = chunk_magic.decode('utf-8', 'replace')
+                    chunks.append((chunk_magic, pos + 8, chunk_size))
 
-                    except UnicodeDecodeError:
-                        print('\nAttempted reading non-chunked data.')
-                        break
+                    if chunk_magic == 'TXID':
+                        texture_file_ids = struct.unpack('<{}I'.format(chunk_size // 4), f.read(chunk_size // 4 * 4))
 
-                    if not magic:
-                        break
+                    pos += 8 + chunk_size
 
-                    # getting the correct chunk parsing class
-                    chunk = getattr(m2_chunks, magic, None)
+        return M2ProbeInfo(version, global_flags, name, n_vertices, n_bones, n_sequences, n_textures,
+                           num_skin_profiles, texture_names, texture_file_ids, tuple(chunks))
 
-                    # skipping unknown chunks
-                    if chunk is None:
-                        print("\nEncountered unknown chunk \"{}\"".format(magic))
-                        f.seek(M2ContentChunk().read(f).size, 1)
-                        continue
+    @classmethod
+    def from_bytes(cls, version, data, filepath='', **kwargs):
+        """ Parse an M2 file from its contents, e.g. as returned by WoWFileData.read_file().
+            filepath is the game path of the file, used to locate its dependencies.
+        """
 
-                    if magic != 'SFID':
-                        setattr(self, magic.lower(), chunk().read(f))
+        m2 = cls(version, **kwargs)
+        m2.filepath = filepath
+        m2.raw_path = os.path.splitext(filepath)[0]
+        m2.read(data)
 
-                    else:
-                        self.sfid = SFID(n_views=self.root.num_skin_profiles).read(f)
+        return m2
+
+    @_in_parse_context
+    def read(self, data=None):
+        # tracks and sequences of a previous read belong to the replaced model
+        self.context.reset()
+
+        self.skins = []
+        self.context.numpy_arrays = self.use_numpy
+        self.context.lazy_arrays = self.lazy
+
+        # the whole file is read (or mapped) at once and parsed from memory
+        f = ByteCursor(data) if data is not None else ByteCursor.from_path(self.filepath, self.use_mmap)
+
+        magic = f.read(4).decode('utf-8')
+
+        if magic == 'MD20':
+            self.root = MD20().read(f)
+        else:
+            self.root = MD21().read(f)
+
+            while True:
+                try:
+                    magic = f.read(4).decode('utf-8')
+
+                except EOFError:
+                    break
+
+                except struct.error:
+                    break
+
+                except UnicodeDecodeError:
+                    print('\nAttempted reading non-chunked data.')
+                    break
+
+                # end of file or trailing alignment padding
+                if not magic.strip('\0'):
+                    break
+
+                # getting the correct chunk parsing class
+                chunk = getattr(m2_chunks, magic, None)
+
+                # skipping unknown chunks
+                if chunk is None:
+                    print("\nEncountered unknown chunk \"{}\"".format(magic))
+                    f.seek(M2ContentChunk().read(f).size, 1)
+                    continue
+
+                if magic != 'SFID':
+                    setattr(self, magic.lower(), chunk().read(f))
+
+                else:
+                    self.sfid = SFID(n_views=self.root.num_skin_profiles).read(f)
 
     def find_main_skel(self) -> int:
 
@@ -107,12 +238,17 @@ class M2File:
 
         return 0
 
-    def read_skel(self, path: str) -> int:
-
-        skel = SkelFile(path)
+    @_in_parse_context
+    def read_skel(self, path: str, file_id: int = 0, use_cache: bool = True) -> int:
+        """ Read a .skel file and return the file data id of its parent skel, 0 if there is none.
+            Parsed skels are cached by SkelFileCache, keyed by file_id if given or by path,
+            each model gets its own copy-on-write view.
+        """
 
-        with open(path, 'rb') as f:
-            skel.read(f)
+        if use_cache:
+            skel = SkelFileCache().get(path, file_id, self.use_mmap)
+        else:
+            skel = SkelFile(path).read(ByteCursor.from_path(path, self.use_mmap))
 
         self.skels.appendleft(skel)
 
@@ -121,6 +257,7 @@ class M2File:
 
         return 0
 
+    @_in_parse_context
     def process_skels(self):
 
         for skel in self.skels:
@@ -148,6 +285,7 @@ class M2File:
 
                 self.afid.anim_file_ids = skel.afid.anim_file_ids
 
+    @_in_parse_context
     def find_model_dependencies(self) -> M2Dependencies:
 
         # find skins
@@ -191,7 +329,12 @@ class M2File:
                     self.dependencies.bones.append("{}_{}.bone".format(
                         self.raw_path, str(sequence.variation_index).zfill(2)))
 
-        # TODO: find phys
+        # find phys
+        if self.pfid:
+            self.dependencies.phys = self.pfid.phys_file_id
+
+        elif self.root.global_flags & M2GlobalFlags.LoadPhysData:
+            self.dependencies.phys = "{}.phys".format(self.raw_path)
 
         # find anims
         anim_paths_map = {}
@@ -238,7 +381,7 @@ class M2File:
         return self.dependencies
 
     @staticmethod
-    def process_anim_file(raw_data : BytesIO, tracks: List[M2Track], real_seq_index: int):
+    def process_anim_file(raw_data: ByteCursor, tracks: List[M2Track], real_seq_index: int):
         
         for track in tracks:
             if track.global_sequence < 0 and track.timestamps.n_elements > real_seq_index:
@@ -251,23 +394,46 @@ class M2File:
                     frame_values = track.values[real_seq_index]
                     frame_values.read(raw_data, ignore_header=True)
 
-    def read_additional_files(self, skin_paths, anim_paths):
+    @_in_parse_context
+    def read_additional_files(self, skin_paths, anim_paths, sequence_ids=None, max_workers=None, phys_path=None):
+        """ Load .skin and .anim files of the model, and its .phys file if phys_path is given.
+
+        .anim files are read concurrently by a thread pool of max_workers threads (default chosen by
+        ThreadPoolExecutor), their data is applied to the tracks sequentially in sequence order.
+        If sequence_ids (animation IDs) are given, only .anim files of those sequences are loaded.
+        """
+
+        if phys_path:
+            self.read_phys(phys_path)
 
         if self.version >= M2Versions.WOTLK:
+            self.context.numpy_arrays = self.use_numpy
+            self.context.lazy_arrays = self.lazy
+
             # load skins
 
             for i in range(self.root.num_skin_profiles):
 
                 try:
-                    with open(skin_paths[i], 'rb') as skin_file:
-                        self.skins.append(M2SkinProfile().read(skin_file))
+                    self.skins.append(M2SkinProfile().read(ByteCursor.from_path(skin_paths[i], self.use_mmap)))
                 except FileNotFoundError:
                     if i > 0:
                         raise FileNotFoundError('Error: at least one .skin file is required to load a model.')
 
             # load anim files
-            track_cache = M2TrackCache()
+            chunked_anim_files = self.version >= M2Versions.LEGION and self.root.global_flags & M2GlobalFlags.ChunkedAnimFiles
+            split = bool(self.skels)
+            old = not split and not chunked_anim_files
+            # downported models that don't clean up flags can crash and be detected as new version
+            # and not self.root.global_flags & M2GlobalFlags.ChunkedAnimFiles)
+
+            anim_jobs = []
+
             for i, sequence in enumerate(self.root.sequences):
+
+                if sequence.flags & 0x130 or (sequence_ids is not None and sequence.id not in sequence_ids):
+                    continue
+
                 # handle alias animations
                 real_anim = sequence
                 a_idx = i
@@ -276,87 +442,175 @@ class M2File:
                     a_idx = real_anim.alias_next
                     real_anim = self.root.sequences[real_anim.alias_next]
 
-                if not sequence.flags & 0x130:
-                    chunked_anim_files = self.version >= M2Versions.LEGION and self.root.global_flags & M2GlobalFlags.ChunkedAnimFiles
+                anim_jobs.append((a_idx, anim_paths[real_anim.id, sequence.variation_index]))
 
-                    anim_file = AnimFile(split=bool(self.skels)
-                                         , old=not bool(self.skels)
-                                                and not chunked_anim_files)
-                                                # downported models that don't clean up flags can crash and be detected as new version
-                                               # and not self.root.global_flags & M2GlobalFlags.ChunkedAnimFiles) 
-                    
-                    anim_path = anim_paths[real_anim.id, sequence.variation_index]
+            if not anim_jobs:
+                return
 
-                    try:
-                        if not os.path.exists(anim_path):
-                            raise FileNotFoundError(
-                                f"\nThe required .anim file \"{anim_path}\" was not found.\n"
-                                "Please, add the missing .anim file and try again."
-                            )
+            # .anim data is applied to registered tracks, so the arrays holding them have to be decoded first
+            if self.lazy:
+                for value in vars(self.root).values():
+                    if isinstance(value, M2Array) and type(value.type) is not GenericType:
+                        value.decode()
 
-                        with open(anim_path, 'rb') as f:
-                            # print(anim_path)
-                            
-                            anim_file.read(f)
+            # every distinct file is read once, aliases share it
+            unique_paths = list(dict.fromkeys(anim_path for _, anim_path in anim_jobs))
 
-                    except FileNotFoundError as e:
-                        #import sys
-                        #sys.tracebacklimit = 0
-                        raise e
+            def read_anim_file(anim_path):
+                if not os.path.exists(anim_path):
+                    raise FileNotFoundError(
+                        f"\nThe required .anim file \"{anim_path}\" was not found.\n"
+                        "Please, add the missing .anim file and try again."
+                    )
 
-                    if anim_file.old or not anim_file.split:
+                return AnimFile(split=split, old=old).read(ByteCursor.from_path(anim_path, self.use_mmap))
 
-                        if anim_file.old:
-                            raw_data = anim_file.raw_data
-                        else:
-                            raw_data = anim_file.afm2.raw_data
+            if len(unique_paths) == 1 or max_workers == 1:
+                anim_files = dict(zip(unique_paths, map(read_anim_file, unique_paths)))
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    anim_files = dict(zip(unique_paths, executor.map(read_anim_file, unique_paths)))
 
-                        for creator, tracks in track_cache.m2_tracks.items():
+            for a_idx, anim_path in anim_jobs:
+                anim_file = anim_files[anim_path]
 
-                            M2File.process_anim_file(raw_data, tracks, a_idx)
+                if anim_file.old or not anim_file.split:
 
+                    if anim_file.old:
+                        raw_data = anim_file.raw_data
                     else:
+                        raw_data = anim_file.afm2.raw_data
+
+                    for creator, tracks in self.context.m2_tracks.items():
 
-                        for creator, tracks in track_cache.m2_tracks.items():
+                        M2File.process_anim_file(raw_data, tracks, a_idx)
 
-                            if creator == M2CompBone:
-                                M2File.process_anim_file(anim_file.afsb.raw_data, tracks, a_idx)
-                            elif creator == M2Attachment:
-                                M2File.process_anim_file(anim_file.afsa.raw_data, tracks, a_idx)
-                            else: #What's left in AFM2, seems like only Event data?
-                                M2File.process_anim_file(anim_file.afm2.raw_data, tracks, a_idx)
+                else:
+
+                    for creator, tracks in self.context.m2_tracks.items():
+
+                        if creator == M2CompBone:
+                            M2File.process_anim_file(anim_file.afsb.raw_data, tracks, a_idx)
+                        elif creator == M2Attachment:
+                            M2File.process_anim_file(anim_file.afsa.raw_data, tracks, a_idx)
+                        else: #What's left in AFM2, seems like only Event data?
+                            M2File.process_anim_file(anim_file.afm2.raw_data, tracks, a_idx)
 
         else:
             self.skins = self.root.skin_profiles
 
-    def write(self, filepath):
-        with open(filepath, 'wb') as f:
-            if self.version < M2Versions.WOTLK:
-                self.root.skin_profiles = self.skins
-            else:
-                raw_path = os.path.splitext(filepath)[0]
-                for i, skin in enumerate(self.skins):
-                    with open("{}{}.skin".format(raw_path, str(i).zfill(2)), 'wb') as skin_file:
-                        skin.write(skin_file)
+    def read_phys(self, path: str) -> PhysFile:
+        """ Load the .phys file of the model (see M2Dependencies.phys), bodies, shapes and joints as structured arrays. """
+
+        self.phys = PhysFile().read(ByteCursor.from_path(path, self.use_mmap))
+        return self.phys
+
+    @staticmethod
+    def _write_buffered(filepath, obj):
+        """ Serialize an object into memory and emit it with a single write call, padded to 16 bytes. """
+
+        f = ByteWriter()
+        obj.write(f)
+
+        f.seek(0, 2)
+        f.write(b'\x00' * ((16 - (len(f) % 16)) % 16))
 
-            self.root.write(f)
+        with open(filepath, 'wb') as file, f.getbuffer() as data:
+            file.write(data)
 
-            actual_size = os.path.getsize(filepath)
+    @_in_parse_context
+    def write(self, filepath, reduce_keyframes=False, optimize_indices=False):
+        # optionally write the file with redundant bone keys dropped, the model keeps its keys
+        if reduce_keyframes:
+            from .tools import m2_keyframe_reduction
 
-            f.seek(actual_size)
+            with m2_keyframe_reduction.reduced_keyframes(self) as report:
+                self.write(filepath, optimize_indices=optimize_indices)
 
-            padding_needed = (16 - (actual_size % 16)) % 16
+            return report
 
-            if padding_needed > 0:
-                f.write(b'\x00' * padding_needed)
-                
-            # TODO: anim, skel and phys
+        # optionally write skins with optimized index order, the model keeps its skins
+        if optimize_indices:
+            from .tools import m2_index_optimizer
 
+            with m2_index_optimizer.optimized_skins(self):
+                self.write(filepath)
+
+            return
+
+        if self.version < M2Versions.WOTLK:
+            self.root.skin_profiles = self.skins
+        else:
+            raw_path = os.path.splitext(filepath)[0]
+            for i, skin in enumerate(self.skins):
+                with open("{}{}.skin".format(raw_path, str(i).zfill(2)), 'wb') as skin_file, ByteWriter() as f:
+                    skin.write(f)
+
+                    with f.getbuffer() as data:
+                        skin_file.write(data)
+
+        M2File._write_buffered(filepath, self.root)
+
+        if self.phys:
+            with open(os.path.splitext(filepath)[0] + '.phys', 'wb') as phys_file, ByteWriter() as f:
+                self.phys.write(f)
+
+                with f.getbuffer() as data:
+                    phys_file.write(data)
+
+        # TODO: anim and skel
+
+    def export_glb(self, filepath, skin_index=0, animations=True):
+        """ Export mesh, skeleton and bone animations to a binary glTF file, see tools.m2_gltf. """
+        from .tools import m2_gltf
+
+        m2_gltf.export_glb(self, filepath, skin_index, animations)
+
+    def reduce_keyframes(self, translation_tolerance=1e-3, rotation_tolerance=1e-3, scale_tolerance=1e-3,
+                         max_workers=1) -> 'KeyframeReductionReport':
+        """ Drop bone keys reproducible by interpolation within tolerance from the model, see
+            tools.m2_keyframe_reduction. Use write(reduce_keyframes=True) to only write a reduced file.
+        """
+        from .tools import m2_keyframe_reduction
+
+        return m2_keyframe_reduction.reduce_keyframes(self, translation_tolerance, rotation_tolerance, scale_tolerance,
+                                                      max_workers)
+
+    def optimize_skins(self, overdraw=True):
+        """ Reorder triangles and vertices of all skins for vertex cache and fetch locality, see tools.m2_index_optimizer. """
+        from .tools import m2_index_optimizer
+
+        for skin in self.skins:
+            m2_index_optimizer.optimize_skin(self, skin, overdraw)
+
+    def partition_skin_bones(self, max_bones=64):
+        """ Split the submeshes of all skins into parts referencing at most max_bones bones each, rebuilding
+            the bone lookup table from scratch, see tools.m2_bone_partitioning.
+        """
+        from .tools import m2_bone_partitioning
+
+        lookup = self.root.bone_lookup_table.values
+        self.root.bone_lookup_table.values = []
+
+        try:
+            self.skins = [m2_bone_partitioning.partition_skin(self, skin, max_bones) for skin in self.skins]
+        except ValueError:
+            self.root.bone_lookup_table.values = lookup
+            raise
+
+    def generate_lod_skins(self, ratios=(0.5, 0.25), max_error=None) -> List[M2SkinProfile]:
+        """ Append skins reduced from skin 0 keeping ratios of its triangles, see tools.m2_lod. """
+        from .tools import m2_lod
+
+        return m2_lod.generate_lod_skins(self, ratios, max_error)
+
+    @_in_parse_context
     def add_skin(self):
         skin = M2SkinProfile()
         self.skins.append(skin)
         return skin
 
+    @_in_parse_context
     def add_vertex(self, pos, normal, tex_coords, bone_weights, bone_indices, tex_coords2=None):
         vertex = M2Vertex()
         vertex.pos = tuple(pos)
@@ -377,6 +631,7 @@ class M2File:
         skin.vertex_indices.append(vertex_index)
         return vertex_index
 
+    @_in_parse_context
     def add_geoset(self, vertices, normals, uv, uv2, tris, b_indices, b_weights, origin, sort_pos, sort_radius, mesh_part_id):
 
         submesh = M2SkinSubmesh()
@@ -451,6 +706,111 @@ class M2File:
 
         return geoset_index
 
+    @staticmethod
+    def _bone_weights_as_bytes(b_weights: np.ndarray) -> np.ndarray:
+        """ Get (N, 4) bone weights as bytes, float weights in range [0, 1] are scaled to [0, 255]. """
+
+        if b_weights.dtype.kind == 'f':
+            if b_weights.size and (b_weights.min() < 0.0 or b_weights.max() > 1.0):
+                raise ValueError('Float bone weights must be in range [0, 1].')
+
+            weights = np.rint(b_weights * 255).astype(np.int64)
+
+            # rounding must not change the total of vertices weighted to 1, the largest weight takes the difference
+            rows = np.flatnonzero(np.isclose(b_weights.sum(axis=1), 1.0))
+            largest = np.argmax(weights[rows], axis=1)
+            weights[rows, largest] += 255 - weights[rows].sum(axis=1)
+
+            return weights
+
+        if b_weights.size and (b_weights.min() < 0 or b_weights.max() > 0xFF):
+            raise ValueError('Integer bone weights must be in range [0, 255].')
+
+        return b_weights
+
+    @_in_parse_context
+    def add_geoset_arrays(self, positions, normals, uv, uv2, tris, b_indices, b_weights, origin, sort_pos, sort_radius,
+                          mesh_part_id):
+        """ Vectorized version of add_geoset() for array-likes: positions and normals (N, 3), uv and optional uv2 (N, 2),
+            tris (M, 3), b_indices and b_weights (N, 4). Vertices and skin arrays are stored as NumPy arrays.
+            Bone weights are bytes, or floats in range [0, 1] scaled to bytes.
+        """
+
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+        b_indices = np.asarray(b_indices, dtype=np.int64).reshape(-1, 4)
+        b_weights = M2File._bone_weights_as_bytes(np.asarray(b_weights).reshape(-1, 4))
+
+        start_index = len(self.root.vertices)
+        n_vertices = len(positions)
+
+        # vertex and triangle indices of skins are 16 bit
+        if start_index + n_vertices > 0x10000:
+            raise ValueError('Skins can not reference more than 65536 vertices, the geoset would add vertices '
+                             '{} to {}.'.format(start_index, start_index + n_vertices - 1))
+
+        if tris.size and (tris.min() < 0 or tris.max() >= n_vertices):
+            raise ValueError('Triangles reference vertices out of the geoset range [0, {}).'.format(n_vertices))
+
+        if b_indices.size and (b_indices.min() < 0 or b_indices.max() > 0xFF):
+            raise ValueError('Bone indices must be in range [0, 255].')
+
+        submesh = M2SkinSubmesh()
+        skin = self.skins[0]
+
+        # get max bone influences per vertex, influences count must be at least 1
+        influences = np.count_nonzero((b_indices != 0) | (b_weights != 0), axis=1)
+        max_influences = max(int(influences.max(initial=0)), 1)
+
+        # localize bone indices
+        unique_bone_ids, local_b_indices = np.unique(b_indices, return_inverse=True)
+
+        submesh.bone_combo_index = len(self.root.bone_lookup_table)
+        submesh.bone_count = len(unique_bone_ids)
+        submesh.bone_influences = max_influences
+
+        self.root.bone_lookup_table.extend(unique_bone_ids.tolist())
+
+        # the skin supports at least as many bones as any of its submeshes uses, rounded up to a known client value
+        bone_count = len(unique_bone_ids)
+        skin.bone_count_max = max(skin.bone_count_max, next((value for value in BONE_COUNT_MAX_VALUES
+                                                             if value >= bone_count), bone_count))
+
+        # add vertices
+        vertices = np.zeros(n_vertices, dtype=M2Vertex.dtype)
+        vertices['pos'] = positions
+        vertices['normal'] = normals
+        vertices['tex_coords'] = uv
+        vertices['bone_weights'] = b_weights
+        vertices['bone_indices'] = b_indices
+
+        if uv2 is not None:
+            vertices['tex_coords2'] = uv2
+
+        self.root.vertices.extend(vertices)
+        skin.vertex_indices.extend(np.arange(start_index, start_index + n_vertices))
+        skin.bone_indices.extend(local_b_indices.reshape(-1, 4))
+
+        submesh.vertex_start = start_index
+        submesh.vertex_count = n_vertices
+        submesh.center_position = tuple(origin)
+
+        if self.version >= M2Versions.TBC:
+            submesh.sort_ceter_position = tuple(sort_pos)
+            submesh.sort_radius = sort_radius
+
+        submesh.skin_section_id = mesh_part_id
+        submesh.index_start = len(skin.triangle_indices)
+        submesh.index_count = tris.size
+
+        # add triangles
+        skin.triangle_indices.extend((tris + start_index).ravel())
+
+        geoset_index = skin.submeshes.add(submesh)
+
+        return geoset_index
+
+    @_in_parse_context
     def add_material_to_geoset(self, geoset_id, render_flags, blending, flags, shader_id, texture_lookup_id, tex_1_mapping, tex_2_mapping, priority_plane, mat_layer, tex_count, color_id, transparency_id, transform_id):  # TODO: Add extra params & cata +
         skin = self.skins[0]
         tex_unit = M2SkinTextureUnit()
@@ -493,6 +853,7 @@ class M2File:
             self.root.tex_unit_lookup_table.append(tex_2_mapping)
             tex_unit.texture_coord_combo_index = len(self.root.tex_unit_lookup_table) - 2
 
+    @_in_parse_context
     def add_texture(self, path, flags, tex_type):
 
         # check if this texture was already added
@@ -510,6 +871,7 @@ class M2File:
 
         return tex_id
     
+    @_in_parse_context
     def add_tex_lookup(self, texture1_lookup_id, texture2_lookup_id):
 
         tex_lookup_pair = (texture1_lookup_id, texture2_lookup_id)
@@ -525,6 +887,7 @@ class M2File:
        
         return tex_lookup_id           
 
+    @_in_parse_context
     def add_bone(self, pivot, key_bone_id, flags, parent_bone,submesh_id = 0, bone_name_crc = 0):
         m2_bone = M2CompBone()
         m2_bone.key_bone_id = key_bone_id
@@ -541,6 +904,7 @@ class M2File:
 
         return bone_id
 
+    @_in_parse_context
     def add_dummy_anim_set(self, origin):
         self.add_bone(tuple(origin), -1, 0, -1)
         self.add_anim(0, 0, (0, 888.77778), 0, 32, 32767, (0, 0), 150,
@@ -557,6 +921,7 @@ class M2File:
             pass
             # TODO: pre-wotlk
 
+    @_in_parse_context
     def add_anim(self, a_id, var_id, frame_bounds, movespeed, flags, frequency, replay, bl_time, bounds, var_next=None, alias_next=None):
         seq = M2Sequence()
         seq_id = self.root.sequences.add(seq)
@@ -590,6 +955,7 @@ class M2File:
 
         return seq_id
 
+    @_in_parse_context
     def add_bone_track(self, bone_id, trans, rot, scale):
         bone = self.root.bones[bone_id]
 
@@ -616,15 +982,11 @@ class M2File:
             bone.scale.values.extend(scale[1])
 
         else:
-            bone.rotation.timestamps.new().from_iterable(rot_ts)
-            bone.rotation.values.new().from_iterable(rot[1])
-
-            bone.translation.timestamps.new().from_iterable(trans_ts)
-            bone.translation.values.new().from_iterable(trans[1])
-
-            bone.scale.timestamps.new().from_iterable(scale_ts)
-            bone.scale.values.new().from_iterable(scale[1])
+            bone.set_rotation_sequence(len(bone.rotation.timestamps), rot_ts, rot[1])
+            bone.translation.set_sequence(len(bone.translation.timestamps), trans_ts, trans[1])
+            bone.scale.set_sequence(len(bone.scale.timestamps), scale_ts, scale[1])
 
+    @_in_parse_context
     def add_collision_mesh(self, vertices, faces, normals):
 
         # add collision geometry
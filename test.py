@@ -195,6 +195,79 @@ with Structs:
     ComplexTemplatedArrayStructParent_spec = ComplexTemplatedArrayStructParent % (SomeSimpleTemplatedStruct % int32)
     print(ComplexTemplatedArrayStructParent_spec.__name__, ComplexTemplatedArrayStructParent_spec._struct_token_string)
 
+    # read / write round-trip through the generated codecs
+    from io import BytesIO
+
+    d = StructD()
+    d.a, d.b, d.c = -5, 0.5, b'abcdefghij'
+    buf = BytesIO()
+    d.write(buf)
+    assert(len(buf.getvalue()) == StructD._struct_codec.size)
+
+    buf.seek(0)
+    d2 = StructD().read(buf)
+    assert((d2.a, d2.b, d2.c) == (-5, 0.5, b'abcdefghij'))
+
+    raw = bytes(range(ComplexTemplatedArrayStructParent_spec._struct_codec.size))
+    parent = ComplexTemplatedArrayStructParent_spec().read(BytesIO(raw))
+    assert(len(parent.a.a) == 2 and len(parent.b.a) == 2 and len(parent.b.b) == 10)
+    assert(isinstance(parent.b.a[1].a, int))
+
+    buf = BytesIO()
+    parent.write(buf)
+    assert(buf.getvalue() == raw)
+
+    raw = bytes(ArrayOfStructs._struct_codec.size)
+    arr = ArrayOfStructs().read(BytesIO(raw))
+    assert(len(arr.a) == 2 and len(arr.a[1]) == 2 and len(arr.a[1][0].a) == 10 and len(arr.a[1][0].a[9]) == 10)
+
+    buf = BytesIO()
+    arr.write(buf)
+    assert(buf.getvalue() == raw)
+
+    # declared byte order is honoured by the generated codec
+    class BigEndianStruct:
+        _struct_byte_order = '>'
+        a: uint16
+        b: int32[2]
+
+    buf = BytesIO()
+    be = BigEndianStruct()
+    be.a, be.b = 0x0102, [3, -4]
+    be.write(buf)
+    assert(buf.getvalue() == b'\x01\x02\x00\x00\x00\x03\xff\xff\xff\xfc')
+    assert(BigEndianStruct().read(BytesIO(buf.getvalue())).b == [3, -4])
+
+    try:
+        class MixedByteOrderStruct:
+            a: BigEndianStruct
+    except StructError:
+        # a little endian struct can't nest a big endian one, they share a single codec
+        pass
+    else:
+        assert False
+
+    # specialized codecs are cached next to the template definitions
+    assert(ArrayTemplatedType._struct_codec_definitions[(('T', int32),)] is array_templated_type_spec._struct_codec)
+
+with Structs(byte_order='>'):
+
+    class NetworkOrderStruct:
+        a: uint32
+
+    buf = BytesIO()
+    n = NetworkOrderStruct()
+    n.a = 1
+    n.write(buf)
+    assert(buf.getvalue() == b'\x00\x00\x00\x01')
+
+with Structs:
+
+    class DefaultOrderStruct:
+        a: uint32
+
+    assert(DefaultOrderStruct._struct_byte_order == '<')
+
 
 
 
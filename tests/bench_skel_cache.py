@@ -0,0 +1,82 @@
+""" Compare SkelFileCache hits with parsing the same bones and sequences, run with: python tests/bench_skel_cache.py """
+
+import os
+import tempfile
+import timeit
+
+import conftest  # noqa: F401, loads the pywowlib package
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.m2_format import M2CompQuaternion
+from pywowlib.file_formats.skel_format import SkelFile, _CachedSkel
+
+N_BONES, N_SEQUENCES, N_KEYS = 100, 40, 20
+
+
+def build_model_file(path):
+    m2 = M2File(2)
+
+    for i in range(N_BONES):
+        m2.add_bone((0, 0, i), -1, 0, i - 1)
+
+    m2.add_geoset([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 0, 1)] * 3, [(0, 0)] * 3, None, [(0, 1, 2)],
+                  [(0, 0, 0, 0)] * 3, [(255, 0, 0, 0)] * 3, (0, 0, 0), (0, 0, 0), 1.0, 0)
+
+    for i in range(N_SEQUENCES):
+        m2.add_anim(i, 0, (0, 1000), 0, 0x20, 32767, (0, 0), 150, (((0, 0, 0), (1, 1, 1)), 2.0))
+
+    for bone in m2.root.bones:
+        for name in ('translation', 'rotation', 'scale'):
+            track = getattr(bone, name)
+            track.interpolation_type = 1
+
+            for _ in range(N_SEQUENCES):
+                track.timestamps.new().values = list(range(0, N_KEYS * 50, 50))
+                track.values.new().values = [M2CompQuaternion((32767, 0, 0, 0))] * N_KEYS if name == 'rotation' \
+                    else [(1.0, 2.0, 3.0)] * N_KEYS
+
+    m2.write(path)
+
+
+def access_keys(bones):
+    for bone in bones:
+        for name in ('translation', 'rotation', 'scale'):
+            track = getattr(bone, name)
+
+            for timestamps, values in zip(track.timestamps, track.values):
+                len(timestamps.values), len(values.values)
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'bench.m2')
+    build_model_file(path)
+
+    model = M2File(2, path)
+    skel = SkelFile('bench.skel', shared=False)
+    skel.skb1.bones = model.root.bones
+    skel.sks1.sequences = model.root.sequences
+    entry = _CachedSkel(skel, model.context)
+
+    target = M2File(7)
+
+    def hit():
+        with target.context.activate():
+            target.context.reset()
+            return entry.view()
+
+    benchmarks = (
+        ('parse', lambda: M2File(2, path)),
+        ('cache hit', hit),
+        ('parse, every key array accessed', lambda: access_keys(M2File(2, path).root.bones)),
+        ('cache hit, every key array accessed', lambda: access_keys(hit().skb1.bones)),
+    )
+
+    print('{} bones, {} sequences, {} keys per sequence'.format(N_BONES, N_SEQUENCES, N_KEYS))
+
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=5, repeat=3)) / 5
+        print('{:40s} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import threading
+import importlib.util
+
+import pytest
+
+
+# the repository is the pywowlib package itself, load it under that name whatever the checkout directory is called
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'pywowlib' not in sys.modules:
+    _spec = importlib.util.spec_from_file_location('pywowlib', os.path.join(_root, '__init__.py'),
+                                                   submodule_search_locations=[_root])
+    sys.modules['pywowlib'] = _module = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_module)
+
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.m2_format import M2CompQuaternion
+from pywowlib.tools.dependency_resolver import normalize_identifier
+
+
+def build_model(n_sequences: int = 1) -> M2File:
+    """ Build a small WotLK model: two bones, a quad of two triangles, a texture and animated bone 1. """
+
+    m2 = M2File(2)
+
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+    m2.add_bone((0, 0, 1), -1, 0, 0)
+
+    m2.add_geoset([(0, 0, 0), (1, 0, 0), (0, 1, 0), (1, 1, 1)], [(0, 0, 1)] * 4, [(0, 0)] * 4, None,
+                  [(0, 1, 2), (1, 3, 2)], [(0, 1, 0, 0)] * 4, [(128, 127, 0, 0)] * 4, (0, 0, 0), (0, 0, 0), 1.0, 0)
+    m2.add_texture("textures\\test.blp", 0, 0)
+    m2.root.name.value = "test"
+
+    bone = m2.root.bones[1]
+    bone.translation.interpolation_type = 1
+    bone.rotation.interpolation_type = 1
+
+    for i in range(n_sequences):
+        m2.add_anim(i, 0, (0, 1000), 0, 0x20, 32767, (0, 0), 150, (((0, 0, 0), (1, 1, 1)), 2.0))
+
+        bone.translation.timestamps.new().values = [0, 500, 1000]
+        bone.translation.values.new().values = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (2.0, 0.0, 0.0)]
+        bone.rotation.timestamps.new().values = [0, 1000]
+        bone.rotation.values.new().values = [M2CompQuaternion((32767, 0, 0, 0)), M2CompQuaternion((23000, 23000, 0, 0))]
+        bone.scale.timestamps.new().values = [0]
+        bone.scale.values.new().values = [(1.0, 1.0, 1.0)]
+
+    return m2
+
+
+class FakeGameData:
+    """ WoWFileData stand-in serving archived files from a dict, recording the threads reading them and the
+        highest number of overlapping archive reads. files lists the (storage, is_archive) pairs walked by
+        asset_catalogue.walk_storage(), loose directories are looked up by has_file().
+    """
+
+    def __init__(self, contents, files=()):
+        self.contents = {normalize_identifier(path): data for path, data in contents.items()}
+        self.files = list(files)
+        self.listfile = {}
+        self.reads = []
+        self.max_concurrent_reads = 0
+
+        self._active_reads = 0
+        self._lock = threading.Lock()
+
+    def has_file(self, identifier):
+        for storage, is_archive in reversed(self.files):
+            if not is_archive and isinstance(identifier, str) and os.path.isfile(os.path.join(storage, identifier)):
+                return storage, False
+
+        return (self, True) if normalize_identifier(identifier) in self.contents else (None, None)
+
+    def read_file(self, identifier, file_format='unk', no_exc=False):
+        with self._lock:
+            self.reads.append((normalize_identifier(identifier), threading.get_ident()))
+            self._active_reads += 1
+            self.max_concurrent_reads = max(self.max_concurrent_reads, self._active_reads)
+
+        # keep the read in progress for a moment, so that overlapping reads would be noticed
+        time.sleep(0.001)
+
+        with self._lock:
+            self._active_reads -= 1
+
+        data = self.contents.get(normalize_identifier(identifier))
+        return (data, False) if data is not None else None
+
+    def guess_filepath(self, identifier, file_format):
+        return '{}.{}'.format(identifier, file_format)
+
+
+@pytest.fixture
+def model():
+    return build_model()
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / 'model.m2')
+    build_model(2).write(path)
+    return path
@@ -0,0 +1,79 @@
+import struct
+
+import numpy as np
+
+from pywowlib.file_formats.anim_format import AnimFile, AFSA
+from pywowlib.file_formats.wow_common_types import M2RawChunk
+from pywowlib.io_utils.types import ByteCursor, ByteWriter
+
+
+def _written(obj) -> bytes:
+    with ByteWriter() as f:
+        obj.write(f)
+
+        with f.getbuffer() as data:
+            return bytes(data)
+
+
+def _shares_memory(view, source: bytearray) -> bool:
+    return np.shares_memory(np.frombuffer(view, dtype=np.uint8), np.frombuffer(source, dtype=np.uint8))
+
+
+def test_old_anim_payload_is_a_view_of_the_source():
+    source = bytearray(range(64))
+    anim = AnimFile(old=True).read(ByteCursor(source))
+
+    with anim.raw_data.getbuffer() as payload:
+        assert _shares_memory(payload, source)
+
+    assert _written(anim) == bytes(source)
+
+
+def test_old_anim_from_a_file_object(tmp_path):
+    path = tmp_path / 'old.anim'
+    path.write_bytes(bytes(range(16)))
+
+    with open(str(path), 'rb') as f:
+        anim = AnimFile(old=True).read(f)
+
+    assert anim.raw_data.read(4) == bytes(range(4))
+    assert _written(anim) == bytes(range(16))
+
+
+def test_chunked_anim_round_trip():
+    data = b'AFM2' + struct.pack('<I', 4) + b'\1\2\3\4' + b'AFSA' + struct.pack('<I', 2) + b'\5\6' \
+        + b'AFSB' + struct.pack('<I', 3) + b'\7\10\11'
+    source = bytearray(data)
+
+    anim = AnimFile(split=True, old=False).read(ByteCursor(source))
+
+    assert anim.afm2.raw_data.read() == b'\1\2\3\4'
+    with anim.afsb.raw_data.getbuffer() as payload:
+        assert _shares_memory(payload, source) and bytes(payload) == b'\7\10\11'
+
+    assert _written(anim) == data
+
+
+def test_unexpected_chunk_of_an_unsplit_anim_is_kept():
+    data = b'AFM2' + struct.pack('<I', 1) + b'\1' + b'AFSA' + struct.pack('<I', 1) + b'\2'
+    anim = AnimFile(split=False, old=False).read(ByteCursor(data))
+
+    assert isinstance(anim.afsa, AFSA)
+    assert anim.afsa.raw_data.read() == b'\2'
+
+
+def test_raw_chunk_round_trip():
+    chunk = M2RawChunk()
+    chunk.magic = 'TEST'
+    chunk.raw_data.write(b'payload')
+
+    data = _written(chunk)
+    assert data == b'TEST' + struct.pack('<I', 7) + b'payload'
+
+    read = M2RawChunk()
+    cursor = ByteCursor(data)
+    cursor.read(4)
+    read.read(cursor)
+    read.magic = 'TEST'
+
+    assert _written(read) == data
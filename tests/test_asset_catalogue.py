@@ -0,0 +1,81 @@
+import os
+import struct
+
+import pytest
+
+from pywowlib.tools.asset_catalogue import AssetCatalogue, parse_asset, walk_storage
+
+from conftest import FakeGameData
+
+
+def _blp(width: int, height: int) -> bytes:
+    return b'BLP2' + bytes(8) + struct.pack('<II', width, height)
+
+
+@pytest.fixture
+def storage(model_path, tmp_path):
+    """ A client directory holding a model, its skin, its texture and a broken model. """
+
+    root = tmp_path / 'client'
+    (root / 'creature' / 'test').mkdir(parents=True)
+    (root / 'textures').mkdir()
+
+    for name in ('model.m2', 'model00.skin'):
+        with open(model_path.replace('model.m2', name), 'rb') as f:
+            (root / 'creature' / 'test' / name).write_bytes(f.read())
+
+    (root / 'textures' / 'test.blp').write_bytes(_blp(64, 32))
+    (root / 'creature' / 'test' / 'broken.m2').write_bytes(b'MD20' + bytes(8))
+
+    return root
+
+
+def _game_data(root):
+    contents = {}
+    for directory, _, filenames in os.walk(str(root)):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            with open(path, 'rb') as f:
+                contents[os.path.relpath(path, str(root))] = f.read()
+
+    return FakeGameData(contents, [(str(root), False)])
+
+
+def test_parse_asset():
+    info = parse_asset('a.blp', _blp(128, 64))
+    assert (info.type, info.texture_width, info.texture_height) == ('blp', 128, 64)
+
+    assert parse_asset('a.m2', b'MD20').error is not None
+    assert parse_asset('a.txt', b'').type == 'txt'
+
+
+def test_walk_storage_lists_catalogued_extensions(storage):
+    identifiers = walk_storage(_game_data(storage))
+    assert sorted(identifier.replace(os.sep, '\\') for identifier in identifiers) == \
+        ['creature\\test\\broken.m2', 'creature\\test\\model.m2', 'textures\\test.blp']
+
+
+def test_update_parses_changed_files_only(storage, tmp_path):
+    database = str(tmp_path / 'catalogue.db')
+    model = os.path.join('creature', 'test', 'model.m2')
+    texture = os.path.join('textures', 'test.blp')
+
+    with AssetCatalogue(database) as catalogue:
+        assert tuple(catalogue.update(_game_data(storage), max_workers=2)) == (3, 0, 0)
+
+        record = catalogue.get(model)
+        assert (record['type'], record['vertex_count'], record['error']) == ('m2', 4, None)
+        assert ('texture', 'textures\\test.blp') in catalogue.dependencies(model)
+        assert catalogue.dependents('textures\\test.blp') == [model]
+
+        assert catalogue.get(texture)['texture_width'] == 64
+        assert catalogue.get(os.path.join('creature', 'test', 'broken.m2'))['error'] is not None
+
+    # the catalogue is persistent: only changed files are parsed again, missing files are removed
+    (storage / 'textures' / 'test.blp').write_bytes(_blp(256, 256))
+    (storage / 'creature' / 'test' / 'broken.m2').unlink()
+
+    with AssetCatalogue(database) as catalogue:
+        assert tuple(catalogue.update(_game_data(storage), max_workers=2)) == (1, 1, 1)
+        assert catalogue.get(texture)['texture_width'] == 256
+        assert catalogue.get(os.path.join('creature', 'test', 'broken.m2')) is None
@@ -0,0 +1,53 @@
+import io
+import struct
+
+from pywowlib.io_utils.types import ByteCursor
+from pywowlib.m2_file import M2File
+
+
+def test_cursor_follows_the_file_protocol():
+    data = bytes(range(16))
+    cursor, f = ByteCursor(data), io.BytesIO(data)
+
+    for op in (lambda s: s.read(3), lambda s: s.seek(2, 1), lambda s: s.read(4), lambda s: s.tell(),
+               lambda s: s.seek(-2, 2), lambda s: s.read(), lambda s: s.read(5), lambda s: s.seek(0)):
+        assert op(cursor) == op(f)
+
+
+def test_typed_reads_and_views():
+    data = bytearray(struct.pack('<IH', 7, 3) + b'name\0rest')
+    cursor = ByteCursor(data)
+
+    assert cursor.unpack(struct.Struct('<I')) == (7,)
+    assert cursor.unpack_from(struct.Struct('<H'), 4) == (3,) and cursor.tell() == 4
+    assert cursor.cstring(6) == b'name' and cursor.cstring(11) == b'rest'
+
+    cursor.seek(6)
+    view = cursor.view(4)
+    data[6] = ord('N')
+    assert bytes(view) == b'Name' and cursor.tell() == 10
+
+
+def test_sub_cursors_behave_like_separate_files():
+    cursor = ByteCursor(b'head' + b'abc\0de' + b'tail')
+    cursor.read(4)
+
+    sub = cursor.sub(6)
+    assert cursor.tell() == 10 and len(sub) == 6
+    assert sub.read(3) == b'abc' and sub.tell() == 3
+    assert sub.cstring(4) == b'de'
+    assert sub.seek(0, 2) == 6 and sub.read() == b''
+
+    assert ByteCursor.of(io.BytesIO(b'xyz'), 2).read() == b'xy'
+
+
+def test_file_and_buffer_reads_match(model_path):
+    with open(model_path, 'rb') as f:
+        data = f.read()
+
+    from_path = M2File(2, model_path)
+    from_buffer = M2File(2)
+    from_buffer.read(data=data)
+
+    assert from_buffer.root.name.value == from_path.root.name.value == 'test'
+    assert [v.pos for v in from_buffer.root.vertices] == [v.pos for v in from_path.root.vertices]
@@ -0,0 +1,69 @@
+import io
+import struct
+
+from pywowlib.file_formats.m2_format import M2String
+from pywowlib.file_formats.wow_common_types import MemoryManager
+from pywowlib.io_utils.types import ByteCursor, ByteWriter
+from pywowlib.m2_file import M2File
+
+
+def test_writer_follows_the_file_protocol():
+    writer, f = ByteWriter(), io.BytesIO()
+
+    for target in (writer, f):
+        target.write(b'abc')
+        target.seek(6)
+        target.write(b'gh')                                          # leaves a zero-filled gap
+        target.seek(1)
+        target.write(b'B')
+        target.seek(0, 2)
+
+    assert writer.getvalue() == f.getvalue() == b'aBc\0\0\0gh'
+    assert writer.tell() == f.tell() == len(writer) == 8
+
+    writer.pack(struct.Struct('<H'), 0x0102)
+    assert writer.getvalue()[8:] == b'\2\1'
+
+
+def test_memory_manager_matches_a_regular_file():
+    writer, f = ByteWriter(), io.BytesIO()
+
+    for target in (writer, f):
+        target.write(b'header')
+        ofs = MemoryManager.ofs_request(target)
+        target.seek(ofs)
+        MemoryManager.mem_reserve(target, 5)
+        target.write(b'data')
+        assert target.tell() == 20 and ofs == 16
+
+    assert writer.getvalue() == f.getvalue()
+
+
+def test_model_is_written_like_into_a_regular_file(model_path, tmp_path):
+    m2 = M2File(2, model_path)
+    f = io.BytesIO()
+    m2.root.write(f)
+
+    path = str(tmp_path / 'written.m2')
+    m2.write(path)
+
+    with open(path, 'rb') as written:
+        data = written.read()
+
+    # the buffered writer only appends the final alignment padding
+    assert data.rstrip(b'\0') == f.getvalue().rstrip(b'\0') and len(data) % 16 == 0
+    assert m2.root.name.value == 'test'
+
+
+def test_string_round_trip():
+    string = M2String()
+    string.value = 'name'
+
+    f = ByteWriter()
+    f.write(bytes(8))
+    f.seek(0)
+    string.write(f)
+    assert string.value == 'name'
+
+    read = M2String().read(ByteCursor(f.getvalue()))
+    assert read.value == 'name'
@@ -0,0 +1,75 @@
+import struct
+import threading
+
+import pytest
+
+from pywowlib.tools.dependency_resolver import DependencyGraph, DependencyResolver
+
+from conftest import FakeGameData
+
+
+@pytest.fixture
+def game_data(model_path):
+    with open(model_path, 'rb') as f:
+        model = f.read()
+
+    with open(model_path.replace('.m2', '00.skin'), 'rb') as f:
+        skin = f.read()
+
+    blp = b'BLP2' + bytes(8) + struct.pack('<II', 64, 32)
+
+    return FakeGameData({'creature\\test\\model.m2': model, 'creature\\test\\model00.skin': skin,
+                         'textures\\test.blp': blp})
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_resolve_and_prefetch(game_data, max_workers):
+    resolver = DependencyResolver(game_data, max_workers=max_workers)
+    graph = resolver.resolve(['Creature/Test/Model.mdx', 'missing.m2'])
+    skins = ['creature\\test\\model{:02d}.skin'.format(i) for i in range(3)]      # skin profiles of the header
+
+    assert graph.roots == ['creature\\test\\model.m2', 'missing.m2']
+    assert graph.missing == {'missing.m2'}
+    assert not graph.errors
+    assert set(graph.dependencies('creature\\test\\model.m2')) == {'textures\\test.blp', *skins}
+    assert graph.nodes['textures\\test.blp'] == 'blp'
+    assert graph.nodes['creature\\test\\model00.skin'] == 'skin'
+
+    # containers are read by the thread using the resolver
+    assert {thread for _, thread in game_data.reads} == {threading.get_ident()}
+
+    data = resolver.prefetch(graph)
+    assert set(data) == {'creature\\test\\model.m2', 'creature\\test\\model00.skin', 'textures\\test.blp'}
+    assert graph.missing == {'missing.m2', *skins[1:]}
+
+    # every archived file is read once, never by two threads at a time
+    identifiers = [identifier for identifier, _ in game_data.reads]
+    assert len(identifiers) == len(set(identifiers)) == 3
+    assert game_data.max_concurrent_reads == 1
+
+
+def test_prefetch_reads_loose_files_concurrently(tmp_path):
+    loose = ['a.blp', 'b.blp', 'c.blp']
+    for name in loose:
+        (tmp_path / name).write_bytes(name.encode())
+
+    game_data = FakeGameData({'d.blp': b'd'}, [(str(tmp_path), False)])
+    resolver = DependencyResolver(game_data, max_workers=3)
+
+    # every loose read waits for the other two, they only get past the barrier if all three run at once
+    barrier = threading.Barrier(len(loose), timeout=10)
+    read_loose = resolver._read_loose
+
+    def read_together(filepath):
+        barrier.wait()
+        return read_loose(filepath)
+
+    resolver._read_loose = read_together
+
+    graph = DependencyGraph()
+    graph.nodes = {name: 'blp' for name in loose + ['d.blp', 'e.blp']}
+    data = resolver.prefetch(graph)
+
+    assert data == {'a.blp': b'a.blp', 'b.blp': b'b.blp', 'c.blp': b'c.blp', 'd.blp': b'd'}
+    assert graph.missing == {'e.blp'}
+    assert [identifier for identifier, _ in game_data.reads] == ['d.blp']
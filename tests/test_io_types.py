@@ -0,0 +1,42 @@
+import io
+import struct
+
+import pytest
+
+from pywowlib.io_utils.types import ByteCursor, uint8, int16, uint32, float32, vec3D, char
+
+
+@pytest.mark.parametrize('type_, values', [
+    (uint8, [0, 1, 255]),
+    (int16, [-32768, 0, 32767]),
+    (uint32, [0, 0xFFFFFFFF, 7]),
+    (float32, [0.5, -1.0, 2.25]),
+    (vec3D, [(0.0, 1.0, 2.0), (-1.5, 0.25, 8.0)]),
+])
+def test_read_many_and_write_many_match_single_values(type_, values):
+    single = io.BytesIO()
+    for value in values:
+        type_.write(single, value)
+
+    bulk = io.BytesIO()
+    type_.write_many(bulk, values)
+    assert bulk.getvalue() == single.getvalue()
+
+    for source in (io.BytesIO(bulk.getvalue()), ByteCursor(bulk.getvalue())):
+        assert type_.read_many(source, len(values)) == values
+        assert source.tell() == len(bulk.getvalue())
+
+
+def test_empty_and_character_arrays():
+    f = io.BytesIO()
+    uint32.write_many(f, [])
+    char.write_many(f, [b'a', b'b'])
+
+    assert f.getvalue() == b'ab'
+    assert uint32.read_many(io.BytesIO(), 0) == []
+
+
+def test_codecs_are_little_endian():
+    f = io.BytesIO()
+    uint32.write_many(f, [1, 2])
+    assert f.getvalue() == struct.pack('<II', 1, 2)
@@ -0,0 +1,66 @@
+import shutil
+import struct
+
+import pytest
+
+from pywowlib.m2_file import M2File
+
+
+def _keys(m2):
+    translation = m2.root.bones[1].translation
+    return [(list(timestamps), [tuple(value) for value in values])
+            for timestamps, values in zip(translation.timestamps, translation.values)]
+
+
+@pytest.fixture
+def external_model(model_path, tmp_path):
+    """ The model with its sequences moved to .anim files. Each .anim file is a copy of the model itself,
+        so the track offsets stored in the header point to the same keys.
+    """
+
+    with open(model_path, 'rb') as f:
+        data = bytearray(f.read())
+
+    m2 = M2File(2, model_path)
+    for i in range(len(m2.root.sequences)):
+        struct.pack_into('<I', data, m2.root.sequences.ofs_elements + i * 0x40 + 12, 0)
+
+    path = tmp_path / 'external.m2'
+    path.write_bytes(bytes(data))
+    shutil.copy(model_path.replace('model.m2', 'model00.skin'), str(tmp_path / 'external00.skin'))
+
+    anim_paths = {}
+    for sequence in m2.root.sequences:
+        anim_path = tmp_path / 'external{:04d}-00.anim'.format(sequence.id)
+        anim_path.write_bytes(bytes(data))
+        anim_paths[sequence.id, sequence.variation_index] = str(anim_path)
+
+    return str(path), anim_paths, _keys(m2)
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_anim_files_are_loaded(external_model, max_workers):
+    path, anim_paths, expected = external_model
+
+    m2 = M2File(2, path)
+    assert all(not timestamps for timestamps, _ in _keys(m2))
+
+    m2.read_additional_files([path.replace('.m2', '00.skin')], anim_paths, max_workers=max_workers)
+    assert _keys(m2) == expected
+
+
+def test_subset_of_sequences(external_model):
+    path, anim_paths, expected = external_model
+
+    m2 = M2File(2, path)
+    m2.read_additional_files([path.replace('.m2', '00.skin')], anim_paths, sequence_ids={1})
+
+    assert _keys(m2) == [([], []), expected[1]]
+
+
+def test_missing_anim_file(external_model):
+    path, anim_paths, _ = external_model
+    anim_paths = {key: value + '.missing' for key, value in anim_paths.items()}
+
+    with pytest.raises(FileNotFoundError):
+        M2File(2, path).read_additional_files([path.replace('.m2', '00.skin')], anim_paths)
@@ -0,0 +1,106 @@
+import copy
+
+import numpy as np
+import pytest
+
+from pywowlib.m2_file import M2File
+from pywowlib.tools.m2_bone_partitioning import partition_skin, partition_triangles, triangle_bones
+
+
+def _strip_model(n_bones: int) -> M2File:
+    """ A strip of quads, quad i skinned to bones i and i + 1. """
+
+    m2 = M2File(2)
+
+    for i in range(n_bones):
+        m2.add_bone((i, 0, 0), -1, 0, i - 1)
+
+    n_quads = n_bones - 1
+    positions = np.array([(x, y, 0.0) for x in range(n_quads + 1) for y in range(2)], dtype=np.float32)
+    cells = np.arange(n_quads) * 2
+    tris = np.concatenate((np.stack((cells, cells + 2, cells + 1), axis=1),
+                           np.stack((cells + 1, cells + 2, cells + 3), axis=1)))
+
+    b_indices = np.zeros((len(positions), 4), dtype=np.int64)
+    b_indices[:, 0] = np.arange(len(positions)) // 2
+    b_weights = np.zeros((len(positions), 4), dtype=np.uint8)
+    b_weights[:, 0] = 255
+
+    m2.add_geoset_arrays(positions, np.tile((0.0, 0.0, 1.0), (len(positions), 1)), positions[:, :2], None, tris,
+                         b_indices, b_weights, (0, 0, 0), (0, 0, 0), 1.0, 0)
+    return m2
+
+
+def _skinned_bones(m2, skin):
+    """ Model bones of each skin vertex, resolved through the bone lookup ranges of its submesh. """
+
+    lookup = list(m2.root.bone_lookup_table)
+    bones = {}
+
+    for submesh in skin.submeshes:
+        for i in range(submesh.vertex_start, submesh.vertex_start + submesh.vertex_count):
+            bones[i] = lookup[submesh.bone_combo_index + int(skin.bone_indices.values[i][0])]
+            assert bones[i] in lookup[submesh.bone_combo_index:submesh.bone_combo_index + submesh.bone_count]
+
+    return [bones[i] for i in range(len(bones))]
+
+
+def test_partitions_respect_the_bone_limit():
+    bones = triangle_bones(np.array([[0, 1, 2], [2, 3, 4]]), np.arange(5)[:, None] * np.array([1, 0, 0, 0]),
+                           np.array([[255, 0, 0, 0]] * 5))
+    assert partition_triangles(bones, 3).tolist() == [0, 1]
+    assert partition_triangles(bones, 5).tolist() == [0, 0]
+
+    with pytest.raises(ValueError):
+        partition_triangles(bones, 2)
+
+
+def test_partition_skin_keeps_vertex_bones():
+    m2 = _strip_model(10)
+    skin = partition_skin(m2, m2.skins[0], max_bones=4)
+
+    assert len(skin.submeshes) > 1
+    assert all(submesh.bone_count <= 4 for submesh in skin.submeshes)
+
+    vertex_bones = np.asarray(m2.root.vertices.values['bone_indices'])[:, 0]
+    assert _skinned_bones(m2, skin) == vertex_bones[np.asarray(skin.vertex_indices.values)].tolist()
+
+
+def test_repeated_partitioning_keeps_the_lookup_table_size():
+    m2 = _strip_model(10)
+
+    m2.partition_skin_bones(max_bones=4)
+    lookup = list(m2.root.bone_lookup_table)
+    submeshes = [(submesh.bone_combo_index, submesh.bone_count) for submesh in m2.skins[0].submeshes]
+
+    m2.partition_skin_bones(max_bones=4)
+    assert list(m2.root.bone_lookup_table) == lookup
+    assert [(submesh.bone_combo_index, submesh.bone_count) for submesh in m2.skins[0].submeshes] == submeshes
+
+    # partitioning a single skin again reuses the ranges already in the table
+    partition_skin(m2, m2.skins[0], max_bones=4)
+    assert list(m2.root.bone_lookup_table) == lookup
+
+
+def test_partitioning_rejects_too_many_vertices():
+    m2 = _strip_model(2)
+    skin = m2.skins[0]
+
+    # two submeshes over the same range of 40000 vertices, each part gets its own copy of them
+    skin.vertex_indices.values = np.zeros(40000, dtype=np.uint16)
+    skin.bone_indices.values = np.zeros((40000, 4), dtype=np.uint8)
+    skin.triangle_indices.values = np.arange(39999, dtype=np.uint16)
+
+    submesh = skin.submeshes[0]
+    submesh.vertex_count, submesh.index_count = 40000, 39999
+    skin.submeshes.append(copy.copy(submesh))
+
+    lookup = list(m2.root.bone_lookup_table)
+
+    with pytest.raises(ValueError):
+        partition_skin(m2, skin)
+
+    with pytest.raises(ValueError):
+        m2.partition_skin_bones()
+
+    assert list(m2.root.bone_lookup_table) == lookup and m2.skins[0] is skin
@@ -0,0 +1,72 @@
+import pickle
+
+import numpy as np
+
+from pywowlib.tools.m2_bounds import compute_bounds, points_bounds, skin_positions
+from pywowlib.tools.m2_pose import M2PoseEvaluator
+
+from conftest import build_model
+
+
+def _brute_force_points(m2, sequence_index, times):
+    world = M2PoseEvaluator(m2).evaluate(sequence_index, times)
+    points = []
+
+    for vertex in m2.root.vertices:
+        weights = np.array(vertex.bone_weights) / 255.0
+
+        for t in range(len(times)):
+            matrix = sum(weights[k] * world[t, vertex.bone_indices[k]] for k in range(4))
+            points.append((matrix @ np.append(vertex.pos, 1.0))[:3])
+
+    return np.array(points)
+
+
+def test_skin_positions_matches_per_vertex_skinning(model):
+    times = np.linspace(0.0, 1000.0, 7)
+    world = M2PoseEvaluator(model).evaluate(0, times)
+
+    vertices = model.root.vertices
+    positions = np.array([v.pos for v in vertices], dtype=np.float64)
+    bone_indices = np.array([v.bone_indices for v in vertices])
+    bone_weights = np.array([v.bone_weights for v in vertices]) / 255.0
+
+    skinned = skin_positions(positions, bone_indices, bone_weights, world)
+    expected = _brute_force_points(model, 0, times).reshape(len(positions), len(times), 3).transpose(1, 0, 2)
+
+    assert np.allclose(skinned, expected, atol=1e-5)
+
+
+def test_compute_bounds_writes_sequence_and_header_bounds(model):
+    time_step = 1000 / 30
+    (min_, max_, radius), = compute_bounds(model, time_step)
+
+    times = np.append(np.arange(0.0, 1000.0, time_step), 1000.0)
+    expected_min, expected_max, expected_radius = points_bounds(_brute_force_points(model, 0, times))
+
+    assert np.allclose(min_, expected_min, atol=1e-5) and np.allclose(max_, expected_max, atol=1e-5)
+    assert np.isclose(radius, expected_radius, atol=1e-5)
+
+    bounds = model.root.sequences[0].bounds
+    assert np.allclose(bounds.extent.min, min_) and np.isclose(bounds.radius, radius)
+    assert np.allclose(model.root.bounding_box.min, min_) and np.allclose(model.root.bounding_box.max, max_)
+
+
+def test_pickled_evaluator_does_not_need_the_model(model):
+    evaluator = M2PoseEvaluator(model)
+    restored = pickle.loads(pickle.dumps(evaluator))
+
+    assert restored.m2 is None and restored.bones is None
+    assert np.allclose(restored.evaluate(0, [0.0, 400.0, 1000.0]), evaluator.evaluate(0, [0.0, 400.0, 1000.0]))
+
+
+def test_process_pool_matches_serial_bounds():
+    m2 = build_model(3)
+    m2.root.bones[1].translation.values[2].values = [(0.0, 0.0, 0.0), (0.0, 5.0, 0.0), (0.0, 0.0, 3.0)]
+
+    serial = compute_bounds(m2, max_workers=1)
+    pooled = compute_bounds(m2, max_workers=2)
+
+    assert np.allclose(np.array([min_ + max_ + (radius,) for min_, max_, radius in pooled]),
+                       np.array([min_ + max_ + (radius,) for min_, max_, radius in serial]))
+    assert serial[2] != serial[0]
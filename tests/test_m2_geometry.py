@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.wow_common_types import as_numpy
+from pywowlib.io_utils.types import uint16
+
+
+def _grid(n: int):
+    x, y = np.meshgrid(np.arange(n, dtype=np.float32), np.arange(n, dtype=np.float32))
+    positions = np.stack((x.ravel(), y.ravel(), np.zeros(n * n, dtype=np.float32)), axis=1)
+
+    cells = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None, :]).ravel()
+    tris = np.concatenate((np.stack((cells, cells + 1, cells + n), axis=1),
+                           np.stack((cells + 1, cells + n + 1, cells + n), axis=1)))
+
+    return positions, tris
+
+
+def _add_grid(m2: M2File, n: int = 4, b_weights=None):
+    positions, tris = _grid(n)
+    n_vertices = len(positions)
+
+    normals = np.tile((0.0, 0.0, 1.0), (n_vertices, 1))
+    uv = positions[:, :2] / n
+    b_indices = np.zeros((n_vertices, 4), dtype=np.int64)
+    b_indices[:, 0] = np.arange(n_vertices) % 2
+
+    if b_weights is None:
+        b_weights = np.zeros((n_vertices, 4), dtype=np.uint8)
+        b_weights[:, 0] = 255
+
+    return m2.add_geoset_arrays(positions, normals, uv, None, tris, b_indices, b_weights,
+                                (0, 0, 0), (0, 0, 0), 1.0, 0), positions, tris
+
+
+def test_add_geoset_arrays_matches_add_geoset(tmp_path):
+    positions, tris = _grid(4)
+    n_vertices = len(positions)
+    normals = [(0.0, 0.0, 1.0)] * n_vertices
+    uv = (positions[:, :2] / 4).tolist()
+    b_indices = [(i % 2, 0, 0, 0) for i in range(n_vertices)]
+    b_weights = [(255, 0, 0, 0)] * n_vertices
+
+    listed = M2File(2)
+    listed.add_bone((0, 0, 0), -1, 0, -1)
+    listed.add_bone((0, 0, 1), -1, 0, 0)
+    listed.add_geoset(positions.tolist(), normals, uv, None, tris.tolist(), b_indices, b_weights,
+                      (0, 0, 0), (0, 0, 0), 1.0, 0)
+
+    arrays = M2File(2)
+    arrays.add_bone((0, 0, 0), -1, 0, -1)
+    arrays.add_bone((0, 0, 1), -1, 0, 0)
+    arrays.add_geoset_arrays(positions, normals, uv, None, tris, b_indices, b_weights, (0, 0, 0), (0, 0, 0), 1.0, 0)
+
+    listed.write(str(tmp_path / 'listed.m2'))
+    arrays.write(str(tmp_path / 'arrays.m2'))
+
+    for name in ('.m2', '00.skin'):
+        assert (tmp_path / ('listed' + name)).read_bytes() == (tmp_path / ('arrays' + name)).read_bytes()
+
+
+def test_add_geoset_arrays_round_trip(tmp_path):
+    m2 = M2File(2)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+    m2.add_bone((0, 0, 1), -1, 0, 0)
+    _, positions, tris = _add_grid(m2, 8)
+
+    path = str(tmp_path / 'grid.m2')
+    m2.write(path)
+
+    read = M2File(2, path, use_numpy=True)
+    read.read_additional_files([str(tmp_path / 'grid00.skin')], {})
+
+    assert np.array_equal(read.root.vertices.values['pos'], positions)
+    assert np.array_equal(read.skins[0].triangle_indices.values, tris.ravel())
+    assert read.skins[0].submeshes[0].bone_count == 2
+
+
+def test_float_bone_weights_are_scaled_to_bytes():
+    m2 = M2File(2)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+
+    b_weights = np.zeros((16, 4))
+    b_weights[:, :3] = 1 / 3
+    _add_grid(m2, 4, b_weights)
+
+    weights = m2.root.vertices.values['bone_weights']
+    assert np.array_equal(weights[0], (85, 85, 85, 0))
+    assert (weights.sum(axis=1) == 255).all()
+
+    with pytest.raises(ValueError):
+        _add_grid(m2, 4, np.full((16, 4), 2.0))
+
+
+def test_too_many_vertices_raise():
+    m2 = M2File(2)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+    _add_grid(m2, 200)
+
+    # 40000 + 40000 vertices can not be indexed by 16 bit skin indices
+    with pytest.raises(ValueError):
+        _add_grid(m2, 200)
+
+    assert len(m2.root.vertices) == 40000
+
+
+def test_invalid_triangles_and_bones_raise():
+    m2 = M2File(2)
+    positions, tris = _grid(3)
+    n_vertices = len(positions)
+    arguments = (np.zeros((n_vertices, 3)), np.zeros((n_vertices, 2)), None)
+
+    with pytest.raises(ValueError):
+        m2.add_geoset_arrays(positions, *arguments, tris + 1, np.zeros((n_vertices, 4), dtype=int),
+                             np.zeros((n_vertices, 4), dtype=np.uint8), (0, 0, 0), (0, 0, 0), 1.0, 0)
+
+    with pytest.raises(ValueError):
+        m2.add_geoset_arrays(positions, *arguments, tris, np.full((n_vertices, 4), 256),
+                             np.zeros((n_vertices, 4), dtype=np.uint8), (0, 0, 0), (0, 0, 0), 1.0, 0)
+
+
+def test_as_numpy_rejects_values_out_of_range():
+    assert as_numpy(np.array([0, 65535]), uint16).dtype == np.uint16
+
+    with pytest.raises(ValueError):
+        as_numpy(np.array([0, 65536]), uint16)
+
+    with pytest.raises(ValueError):
+        as_numpy([-1], uint16)
+
+
+def test_skins_above_65535_indices_round_trip(tmp_path):
+    m2 = M2File(2)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+    m2.add_bone((0, 0, 1), -1, 0, 0)
+
+    # 3 geosets of 2 * 99 * 99 triangles, the last one starts past index 65535
+    grids = [_add_grid(m2, 100)[2] for _ in range(3)]
+
+    path = str(tmp_path / 'large.m2')
+    m2.write(path)
+
+    read = M2File(2, path, use_numpy=True)
+    read.read_additional_files([str(tmp_path / 'large00.skin')], {})
+    skin = read.skins[0]
+
+    n_indices = grids[0].size
+    assert [submesh.index_start for submesh in skin.submeshes] == [0, n_indices, 2 * n_indices]
+    assert [submesh.level for submesh in skin.submeshes] == [0, 0, 1]
+
+    for submesh, tris in zip(skin.submeshes, grids):
+        indices = skin.triangle_indices.values[submesh.index_start:submesh.index_start + submesh.index_count]
+        assert np.array_equal(indices, tris.ravel() + submesh.vertex_start)
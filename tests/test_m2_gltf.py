@@ -0,0 +1,107 @@
+import json
+import struct
+
+import numpy as np
+
+from pywowlib.tools.m2_gltf import GLBWriter, GLB_MAGIC, GLB_CHUNK_JSON, GLB_CHUNK_BIN, FLOAT
+from pywowlib.tools.m2_pose import M2PoseEvaluator
+
+
+def _read_glb(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, length = struct.unpack_from('<III', data)
+    assert (magic, version, length) == (GLB_MAGIC, 2, len(data))
+
+    json_length, chunk_type = struct.unpack_from('<II', data, 12)
+    assert chunk_type == GLB_CHUNK_JSON and json_length % 4 == 0
+    gltf = json.loads(data[20:20 + json_length])
+
+    bin_length, chunk_type = struct.unpack_from('<II', data, 20 + json_length)
+    assert chunk_type == GLB_CHUNK_BIN and bin_length == gltf['buffers'][0]['byteLength']
+    binary = data[28 + json_length:]
+    assert len(binary) == bin_length
+
+    return gltf, binary
+
+
+def _accessor(gltf, binary, index):
+    """ Read a float accessor of a tightly packed buffer view. """
+
+    accessor = gltf['accessors'][index]
+    view = gltf['bufferViews'][accessor['bufferView']]
+    assert accessor['componentType'] == FLOAT
+
+    n_components = {'SCALAR': 1, 'VEC3': 3, 'VEC4': 4, 'MAT4': 16}[accessor['type']]
+    values = np.frombuffer(binary, dtype='<f4', count=accessor['count'] * n_components,
+                           offset=view['byteOffset'] + accessor.get('byteOffset', 0))
+
+    return values.reshape(accessor['count'], n_components)
+
+
+def test_writer_spools_blobs_to_a_file(tmp_path):
+    path = str(tmp_path / 'blobs.glb')
+
+    with GLBWriter() as writer:
+        first = writer.add_view(np.arange(3, dtype=np.uint16))
+        second = writer.add_array(np.array([(1.0, 2.0, 3.0)]), 'VEC3')
+
+        # blobs are on disk as soon as they are added, padded to 4 bytes
+        assert writer.spool.tell() == writer.size == 8 + 12
+
+        writer.write(path)
+
+    assert writer.spool.closed
+    gltf, binary = _read_glb(path)
+
+    assert gltf['bufferViews'][first] == {'buffer': 0, 'byteOffset': 0, 'byteLength': 6}
+    assert binary[:8] == np.arange(3, dtype='<u2').tobytes() + b'\0\0'
+    assert _accessor(gltf, binary, second).tolist() == [[1.0, 2.0, 3.0]]
+
+
+def test_export_glb(model, tmp_path):
+    path = str(tmp_path / 'model.glb')
+    model.export_glb(path)
+    gltf, binary = _read_glb(path)
+
+    # mesh: the quad of the model, indexed through the skin
+    primitive = gltf['meshes'][0]['primitives'][0]
+    positions = gltf['accessors'][primitive['attributes']['POSITION']]
+    assert positions['count'] == 4 and positions['min'] == [0, 0, 0] and positions['max'] == [1, 1, 1]
+
+    indices = gltf['accessors'][primitive['indices']]
+    view = gltf['bufferViews'][indices['bufferView']]
+    triangles = np.frombuffer(binary, dtype='<u2', count=indices['count'], offset=view['byteOffset'])
+    assert triangles.tolist() == [0, 1, 2, 1, 3, 2]
+
+    # skeleton: bone 1 is a child of bone 0, placed at its pivot
+    joints = gltf['skins'][0]['joints']
+    assert gltf['nodes'][joints[0]]['children'] == [joints[1]]
+    assert gltf['nodes'][joints[1]]['translation'] == [0, 0, 1]
+
+    # animation: the translation keys of bone 1, offset by its pivot relative to its parent
+    animation, = gltf['animations']
+    channels = {channel['target']['path']: channel for channel in animation['channels']
+                if channel['target']['node'] == joints[1]}
+    assert set(channels) == {'translation', 'rotation', 'scale'}
+
+    sampler = animation['samplers'][channels['translation']['sampler']]
+    assert sampler['interpolation'] == 'LINEAR'
+    assert np.allclose(_accessor(gltf, binary, sampler['input']).ravel(), [0.0, 0.5, 1.0])
+    assert np.allclose(_accessor(gltf, binary, sampler['output']), [(0, 0, 1), (1, 0, 1), (2, 0, 1)])
+
+    # rotations are unit (x, y, z, w) quaternions matching the pose evaluator
+    sampler = animation['samplers'][channels['rotation']['sampler']]
+    _, rotations, _ = M2PoseEvaluator(model).track_keys(1, 'rotation', 0)
+    expected = rotations[:, [1, 2, 3, 0]] / np.linalg.norm(rotations, axis=1, keepdims=True)
+    assert np.allclose(_accessor(gltf, binary, sampler['output']), expected, atol=1e-6)
+
+
+def test_export_glb_without_animations(model, tmp_path):
+    path = str(tmp_path / 'static.glb')
+    model.export_glb(path, animations=False)
+    gltf, _ = _read_glb(path)
+
+    assert 'animations' not in gltf
+    assert len(gltf['skins'][0]['joints']) == 2
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from pywowlib.m2_file import M2File
+from pywowlib.tools import m2_index_optimizer
+from pywowlib.tools.m2_index_optimizer import optimize_vertex_cache, optimize_skin, average_cache_miss_ratio
+
+
+def _grid_triangles(n: int, seed: int = 0) -> np.ndarray:
+    """ Triangles of an n x n grid of quads, in random order. """
+
+    index = np.arange((n + 1) ** 2).reshape(n + 1, n + 1)
+    a, b, c, d = index[:-1, :-1].ravel(), index[:-1, 1:].ravel(), index[1:, :-1].ravel(), index[1:, 1:].ravel()
+    triangles = np.concatenate((np.stack((a, b, c), axis=1), np.stack((b, d, c), axis=1)))
+
+    return triangles[np.random.default_rng(seed).permutation(len(triangles))]
+
+
+def test_vertex_cache_order_is_a_permutation_improving_the_miss_ratio():
+    triangles = _grid_triangles(40)
+    order, cluster_starts = optimize_vertex_cache(triangles)
+
+    assert sorted(order.tolist()) == list(range(len(triangles)))
+    assert cluster_starts[0] and cluster_starts.dtype == bool
+    assert average_cache_miss_ratio(triangles[order]) < 0.5 * average_cache_miss_ratio(triangles)
+
+
+@pytest.mark.skipif(m2_index_optimizer._optimize_vertex_cache_native is None,
+                    reason="vertex_cache extension is not built")
+def test_native_and_python_orders_match():
+    triangles = np.concatenate((_grid_triangles(20, 1), [[3, 3, 4], [5, 6, 7]]))
+    table = m2_index_optimizer._score_table(16)
+
+    native = m2_index_optimizer._optimize_vertex_cache_native(triangles, 21 ** 2, 16, table)
+    python = m2_index_optimizer._optimize_vertex_cache_python(triangles, 21 ** 2, 16)
+
+    assert np.array_equal(native[0], python[0])
+    assert np.array_equal(native[1], python[1])
+
+
+def _skin_triangles(model):
+    skin = model.skins[0]
+    vertex_indices = np.asarray(skin.vertex_indices.values)
+    return sorted(tuple(sorted(vertex_indices[list(triangle)])) for triangle in
+                  np.asarray(skin.triangle_indices.values).reshape(-1, 3))
+
+
+def test_optimize_skin_keeps_the_mesh(model):
+    before = _skin_triangles(model)
+    optimize_skin(model, model.skins[0])
+
+    assert _skin_triangles(model) == before
+
+
+def test_write_optimizes_copies_of_the_skins(tmp_path):
+    m2 = M2File(2)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+
+    x, y = np.meshgrid(np.arange(9.0), np.arange(9.0))
+    positions = np.stack((x.ravel(), y.ravel(), np.zeros(81)), axis=1)
+    m2.add_geoset_arrays(positions, np.tile((0.0, 0.0, 1.0), (81, 1)), positions[:, :2], None, _grid_triangles(8),
+                         np.zeros((81, 4), dtype=int), np.tile((255, 0, 0, 0), (81, 1)), (0, 0, 0), (0, 0, 0),
+                         1.0, 0)
+
+    skin = m2.skins[0]
+    arrays = [skin.vertex_indices.values, skin.triangle_indices.values, skin.bone_indices.values]
+
+    path = str(tmp_path / 'optimized.m2')
+    m2.write(path, optimize_indices=True)
+
+    assert [skin.vertex_indices.values, skin.triangle_indices.values, skin.bone_indices.values] == arrays
+
+    written = M2File(2, path)
+    written.read_additional_files([str(tmp_path / 'optimized00.skin')], {})
+
+    assert list(written.skins[0].triangle_indices) != list(skin.triangle_indices)
+    assert _skin_triangles(written) == _skin_triangles(m2)
@@ -0,0 +1,103 @@
+import numpy as np
+
+from pywowlib.m2_file import M2File
+from pywowlib.tools.m2_keyframe_reduction import reduce_track_keys, reduce_keyframes, reduced_keyframes
+from pywowlib.tools.m2_pose import M2Interpolation, slerp
+
+from conftest import build_model
+
+
+def _translation_keys(m2):
+    track = m2.root.bones[1].translation
+    return list(track.timestamps[0].values), [tuple(value) for value in track.values[0].values]
+
+
+def test_linear_keys_are_dropped():
+    timestamps = [0, 100, 200, 300, 400]
+    values = [(0.0,), (1.0,), (2.0,), (3.0,), (10.0,)]
+
+    keep = reduce_track_keys(timestamps, values, 1e-3)
+    assert keep.tolist() == [True, False, False, True, True]
+
+
+def test_step_keys_repeating_the_previous_value_are_dropped():
+    keep = reduce_track_keys([0, 1, 2, 3, 4], [(1.0,), (1.0,), (2.0,), (2.0,), (2.0,)], 0.0, M2Interpolation.NONE)
+    assert keep.tolist() == [True, False, True, False, True]
+
+
+def test_rotation_error_is_an_angle():
+    a = np.array([1.0, 0.0, 0.0, 0.0])
+    b = np.array([np.cos(0.5), np.sin(0.5), 0.0, 0.0])
+
+    # the middle key lies 0.01 rad off the slerp between its neighbours
+    middle = slerp(a[None], b[None], np.array([0.5]))[0]
+    offset = np.array([np.cos(0.005), 0.0, np.sin(0.005), 0.0])
+    w1, x1, y1, z1 = middle
+    w2, x2, y2, z2 = offset
+    rotated = (w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2, w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+               w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2, w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2)
+
+    values = [a, rotated, b]
+    assert reduce_track_keys([0, 1, 2], values, 0.02, rotation=True).tolist() == [True, False, True]
+    assert reduce_track_keys([0, 1, 2], values, 0.005, rotation=True).tolist() == [True, True, True]
+
+
+def test_reduce_keyframes_modifies_the_model(model):
+    report = reduce_keyframes(model)
+
+    assert report.keys_before - report.keys_after == 1
+    assert report.bytes_saved == 4 + 12
+    assert _translation_keys(model) == ([0, 1000], [(0.0, 0.0, 0.0), (2.0, 0.0, 0.0)])
+
+
+def test_reduced_keyframes_restores_the_model(model):
+    before = _translation_keys(model)
+
+    with reduced_keyframes(model) as report:
+        assert report.keys_after < report.keys_before
+        assert len(_translation_keys(model)[0]) == 2
+
+    assert _translation_keys(model) == before
+
+
+def test_write_reduced_keeps_the_model(model, tmp_path):
+    path = str(tmp_path / 'reduced.m2')
+    before = _translation_keys(model)
+
+    report = model.write(path, reduce_keyframes=True)
+
+    assert report.keys_after < report.keys_before
+    assert _translation_keys(model) == before
+
+    reduced = M2File(2, path)
+    assert _translation_keys(reduced) == ([0, 1000], [(0.0, 0.0, 0.0), (2.0, 0.0, 0.0)])
+
+
+def _two_animated_bones():
+    m2 = build_model(2)
+    translation = m2.root.bones[0].translation
+    translation.interpolation_type = M2Interpolation.LINEAR
+
+    with m2.context.activate():
+        for index in range(2):
+            translation.set_sequence(index, [0, 250, 500, 1000], [(0.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 2.0, 0.0),
+                                                                  (0.0, 2.0, 5.0)])
+    return m2
+
+
+def test_parallel_reduction_matches_serial_reduction():
+    serial, parallel = _two_animated_bones(), _two_animated_bones()
+
+    report = reduce_keyframes(parallel, max_workers=2)
+    assert report == reduce_keyframes(serial) and report.keys_after < report.keys_before
+
+    for a, b in zip(serial.root.bones, parallel.root.bones):
+        for name in ('translation', 'rotation', 'scale'):
+            track_a, track_b = getattr(a, name), getattr(b, name)
+            assert len(track_a.timestamps) == len(track_b.timestamps)
+
+            for index in range(len(track_a.timestamps)):
+                assert [keys.tolist() for keys in track_a.get_sequence(index)] == \
+                    [keys.tolist() for keys in track_b.get_sequence(index)]
+
+    assert list(parallel.root.bones[0].translation.timestamps[0].values) == [0, 500, 1000]
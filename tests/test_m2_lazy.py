@@ -0,0 +1,37 @@
+import pytest
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.wow_common_types import M2Array
+
+
+def test_lazy_read_matches_eager_read(model_path):
+    eager = M2File(2, model_path)
+    lazy = M2File(2, model_path, lazy=True)
+
+    assert 'values' not in lazy.root.vertices.__dict__
+    assert [v.pos for v in lazy.root.vertices] == [v.pos for v in eager.root.vertices]
+    assert lazy.root.name.value == eager.root.name.value == 'test'
+
+
+def test_failed_lazy_decode_can_be_retried(model_path, monkeypatch):
+    m2 = M2File(2, model_path, lazy=True)
+    vertices = m2.root.vertices
+
+    decode = M2Array._decode_values
+    calls = []
+
+    def failing_decode(self, f, is_anim_data):
+        calls.append(self)
+        if len(calls) == 1:
+            raise ValueError('decode failed')
+
+        return decode(self, f, is_anim_data)
+
+    monkeypatch.setattr(M2Array, '_decode_values', failing_decode)
+
+    with pytest.raises(ValueError):
+        vertices.decode()
+
+    assert vertices._lazy_source is not None
+    assert len(vertices.values) == 4
+    assert vertices._lazy_source is None
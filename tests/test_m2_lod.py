@@ -0,0 +1,92 @@
+import numpy as np
+
+from pywowlib.m2_file import M2File
+from pywowlib.tools.m2_lod import quadric_decimate
+
+
+def _plane(n: int):
+    """ A flat n x n grid of quads in the z = 0 plane. """
+
+    x, y = np.meshgrid(np.arange(n, dtype=np.float64), np.arange(n, dtype=np.float64))
+    positions = np.stack((x.ravel(), y.ravel(), np.zeros(n * n)), axis=1)
+
+    cells = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None, :]).ravel()
+    triangles = np.concatenate((np.stack((cells, cells + 1, cells + n), axis=1),
+                                np.stack((cells + 1, cells + n + 1, cells + n), axis=1)))
+
+    return positions, triangles
+
+
+def _normals(positions, triangles):
+    p0, p1, p2 = (positions[triangles[:, k]] for k in range(3))
+    return np.cross(p1 - p0, p2 - p0)
+
+
+def test_decimating_a_plane_keeps_its_outline():
+    positions, triangles = _plane(9)
+    result = quadric_decimate(positions, triangles, 16)
+
+    assert 0 < len(result) <= 16
+    assert set(result.ravel()) <= set(triangles.ravel())
+
+    # no triangle is flipped or degenerate, and the covered area is unchanged
+    normals = _normals(positions, result)
+    assert (normals[:, 2] > 0).all()
+    assert np.isclose(np.linalg.norm(normals, axis=1).sum() / 2, 64.0)
+
+    # corners of the border are kept in place
+    for corner in (0, 8, 72, 80):
+        assert corner in result
+
+
+def test_max_error_stops_decimation():
+    positions, triangles = _plane(5)
+    positions[12, 2] = 2.0                                           # a spike in the middle of the plane
+
+    result = quadric_decimate(positions, triangles, 1, max_error=1e-6)
+
+    assert len(result) < len(triangles)
+    assert 12 in result
+
+
+def test_generate_lod_skins(tmp_path):
+    m2 = M2File(2)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+
+    positions, triangles = _plane(6)
+    m2.add_geoset_arrays(positions, np.tile((0.0, 0.0, 1.0), (36, 1)), positions[:, :2], None, triangles,
+                         np.zeros((36, 4), dtype=int), np.tile((255, 0, 0, 0), (36, 1)), (0, 0, 0), (0, 0, 0),
+                         1.0, 0)
+
+    lods = m2.generate_lod_skins((0.5, 0.25))
+
+    assert m2.skins[1:] == lods and m2.root.num_skin_profiles == 3
+    n_triangles = [len(skin.triangle_indices) // 3 for skin in m2.skins]
+    assert n_triangles[0] == 50 and n_triangles[1] <= 25 and n_triangles[2] <= 13
+
+    for lod in lods:
+        submesh, = lod.submeshes
+        assert (submesh.vertex_start, submesh.index_start) == (0, 0)
+        assert submesh.vertex_count == len(lod.vertex_indices) == len(lod.bone_indices)
+        assert submesh.index_count == len(lod.triangle_indices)
+        assert max(lod.triangle_indices) < submesh.vertex_count
+
+    path = str(tmp_path / 'lod.m2')
+    m2.write(path)
+
+    read = M2File(2, path)
+    read.read_additional_files([str(tmp_path / 'lod{:02d}.skin'.format(i)) for i in range(3)], {})
+    assert [list(skin.triangle_indices) for skin in read.skins] == [list(skin.triangle_indices) for skin in m2.skins]
+
+
+def test_lod_skin_arrays_follow_the_read_mode(model_path):
+    for use_numpy in (False, True):
+        m2 = M2File(2, model_path, use_numpy=use_numpy)
+        m2.read_additional_files([model_path.replace('model.m2', 'model00.skin')], {})
+
+        lod, = m2.generate_lod_skins((0.5,))
+
+        for name in ('vertex_indices', 'bone_indices', 'triangle_indices'):
+            assert type(getattr(lod, name).values) is type(getattr(m2.skins[0], name).values)
+
+        assert isinstance(lod.triangle_indices.values, np.ndarray) == use_numpy
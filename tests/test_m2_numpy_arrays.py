@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.wow_common_types import as_numpy, get_numpy_dtype
+from pywowlib.file_formats.m2_format import M2Vertex
+from pywowlib.io_utils.types import uint16, vec3D
+
+
+def test_numpy_mode_matches_list_mode(model_path):
+    plain = M2File(2, model_path)
+    numpy = M2File(2, model_path, use_numpy=True)
+
+    vertices = numpy.root.vertices.values
+    assert isinstance(vertices, np.ndarray) and vertices.dtype == get_numpy_dtype(M2Vertex)
+    assert [tuple(v) for v in vertices['pos']] == [tuple(v.pos) for v in plain.root.vertices.values]
+
+    lookup = numpy.root.bone_lookup_table.values
+    assert isinstance(lookup, np.ndarray) and lookup.tolist() == list(plain.root.bone_lookup_table.values)
+
+
+def test_numpy_mode_writes_the_same_file(model_path, tmp_path):
+    paths = [str(tmp_path / name) for name in ('plain.m2', 'numpy.m2')]
+
+    M2File(2, model_path).write(paths[0])
+    M2File(2, model_path, use_numpy=True).write(paths[1])
+
+    with open(paths[0], 'rb') as a, open(paths[1], 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_as_numpy():
+    assert get_numpy_dtype(vec3D) == np.dtype(('<f', 3))
+    assert as_numpy([(0, 1, 2)], vec3D).shape == (1, 3)
+
+    with pytest.raises(ValueError):
+        as_numpy([70000], uint16)
@@ -0,0 +1,52 @@
+import threading
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.m2_format import M2CompBone
+from pywowlib.file_formats.wow_common_types import M2ParseContext, M2Versions
+
+
+def test_models_keep_their_own_context(model_path):
+    wotlk = M2File(2, model_path)
+    legion = M2File(7)
+
+    assert wotlk.context is not legion.context
+    assert wotlk.context.m2_version == M2Versions.WOTLK
+    assert legion.context.m2_version == M2Versions.LEGION
+
+
+def test_read_again_replaces_registered_tracks(model_path):
+    m2 = M2File(2, model_path)
+    n_tracks = len(m2.context.m2_tracks[M2CompBone])
+
+    m2.read()
+
+    tracks = m2.context.m2_tracks[M2CompBone]
+    assert len(tracks) == n_tracks
+    assert all(any(track is bone_track for bone in m2.root.bones
+                   for bone_track in (bone.translation, bone.rotation, bone.scale)) for track in tracks)
+
+
+def test_activate_restores_the_previous_context():
+    outer = M2ParseContext.current()
+    context = M2ParseContext(M2Versions.CATA)
+
+    with context.activate():
+        assert M2ParseContext.current() is context
+
+    assert M2ParseContext.current() is outer
+
+
+def test_threads_outside_of_a_model_get_their_own_default_context():
+    main = M2ParseContext.current()
+    main.m2_version = M2Versions.LEGION
+    contexts = []
+
+    thread = threading.Thread(target=lambda: contexts.append(M2ParseContext.current()))
+    thread.start()
+    thread.join()
+
+    try:
+        assert contexts[0] is not main
+        assert contexts[0].m2_version == M2Versions.WOTLK
+    finally:
+        main.m2_version = M2Versions.WOTLK
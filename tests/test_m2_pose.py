@@ -0,0 +1,66 @@
+import numpy as np
+
+from pywowlib.tools.m2_pose import M2PoseEvaluator, M2Interpolation, quaternion_to_matrix, slerp
+
+
+def test_topological_order_does_not_modify_parents():
+    parents = [2, 0, 1, -1, 3, 9]
+    order, resolved = M2PoseEvaluator._topological_order(parents)
+
+    assert parents == [2, 0, 1, -1, 3, 9]
+    assert sorted(order) == list(range(6))
+
+    # the cycle 0 -> 2 -> 1 -> 0 and the invalid parent 9 are broken into roots
+    assert resolved[5] == -1 and (resolved[:3] == -1).sum() == 1
+    position = {bone: i for i, bone in enumerate(order)}
+    assert all(parent < 0 or position[parent] < position[bone] for bone, parent in enumerate(resolved))
+
+
+def test_sample_linear_translation(model):
+    evaluator = M2PoseEvaluator(model)
+    translation = evaluator.sample_track(1, 'translation', 0, [0, 250, 500, 750, 1000, 2000])
+
+    assert np.allclose(translation[:, 0], [0.0, 0.5, 1.0, 1.5, 2.0, 2.0])
+    assert np.allclose(translation[:, 1:], 0.0)
+
+
+def test_untracked_bone_keeps_its_rest_pose(model):
+    evaluator = M2PoseEvaluator(model)
+    world = evaluator.evaluate(0, [0, 500])
+
+    assert world.shape == (2, 2, 4, 4)
+    assert np.allclose(world[:, 0], np.eye(4))
+
+
+def test_child_matrices_follow_the_parent(model):
+    evaluator = M2PoseEvaluator(model)
+    times = np.array([0.0, 300.0, 1000.0])
+    world = evaluator.evaluate(0, times)
+
+    local = evaluator.local_matrices(1, 0, times)
+    assert np.allclose(world[:, 1], world[:, 0] @ local)
+
+    # the pivot is kept in place by rotation and scale, only translated
+    pivot = np.append(evaluator.pivots[1], 1.0)
+    translation = evaluator.sample_track(1, 'translation', 0, times)
+    assert np.allclose((world[:, 1] @ pivot)[:, :3], evaluator.pivots[1] + translation)
+
+
+def test_rotation_interpolation_is_normalized(model):
+    evaluator = M2PoseEvaluator(model)
+    timestamps, values, interpolation = evaluator.track_keys(1, 'rotation', 0)
+    rotation = evaluator.sample_track(1, 'rotation', 0, np.linspace(0, 1000, 11))
+
+    assert interpolation == M2Interpolation.LINEAR
+    assert np.allclose(np.linalg.norm(rotation, axis=1), 1.0)
+
+
+def test_slerp_and_matrix_conversion():
+    q0 = np.array([[1.0, 0.0, 0.0, 0.0]])
+    q1 = np.array([[0.0, 0.0, 0.0, 1.0]])             # 180 degrees around Z
+
+    half = slerp(q0, q1, np.array([0.5]))
+    assert np.allclose(half, [[np.sqrt(0.5), 0.0, 0.0, np.sqrt(0.5)]])
+
+    rotation = quaternion_to_matrix(half)[0]
+    assert np.allclose(rotation @ [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
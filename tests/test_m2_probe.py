@@ -0,0 +1,40 @@
+import struct
+
+import pytest
+
+from pywowlib.m2_file import M2File, M2ProbeInfo
+
+
+def test_probe_matches_a_full_read(model_path):
+    info = M2File.probe(model_path)
+    m2 = M2File(2, model_path)
+
+    assert isinstance(info, M2ProbeInfo)
+    assert (info.version, info.global_flags, info.name) == (m2.root.version, m2.root.global_flags, 'test')
+    assert (info.n_vertices, info.n_bones, info.n_sequences, info.n_textures) == (4, 2, 2, 1)
+    assert info.num_skin_profiles == m2.root.num_skin_profiles
+    assert info.texture_names == ('textures\\test.blp',)
+    assert info.texture_file_ids == () and info.chunks == ()
+
+
+def test_probe_chunked_file(model_path, tmp_path):
+    with open(model_path, 'rb') as f:
+        md20 = f.read()
+
+    txid = struct.pack('<II', 123, 456)
+    path = tmp_path / 'chunked.m2'
+    path.write_bytes(b'MD21' + struct.pack('<I', len(md20)) + md20 + b'TXID' + struct.pack('<I', len(txid)) + txid)
+
+    info = M2File.probe(str(path))
+
+    assert info.name == 'test' and info.n_bones == 2
+    assert info.texture_file_ids == (123, 456)
+    assert info.chunks == (('TXID', 8 + len(md20) + 8, len(txid)),)
+
+
+def test_probe_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.m2'
+    path.write_bytes(b'MVER' + bytes(124))
+
+    with pytest.raises(TypeError):
+        M2File.probe(str(path))
@@ -0,0 +1,59 @@
+import numpy as np
+
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.m2_format import M2CompQuaternion
+
+
+def test_compress_round_trip():
+    rng = np.random.default_rng(0)
+    quaternions = rng.normal(size=(64, 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1)[:, None]
+
+    raw = M2CompQuaternion.compress(quaternions)
+
+    assert raw.dtype == np.int16
+    assert np.abs(M2CompQuaternion.decompress(raw) - quaternions).max() < 1e-4
+
+
+def test_compress_matches_from_quaternion():
+    quaternions = [(1.0, 0.0, 0.0, 0.0), (0.5, -0.5, 0.5, -0.5), (0.0, 0.0, -1.0, 0.0)]
+    raw = M2CompQuaternion.compress(quaternions)
+
+    for quaternion, (y, neg_x, z, w) in zip(quaternions, raw.tolist()):
+        q = M2CompQuaternion().from_quaternion(quaternion)
+        assert (q.x, q.y, q.z, q.w) == (-neg_x, y, z, w)
+
+
+def test_compress_clips_out_of_range_components():
+    raw = M2CompQuaternion.compress([(1.5, -2.0, 0.0, 0.0)])
+    expected = M2CompQuaternion.compress([(1.0, -1.0, 0.0, 0.0)])
+
+    assert np.array_equal(raw, expected)
+
+    q = M2CompQuaternion().from_quaternion((1.5, -2.0, 0.0, 0.0))
+    assert np.allclose(q.to_quaternion(), (1.0, -1.0, 0.0, 0.0))
+
+
+def test_add_bone_track_keeps_objects_outside_of_numpy_mode(model):
+    model.add_anim(1, 0, (0, 1000), 0, 0, 32767, (0, 0), 150, (((0, 0, 0), (1, 1, 1)), 2.0))
+    model.add_bone_track(0, ([0.0, 1.0], [(0.0, 0.0, 0.0), (1.0, 2.0, 3.0)]),
+                         ([0.0, 1.0], [(1.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 1.0)]),
+                         ([0.0], [(1.0, 1.0, 1.0)]))
+
+    bone = model.root.bones[0]
+    index = len(bone.rotation.values) - 1
+
+    rotations = bone.rotation.values[index].values
+    assert isinstance(rotations, list) and all(isinstance(q, M2CompQuaternion) for q in rotations)
+    assert np.allclose(rotations[1].to_quaternion(), (0.0, 0.0, 0.0, 1.0), atol=1e-4)
+
+    assert isinstance(bone.translation.timestamps[index].values, list)
+    assert np.allclose(bone.translation.values[index].values, [(0.0, 0.0, 0.0), (1.0, 2.0, 3.0)])
+
+
+def test_add_bone_track_keeps_arrays_in_numpy_mode():
+    m2 = M2File(2, use_numpy=True)
+    m2.add_bone((0, 0, 0), -1, 0, -1)
+    m2.add_bone_track(0, ([0.0], [(1.0, 2.0, 3.0)]), ([0.0], [(1.0, 0.0, 0.0, 0.0)]), ([0.0], [(1.0, 1.0, 1.0)]))
+
+    assert isinstance(m2.root.bones[0].rotation.values[0].values, np.ndarray)
@@ -0,0 +1,37 @@
+import numpy as np
+
+from pywowlib.m2_file import M2File
+
+
+def test_numpy_tracks_match_list_tracks(model_path):
+    plain = M2File(2, model_path).root.bones[1]
+    numpy = M2File(2, model_path, use_numpy=True).root.bones[1]
+
+    for name in ('translation', 'rotation', 'scale'):
+        for index in range(2):
+            timestamps, values = getattr(numpy, name).get_sequence(index)
+            expected_timestamps, expected_values = getattr(plain, name).get_sequence(index)
+
+            assert isinstance(getattr(numpy, name).timestamps[index].values, np.ndarray)
+            assert timestamps.dtype == np.uint32 and np.array_equal(timestamps, expected_timestamps)
+            assert values.dtype == expected_values.dtype and np.array_equal(values, expected_values)
+
+    _, rotations = numpy.rotation.get_sequence(0)
+    assert rotations.dtype == np.int16 and rotations.tolist() == [[0, 0, 0, 32767], [0, -23000, 0, 23000]]
+
+
+def test_set_sequence_round_trip(model_path, tmp_path):
+    for use_numpy in (False, True):
+        m2 = M2File(2, model_path, use_numpy=use_numpy)
+        translation = m2.root.bones[1].translation
+        translation.set_sequence(1, [0, 250], [(3.0, 2.0, 1.0), (4.0, 5.0, 6.0)])
+
+        if not use_numpy:
+            assert translation.timestamps[1].values == [0, 250]
+
+        path = str(tmp_path / 'set.m2')
+        m2.write(path)
+
+        timestamps, values = M2File(2, path).root.bones[1].translation.get_sequence(1)
+        assert timestamps.tolist() == [0, 250]
+        assert values.tolist() == [[3.0, 2.0, 1.0], [4.0, 5.0, 6.0]]
@@ -0,0 +1,37 @@
+import mmap
+
+import numpy as np
+
+from pywowlib.io_utils.types import ByteCursor
+from pywowlib.m2_file import M2File
+
+
+def test_from_path_maps_the_file(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'abcdef')
+
+    cursor = ByteCursor.from_path(str(path), use_mmap=True)
+    assert isinstance(cursor.data, mmap.mmap)
+    assert cursor.read(3) == b'abc' and bytes(cursor.view(3)) == b'def'
+
+    empty = tmp_path / 'empty.bin'
+    empty.write_bytes(b'')
+    assert ByteCursor.from_path(str(empty), use_mmap=True).read() == b''
+
+
+def test_mapped_model_matches_a_regular_read(model_path, tmp_path):
+    read = M2File(2, model_path, use_numpy=True)
+    mapped = M2File(2, model_path, use_numpy=True, use_mmap=True)
+
+    for m2 in (read, mapped):
+        m2.read_additional_files([model_path.replace('model.m2', 'model00.skin')], {})
+
+    assert np.array_equal(mapped.root.vertices.values, read.root.vertices.values)
+    assert list(mapped.skins[0].triangle_indices) == list(read.skins[0].triangle_indices)
+
+    paths = [str(tmp_path / name) for name in ('read.m2', 'mapped.m2')]
+    read.write(paths[0])
+    mapped.write(paths[1])
+
+    with open(paths[0], 'rb') as a, open(paths[1], 'rb') as b:
+        assert a.read() == b.read()
@@ -0,0 +1,75 @@
+import struct
+
+import numpy as np
+import pytest
+
+from pywowlib.file_formats.phys_format import PhysFile, PhysUnknownChunk
+from pywowlib.io_utils.types import ByteCursor, ByteWriter
+
+
+def _chunk(magic: str, payload: bytes) -> bytes:
+    return magic.encode('ascii') + struct.pack('<I', len(payload)) + payload
+
+
+def _matrix(start: float) -> bytes:
+    return struct.pack('<12f', *np.arange(start, start + 12))
+
+
+# two bodies joined by a weld joint, laid out field by field after the .phys documentation
+BODY_RECORDS = b''.join(struct.pack('<HH3fHHi3f3fI', body_type, bone, *position, 0, 0, 1,
+                                    0.1, 0.2, 0.3, 0.5, 0.6, 0.7, 0)
+                        for body_type, bone, position in ((0, 0, (0.0, 0.0, 0.0)), (1, 3, (1.0, 2.0, 3.0))))
+
+FIXTURE = b''.join((
+    _chunk('PHYS', struct.pack('<h', 5)),
+    _chunk('BDY4', BODY_RECORDS),
+    _chunk('SHAP', struct.pack('<HH4s3f', 2, 0, b'\0' * 4, 0.5, 0.25, 1.0) * 2),
+    _chunk('SPHS', struct.pack('<4f', 0.0, 0.0, 0.5, 0.75) * 2),
+    _chunk('JOIN', struct.pack('<II4sHH', 0, 1, b'\1\2\3\4', 2, 0)),
+    _chunk('WELJ', _matrix(0.0) + _matrix(12.0) + struct.pack('<4f', 1.0, 0.5, 2.0, 0.25)),
+    _chunk('WLJ2', _matrix(0.0) + _matrix(12.0) + struct.pack('<5f', 1.0, 0.5, 2.0, 0.25, 9.0)),
+    _chunk('ABCD', b'\xff' * 6),
+))
+
+
+def test_read_fixture():
+    phys = PhysFile().read(ByteCursor(FIXTURE))
+
+    assert phys.version == 5
+    assert list(phys.chunks) == ['PHYS', 'BDY4', 'SHAP', 'SPHS', 'JOIN', 'WELJ', 'WLJ2', 'ABCD']
+
+    bodies = phys.bodies
+    assert bodies['type'].tolist() == [0, 1] and bodies['bone_index'].tolist() == [0, 3]
+    assert bodies['position'][1].tolist() == [1.0, 2.0, 3.0]
+    assert np.allclose(bodies['drag'], 0.5)
+
+    joint, = phys.joints
+    assert (joint['body_a_index'], joint['body_b_index'], joint['joint_type'], joint['joint_id']) == (0, 1, 2, 0)
+    assert joint['unk_08'].tolist() == [1, 2, 3, 4]
+
+    weld, = phys.get_chunk('WELJ').content
+    assert weld['frame_a'].ravel().tolist() == list(range(12))
+    assert weld['frame_b'].ravel().tolist() == list(range(12, 24))
+    assert (weld['angular_frequency'], weld['linear_damping']) == (1.0, 0.25)
+
+    weld, = phys.get_chunk('WLJ2').content
+    assert (weld['linear_frequency'], weld['unk_70']) == (2.0, 9.0)
+
+    assert isinstance(phys.get_chunk('ABCD'), PhysUnknownChunk)
+
+
+def test_write_is_byte_exact():
+    phys = PhysFile().read(ByteCursor(FIXTURE))
+
+    with ByteWriter() as f:
+        phys.write(f)
+
+        with f.getbuffer() as data:
+            assert bytes(data) == FIXTURE
+
+
+def test_partial_records_raise():
+    data = _chunk('PHYS', struct.pack('<h', 5)) + _chunk('JOIN', struct.pack('<II4sHH', 0, 1, b'\0' * 4, 2, 0) + b'\0')
+
+    with pytest.raises(ValueError):
+        PhysFile().read(ByteCursor(data))
@@ -0,0 +1,82 @@
+from pywowlib.m2_file import M2File
+from pywowlib.file_formats.m2_chunks import AnimFileID
+from pywowlib.file_formats.skel_format import SkelFile, _CachedSkel
+
+
+def _cached_skel(model_path):
+    model = M2File(2, model_path)
+
+    skel = SkelFile('creature\\test\\test.skel', shared=False)
+    skel.skl1.name.value = 'test'
+    skel.skb1.bones = model.root.bones
+    skel.sks1.sequences = model.root.sequences
+    skel.sks1.sequence_lookups = model.root.sequence_lookup
+
+    anim_file_id = AnimFileID()
+    anim_file_id.anim_id, anim_file_id.file_id = 0, 1234
+    skel.afid.anim_file_ids = [anim_file_id]
+
+    return _CachedSkel(skel, model.context)
+
+
+def _load(entry):
+    m2 = M2File(7)
+
+    with m2.context.activate():
+        m2.skels.appendleft(entry.view())
+
+    m2.process_skels()
+    return m2
+
+
+def _state(m2):
+    bone = m2.root.bones[1]
+    return (m2.root.name.value, len(m2.root.sequences), m2.root.sequences[0].bounds.radius,
+            list(m2.root.sequence_lookup), [anim.file_id for anim in m2.afid.anim_file_ids],
+            list(bone.translation.timestamps[0].values))
+
+
+def test_models_loaded_from_one_skel_do_not_share_data(model_path):
+    entry = _cached_skel(model_path)
+    first, second = _load(entry), _load(entry)
+    before = _state(second)
+
+    first.root.name.value = 'edited'
+    first.add_anim(5, 0, (0, 500), 0, 0x20, 32767, (0, 0), (150, 150), (((0, 0, 0), (1, 1, 1)), 2.0))
+    first.root.sequences[0].bounds.radius = 99.0
+    first.afid.anim_file_ids[0].file_id = 4321
+    first.root.bones[1].translation.timestamps[0].values.append(2000)
+
+    assert _state(first) != before
+    assert _state(second) == before
+    assert _state(_load(entry)) == before
+
+    assert entry.skel.skl1.name.value == 'test'
+    assert len(entry.skel.sks1.sequences) == 2
+
+
+def test_views_register_their_own_tracks(model_path):
+    entry = _cached_skel(model_path)
+    m2 = _load(entry)
+
+    tracks = [track for tracks in m2.context.m2_tracks.values() for track in tracks]
+    assert len(tracks) == len(entry.tracks)
+    assert m2.root.bones[1].translation in tracks
+    assert not any(track is cached for track in tracks for cached, _ in entry.tracks)
+
+
+def test_views_copy_arrays_on_first_access(model_path):
+    entry = _cached_skel(model_path)
+
+    with M2File(7).context.activate():
+        view = entry.view()
+
+    timestamps = view.skb1.bones[1].translation.timestamps
+    cached = entry.skel.skb1.bones[1].translation.timestamps
+
+    assert 'values' not in timestamps.__dict__
+    assert len(timestamps) == len(cached)
+
+    assert timestamps[0].values == cached[0].values
+    assert timestamps[0].values is not cached[0].values
+    assert timestamps[0] is not cached[0]
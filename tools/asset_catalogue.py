@@ -0,0 +1,357 @@
+import os
+import struct
+import sqlite3
+import hashlib
+import argparse
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from .. import WoWVersionManager, WoWVersions
+from ..m2_file import M2File
+from ..file_formats.wow_common_types import M2Versions
+
+
+CATALOGUED_EXTENSIONS = ('.m2', '.wmo', '.adt', '.blp')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    file_data_id INTEGER,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assets (
+    hash TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    vertex_count INTEGER,
+    texture_width INTEGER,
+    texture_height INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    dependency TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_hash ON files (hash);
+CREATE INDEX IF NOT EXISTS dependencies_path ON dependencies (path);
+CREATE INDEX IF NOT EXISTS dependencies_dependency ON dependencies (dependency);
+"""
+
+
+class AssetInfo(NamedTuple):
+    type: str
+    vertex_count: Optional[int] = None
+    texture_width: Optional[int] = None
+    texture_height: Optional[int] = None
+    dependencies: Tuple[Tuple[str, str], ...] = ()    # (kind, file path or file data id)
+    error: Optional[str] = None
+
+
+class CatalogueUpdateReport(NamedTuple):
+    parsed: int
+    unchanged: int
+    removed: int
+
+
+###### Header parsers, run in worker processes ######
+
+def _iter_chunks(data) -> Iterable[Tuple[str, int, int]]:
+    """ Iterate (magic, data offset, size) of the IFF chunks of a WMO or ADT file. """
+
+    pos = 0
+    while pos + 8 <= len(data):
+        magic, size = struct.unpack_from('<4sI', data, pos)
+        yield magic[::-1].decode('utf-8', 'replace'), pos + 8, size
+        pos += 8 + size
+
+
+def _strings(block) -> List[str]:
+    return [string.decode('utf-8', 'replace') for string in bytes(block).split(b'\0') if string]
+
+
+def _m2_expansion(data: bytes) -> int:
+    """ Guess the expansion number of an M2 file from its header version, chunked files are Legion+. """
+
+    is_chunked = data[:4] == b'MD21'
+    version, = struct.unpack_from('<I', data, 12 if is_chunked else 4)
+    expansion = max((exp_num for exp_num in range(WoWVersions.BFA + 1)
+                     if M2Versions.from_expansion_number(exp_num) <= version), default=WoWVersions.CLASSIC)
+
+    return max(expansion, WoWVersions.LEGION) if is_chunked else expansion
+
+
+def _parse_m2(path: str, data: bytes) -> AssetInfo:
+    m2 = M2File.from_bytes(_m2_expansion(data), data, path, lazy=True)
+    dependencies = m2.find_model_dependencies()
+
+    records = [('texture', texture) for texture in dependencies.textures]
+    records.extend(('skin', skin) for skin in dependencies.skins)
+    records.extend(('lod_skin', skin) for skin in dependencies.lod_skins)
+    records.extend(('bone', bone) for bone in dependencies.bones)
+    records.extend(('anim', anim) for anim in dependencies.anims.values())
+
+    if dependencies.phys:
+        records.append(('phys', dependencies.phys))
+
+    return AssetInfo('m2', vertex_count=len(m2.root.vertices),
+                     dependencies=tuple((kind, str(value)) for kind, value in records))
+
+
+def _parse_wmo(path: str, data: bytes) -> AssetInfo:
+    chunks = {magic: (start, size) for magic, start, size in _iter_chunks(data)}
+
+    # group files hold the geometry in sub-chunks of MOGP, following its 0x44 bytes header
+    if 'MOGP' in chunks:
+        start, size = chunks['MOGP']
+        group_chunks = {magic: (start_, size_) for magic, start_, size_
+                        in _iter_chunks(memoryview(data)[start + 0x44:start + size])}
+
+        return AssetInfo('wmo_group', vertex_count=group_chunks.get('MOVT', (0, 0))[1] // 12)
+
+    records = []
+
+    if 'MOTX' in chunks:
+        start, size = chunks['MOTX']
+        records.extend(('texture', texture) for texture in _strings(data[start:start + size]))
+
+    elif 'MOMT' in chunks:
+        # Legion+ materials reference textures by file data id
+        start, size = chunks['MOMT']
+        for material in range(size // 64):
+            for offset in (12, 24, 36):
+                fdid, = struct.unpack_from('<I', data, start + material * 64 + offset)
+                if fdid:
+                    records.append(('texture', str(fdid)))
+
+    if 'MODN' in chunks:
+        start, size = chunks['MODN']
+        records.extend(('doodad', doodad) for doodad in _strings(data[start:start + size]))
+
+    if 'MODI' in chunks:
+        start, size = chunks['MODI']
+        records.extend(('doodad', str(fdid)) for fdid in struct.unpack_from('<{}I'.format(size // 4), data, start))
+
+    if 'GFID' in chunks:
+        start, size = chunks['GFID']
+        records.extend(('group', str(fdid)) for fdid in struct.unpack_from('<{}I'.format(size // 4), data, start)
+                       if fdid)
+
+    elif 'MOHD' in chunks:
+        n_groups, = struct.unpack_from('<I', data, chunks['MOHD'][0] + 4)
+        root_name = os.path.splitext(path)[0]
+        records.extend(('group', '{}_{}.wmo'.format(root_name, str(i).zfill(3))) for i in range(n_groups))
+
+    return AssetInfo('wmo', dependencies=tuple(records))
+
+
+def _parse_adt(data: bytes) -> AssetInfo:
+    records = []
+
+    for magic, start, size in _iter_chunks(data):
+        kind = {'MTEX': 'texture', 'MMDX': 'doodad', 'MWMO': 'wmo'}.get(magic)
+        if kind:
+            records.extend((kind, name) for name in _strings(data[start:start + size]))
+
+    return AssetInfo('adt', dependencies=tuple(records))
+
+
+def _parse_blp(data: bytes) -> AssetInfo:
+    # BLP1 and BLP2 headers both store the dimensions of the top mipmap at offset 12
+    width, height = struct.unpack_from('<II', data, 12)
+    return AssetInfo('blp', texture_width=width, texture_height=height)
+
+
+def parse_asset(path: str, data: bytes) -> AssetInfo:
+    """ Gather catalogue information of a file from its contents. Parsing errors are recorded, not raised. """
+
+    extension = os.path.splitext(path)[1].lower()
+    type_ = extension[1:] or 'unknown'
+
+    try:
+        if extension == '.m2':
+            return _parse_m2(path, data)
+
+        if extension == '.wmo':
+            return _parse_wmo(path, data)
+
+        if extension == '.adt':
+            return _parse_adt(data)
+
+        if extension == '.blp':
+            return _parse_blp(data)
+
+    except Exception as e:
+        return AssetInfo(type_, error='{}: {}'.format(type(e).__name__, e))
+
+    return AssetInfo(type_)
+
+
+###### Catalogue ######
+
+def walk_storage(game_data, extensions: Iterable[str] = CATALOGUED_EXTENSIONS) -> List[Union[str, int]]:
+    """ List identifiers of all files with one of the extensions in the loaded archives and directories.
+        Files of CASC storages are listed by file data id using the listfile, others by their game path.
+    """
+
+    extensions = tuple(extension.lower() for extension in extensions)
+    identifiers = {}
+
+    for storage, is_archive in game_data.files:
+
+        if not is_archive:
+            for directory, _, filenames in os.walk(storage):
+                for filename in filenames:
+                    if filename.lower().endswith(extensions):
+                        path = os.path.relpath(os.path.join(directory, filename), storage)
+                        identifiers.setdefault(path.replace(os.sep, '\\').lower(), path)
+
+        elif WoWVersionManager().client_version < WoWVersions.WOD:
+            for path in storage.namelist():
+                if path.lower().endswith(extensions):
+                    identifiers.setdefault(path.lower(), path)
+
+        else:
+            for fdid, path in game_data.listfile.items():
+                if path.lower().endswith(extensions):
+                    identifiers.setdefault(path.replace('/', '\\').lower(), fdid)
+
+    return list(identifiers.values())
+
+
+class AssetCatalogue:
+    """ SQLite catalogue of game files: type, size, dependencies, vertex counts and texture dimensions.
+
+    Files are recorded by path together with the hash of their contents. Updates only parse files whose
+    contents changed, information gathered from the contents is stored once per hash.
+    """
+
+    def __init__(self, db_path: str):
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def _store(self, path: str, fdid: Optional[int], digest: str, size: int, info: AssetInfo):
+        self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)', (path, fdid, digest))
+        self.db.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (digest, info.type, size, info.vertex_count, info.texture_width, info.texture_height,
+                         info.error))
+        self.db.execute('DELETE FROM dependencies WHERE path = ?', (path,))
+        self.db.executemany('INSERT INTO dependencies VALUES (?, ?, ?)',
+                            ((path, kind, dependency) for kind, dependency in info.dependencies))
+
+    def update(self, game_data, identifiers: Optional[Iterable[Union[str, int]]] = None,
+               max_workers: Optional[int] = None) -> CatalogueUpdateReport:
+        """ Catalogue files of a WoWFileData instance, all files found by walk_storage() by default.
+            Headers are parsed in a process pool. After a full walk, records of files no longer present are removed.
+        """
+
+        full_walk = identifiers is None
+        if full_walk:
+            identifiers = walk_storage(game_data)
+
+        known_hashes = dict(self.db.execute('SELECT path, hash FROM files'))
+        seen = set()
+        parsed = unchanged = 0
+
+        # bound the amount of file contents held in memory
+        window = (max_workers or os.cpu_count() or 1) * 4
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+
+            def store_completed(futures):
+                nonlocal parsed
+                for future in futures:
+                    self._store(*pending.pop(future), future.result())
+                    parsed += 1
+
+            for identifier in identifiers:
+                if isinstance(identifier, int):
+                    path = game_data.listfile.get(identifier, str(identifier))
+                    fdid = identifier
+                else:
+                    path, fdid = identifier, None
+
+                result = game_data.read_file(identifier, file_format=os.path.splitext(path)[1][1:], no_exc=True)
+                if result is None:
+                    continue
+
+                data = result[0]
+                digest = hashlib.md5(data).hexdigest()
+                seen.add(path)
+
+                if known_hashes.get(path) == digest:
+                    unchanged += 1
+                    continue
+
+                pending[executor.submit(parse_asset, path, data)] = (path, fdid, digest, len(data))
+
+                if len(pending) >= window:
+                    store_completed(wait(pending, return_when=FIRST_COMPLETED).done)
+
+            store_completed(list(pending))
+
+        removed = 0
+        if full_walk:
+            stale = [(path,) for path in known_hashes if path not in seen]
+            self.db.executemany('DELETE FROM files WHERE path = ?', stale)
+            self.db.executemany('DELETE FROM dependencies WHERE path = ?', stale)
+            removed = len(stale)
+
+        self.db.execute('DELETE FROM assets WHERE hash NOT IN (SELECT hash FROM files)')
+        self.db.commit()
+
+        return CatalogueUpdateReport(parsed, unchanged, removed)
+
+    def get(self, path: str) -> Optional[Dict[str, object]]:
+        """ Get the catalogue record of a file, None if it is not catalogued. """
+
+        cursor = self.db.execute('SELECT files.path, files.file_data_id, assets.* FROM files '
+                                 'JOIN assets ON files.hash = assets.hash WHERE files.path = ?', (path,))
+        row = cursor.fetchone()
+
+        return dict(zip((column[0] for column in cursor.description), row)) if row else None
+
+    def dependencies(self, path: str) -> List[Tuple[str, str]]:
+        """ Get (kind, dependency) records of a file. """
+        return self.db.execute('SELECT kind, dependency FROM dependencies WHERE path = ?', (path,)).fetchall()
+
+    def dependents(self, dependency: str) -> List[str]:
+        """ Get paths of files referencing a dependency. """
+        return [row[0] for row in self.db.execute('SELECT DISTINCT path FROM dependencies WHERE dependency = ?',
+                                                  (dependency,))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or update a SQLite catalogue of WoW client files.')
+    parser.add_argument('wow_path', help='path to the WoW client')
+    parser.add_argument('database', help='path to the SQLite database')
+    parser.add_argument('--client-version', type=int, default=WoWVersions.WOTLK,
+                        help='expansion number of the client (see WoWVersions)')
+    parser.add_argument('--project-path', default=None, help='directory with project files taking top priority')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args()
+
+    from ..archives.wow_filesystem import WoWFileData
+
+    WoWVersionManager().set_client_version(args.client_version)
+    game_data = WoWFileData(args.wow_path, args.project_path)
+
+    with AssetCatalogue(args.database) as catalogue:
+        report = catalogue.update(game_data, max_workers=args.workers)
+
+    print('\nParsed {} files, {} unchanged, {} removed.'.format(report.parsed, report.unchanged, report.removed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+import os
+import threading
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from contextlib import nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .asset_catalogue import AssetInfo, parse_asset
+
+
+Identifier = Union[str, int]
+
+# node kind of the files referenced by each dependency kind
+DEPENDENCY_KINDS = {
+    'texture': 'blp',
+    'skin': 'skin',
+    'lod_skin': 'skin',
+    'bone': 'bone',
+    'anim': 'anim',
+    'phys': 'phys',
+    'doodad': 'm2',
+    'wmo': 'wmo',
+    'group': 'wmo_group'
+}
+
+# files which reference other files and are parsed while building the graph
+CONTAINER_KINDS = ('m2', 'wmo', 'adt')
+
+# extension used to name files referenced by file data id only
+KIND_EXTENSIONS = {'wmo_group': 'wmo'}
+
+
+def normalize_identifier(identifier: Identifier) -> Identifier:
+    """ Get the key of a file in a dependency graph: file data ids as int, paths lowercase with backslashes.
+        Legacy model extensions (.mdx, .mdl) are replaced with .m2.
+    """
+
+    if isinstance(identifier, int):
+        return identifier
+
+    if identifier.isdigit():
+        return int(identifier)
+
+    path = identifier.replace('/', '\\').lower()
+    root, extension = os.path.splitext(path)
+
+    return root + '.m2' if extension in ('.mdx', '.mdl') else path
+
+
+def identifier_kind(identifier: Identifier) -> Optional[str]:
+    """ Guess the node kind of a file from its extension. """
+
+    if isinstance(identifier, int):
+        return None
+
+    return os.path.splitext(identifier)[1][1:] or None
+
+
+class DependencyGraph:
+    """ Files reachable from a set of root files, deduplicated across roots. """
+
+    def __init__(self):
+        self.roots: List[Identifier] = []
+        self.nodes: Dict[Identifier, Optional[str]] = {}        # identifier -> kind
+        self.edges: Dict[Identifier, List[Identifier]] = {}     # container -> referenced files
+        self.data: Dict[Identifier, bytes] = {}                 # file contents read so far
+        self.missing: Set[Identifier] = set()
+        self.errors: Dict[Identifier, str] = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, identifier: Identifier):
+        return normalize_identifier(identifier) in self.nodes
+
+    def files_of_kind(self, kind: str) -> List[Identifier]:
+        return [identifier for identifier, kind_ in self.nodes.items() if kind_ == kind]
+
+    def dependencies(self, identifier: Identifier, recursive: bool = False) -> List[Identifier]:
+        """ Get files referenced by a file, optionally including indirect references. """
+
+        identifier = normalize_identifier(identifier)
+        if not recursive:
+            return list(self.edges.get(identifier, ()))
+
+        visited = {identifier}
+        stack = [identifier]
+        result = []
+
+        while stack:
+            for child in self.edges.get(stack.pop(), ()):
+                if child not in visited:
+                    visited.add(child)
+                    result.append(child)
+                    stack.append(child)
+
+        return result
+
+
+class DependencyResolver:
+    """ Builds transitive dependency graphs of models, WMOs and ADTs and prefetches their files.
+
+    The graph is built breadth-first: all containers of a level are read and parsed, then the files they
+    reference form the next level. Containers are parsed in a process pool of max_workers processes while
+    the following ones are read, in the calling thread with max_workers = 1. prefetch() reads files in a
+    thread pool of max_workers threads. Each file is read at most once.
+
+    Archive handles of WoWFileData are not thread-safe: lookups and archive reads go through the game data
+    under a lock, only files found in loose directories are read concurrently.
+    """
+
+    def __init__(self, game_data, max_workers: Optional[int] = None):
+        self.game_data = game_data
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+    def _filepath(self, identifier: Identifier, kind: Optional[str]) -> str:
+        if isinstance(identifier, int):
+            return self.game_data.guess_filepath(identifier, KIND_EXTENSIONS.get(kind, kind or 'unk'))
+
+        return identifier
+
+    @staticmethod
+    def _read_loose(filepath: str) -> bytes:
+        with open(filepath, 'rb') as f:
+            return f.read()
+
+    def _read(self, identifier: Identifier, kind: Optional[str]) -> Optional[bytes]:
+        with self._lock:
+            storage, is_archive = self.game_data.has_file(identifier)
+
+            if not storage:
+                return None
+
+            if is_archive:
+                result = self.game_data.read_file(identifier, file_format=KIND_EXTENSIONS.get(kind, kind or 'unk'),
+                                                  no_exc=True)
+                return result[0] if result else None
+
+        return self._read_loose(os.path.join(storage, identifier))
+
+    def _load_containers(self, containers: List[Tuple[Identifier, str]], executor: Optional[ProcessPoolExecutor]) \
+            -> List[Tuple[Optional[bytes], Optional[AssetInfo]]]:
+        """ Read containers one after another and parse them, in the process pool if one is given. """
+
+        results = []
+
+        for identifier, kind in containers:
+            data = self._read(identifier, kind)
+
+            if data is None:
+                results.append((None, None))
+            elif executor is None:
+                results.append((data, parse_asset(self._filepath(identifier, kind), data)))
+            else:
+                results.append((data, executor.submit(parse_asset, self._filepath(identifier, kind), data)))
+
+        return [(data, info.result() if isinstance(info, Future) else info) for data, info in results]
+
+    def resolve(self, roots: Iterable[Identifier]) -> DependencyGraph:
+        """ Build the dependency graph of root files (paths or file data ids of .m2, .wmo or .adt files). """
+
+        graph = DependencyGraph()
+        frontier = []
+
+        for root in roots:
+            root = normalize_identifier(root)
+            graph.roots.append(root)
+
+            if root not in graph.nodes:
+                graph.nodes[root] = identifier_kind(root) or 'm2'
+                frontier.append(root)
+
+        executor = ProcessPoolExecutor(max_workers=self.max_workers) if self.max_workers != 1 else None
+
+        with executor or nullcontext():
+            while frontier:
+                containers = [(identifier, graph.nodes[identifier]) for identifier in frontier
+                              if graph.nodes[identifier] in CONTAINER_KINDS]
+                frontier = []
+
+                for (identifier, kind), (data, info) in zip(containers, self._load_containers(containers, executor)):
+                    if data is None:
+                        graph.missing.add(identifier)
+                        continue
+
+                    graph.data[identifier] = data
+                    if info.error:
+                        graph.errors[identifier] = info.error
+
+                    children = graph.edges.setdefault(identifier, [])
+
+                    for dependency_kind, dependency in info.dependencies:
+                        child = normalize_identifier(dependency)
+                        children.append(child)
+
+                        if child not in graph.nodes:
+                            graph.nodes[child] = DEPENDENCY_KINDS.get(dependency_kind) or identifier_kind(child)
+                            frontier.append(child)
+
+        return graph
+
+    def prefetch(self, graph: DependencyGraph) -> Dict[Identifier, bytes]:
+        """ Read all files of a graph not read yet. Returns (and stores in graph.data) all contents. """
+
+        # order reads by path, files close in the listing tend to be close in storage
+        pending = sorted((identifier for identifier in graph.nodes
+                          if identifier not in graph.data and identifier not in graph.missing),
+                         key=lambda identifier: (isinstance(identifier, int), identifier))
+
+        if self.max_workers == 1 or len(pending) <= 1:
+            contents = [self._read(identifier, graph.nodes[identifier]) for identifier in pending]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                contents = list(executor.map(self._read, pending, [graph.nodes[identifier] for identifier in pending]))
+
+        for identifier, data in zip(pending, contents):
+            if data is None:
+                graph.missing.add(identifier)
+            else:
+                graph.data[identifier] = data
+
+        return graph.data
+
+    def resolve_and_prefetch(self, roots: Iterable[Identifier]) -> DependencyGraph:
+        """ Build the dependency graph of root files and read all of its files. """
+
+        graph = self.resolve(roots)
+        self.prefetch(graph)
+
+        return graph
@@ -0,0 +1,202 @@
+import copy
+import numpy as np
+
+from ..file_formats.m2_format import M2Vertex
+from ..file_formats.skin_format import M2SkinProfile, BONE_COUNT_MAX_VALUES
+from ..file_formats.wow_common_types import M2Versions, as_numpy
+from ..io_utils.types import uint16
+
+
+def triangle_bones(triangles: np.ndarray, bone_indices: np.ndarray, bone_weights: np.ndarray) -> np.ndarray:
+    """ Get the bones influencing each of (M, 3) triangles as a (M, 12) array, -1 marking unused or repeated slots. """
+
+    bones = np.where(bone_weights[triangles] > 0, bone_indices[triangles], -1).reshape(len(triangles), -1)
+    bones.sort(axis=1)
+    bones[:, 1:][bones[:, 1:] == bones[:, :-1]] = -1
+
+    return bones
+
+
+def _find_range(table: np.ndarray, values: np.ndarray) -> int:
+    """ Get the start of the first occurrence of values as a contiguous range of table, -1 if there is none. """
+
+    if len(values) > len(table):
+        return -1
+
+    if not len(values):
+        return 0
+
+    windows = np.lib.stride_tricks.sliding_window_view(table, len(values))
+    matches = np.flatnonzero((windows == values).all(axis=1))
+
+    return int(matches[0]) if len(matches) else -1
+
+
+def partition_triangles(bones: np.ndarray, max_bones: int) -> np.ndarray:
+    """ Greedily assign triangles to partitions referencing at most max_bones bones each.
+
+    bones is a (M, K) array of bones of each triangle (see triangle_bones()). A partition is seeded with
+    the first unassigned triangle, absorbs all triangles whose bones it already holds, and grows by the
+    bones of the triangle adding the fewest new ones, until no triangle fits. Returns the partition index
+    of each triangle.
+    """
+
+    n_triangles = len(bones)
+    partition = np.full(n_triangles, -1, dtype=np.int64)
+
+    if not n_triangles:
+        return partition
+
+    n_bones = int(bones.max(initial=-1)) + 2            # last slot stands for unused slots (-1)
+    valid = bones >= 0
+    n_partitions = 0
+
+    while True:
+        remaining = np.flatnonzero(partition < 0)
+        if not len(remaining):
+            break
+
+        seed_bones = bones[remaining[0]][valid[remaining[0]]]
+        if len(seed_bones) > max_bones:
+            raise ValueError('Triangle {} is influenced by {} bones, more than the partition limit of {}.'
+                             .format(remaining[0], len(seed_bones), max_bones))
+
+        in_partition = np.zeros(n_bones, dtype=bool)
+        in_partition[-1] = True
+        in_partition[seed_bones] = True
+        n_partition_bones = len(seed_bones)
+
+        while True:
+            missing = np.count_nonzero(~in_partition[bones[remaining]], axis=1)
+
+            partition[remaining[missing == 0]] = n_partitions
+            candidates = missing > 0
+            remaining, missing = remaining[candidates], missing[candidates]
+
+            fits = np.flatnonzero(missing <= max_bones - n_partition_bones)
+            if not len(fits):
+                break
+
+            # the candidate adding the fewest bones, the first one in order on ties
+            best = remaining[fits[np.argmin(missing[fits])]]
+            new_bones = bones[best][valid[best]]
+            n_partition_bones += np.count_nonzero(~in_partition[new_bones])
+            in_partition[new_bones] = True
+
+        n_partitions += 1
+
+    return partition
+
+
+def partition_skin(m2, skin, max_bones: int = 64) -> M2SkinProfile:
+    """ Build a new skin profile from a skin profile of an M2 model, whose submeshes reference at most max_bones
+    bones each. The source skin is not modified, bone lookup ranges not found in the bone lookup table of the
+    model are appended to it.
+
+    Submeshes are split into bone partitions with the same mesh part id and material, the texture units
+    (and shadow batches) of a split submesh are repeated for each of its parts. Vertices shared by several
+    parts are duplicated. Every part references a range of the bone lookup table holding only the bones used
+    by its vertices, identical ranges already in the table are reused, and local bone indices are rebuilt
+    from the bone indices of the model vertices. Raises ValueError if the duplicated vertices do not fit into
+    the 16-bit indices of a skin.
+    """
+
+    root = m2.root
+
+    with m2.context.activate():
+        vertex_indices = as_numpy(skin.vertex_indices.values, uint16).astype(np.int64)
+        triangle_indices = as_numpy(skin.triangle_indices.values, uint16).astype(np.int64)
+        vertices = as_numpy(root.vertices.values, M2Vertex)
+
+        bone_indices = vertices['bone_indices'][vertex_indices].astype(np.int64)
+        bone_weights = vertices['bone_weights'][vertex_indices]
+
+        result = M2SkinProfile()
+        if hasattr(skin, 'magic'):
+            result.magic = skin.magic
+
+        lookup = as_numpy(root.bone_lookup_table.values, uint16).astype(np.int64)
+        n_lookup = len(lookup)
+        submesh_parts = []
+
+        part_vertex_indices = []
+        part_bone_indices = []
+        part_triangle_indices = []
+        n_vertices = n_indices = 0
+        bone_count_max = 0
+
+        for submesh in skin.submeshes:
+            triangles = triangle_indices[submesh.index_start:submesh.index_start + submesh.index_count].reshape(-1, 3)
+            partition = partition_triangles(triangle_bones(triangles, bone_indices, bone_weights), max_bones)
+            parts = []
+
+            for part in range(int(partition.max(initial=0)) + 1):
+                part_triangles = triangles[partition == part]
+                used, local_triangles = np.unique(part_triangles, return_inverse=True)
+
+                if n_vertices + len(used) > 0xFFFF:
+                    raise ValueError('Partitioned skin needs more than 65535 vertices.')
+
+                weighted = bone_weights[used] > 0
+                bones = np.unique(bone_indices[used][weighted])
+
+                # local bone indices into the lookup range of the part, unweighted slots point to its first bone
+                local_bones = np.where(weighted, np.searchsorted(bones, bone_indices[used]), 0)
+
+                part_submesh = copy.copy(submesh)
+                part_submesh.vertex_start = n_vertices
+                part_submesh.vertex_count = len(used)
+                part_submesh.index_start = n_indices
+                part_submesh.index_count = part_triangles.size
+                part_submesh.bone_count = len(bones)
+                part_submesh.bone_influences = max(int(np.count_nonzero(weighted, axis=1).max(initial=0)), 1)
+
+                part_submesh.bone_combo_index = _find_range(lookup, bones)
+                if part_submesh.bone_combo_index < 0:
+                    part_submesh.bone_combo_index = len(lookup)
+                    lookup = np.concatenate((lookup, bones))
+
+                part_vertex_indices.append(vertex_indices[used])
+                part_bone_indices.append(local_bones)
+                part_triangle_indices.append(local_triangles.ravel() + n_vertices)
+
+                parts.append(len(result.submeshes))
+                result.submeshes.append(part_submesh)
+
+                n_vertices += len(used)
+                n_indices += part_triangles.size
+                bone_count_max = max(bone_count_max, len(bones))
+
+            submesh_parts.append(parts)
+
+        # repeat the texture units and shadow batches of split submeshes for each part
+        for texture_unit in skin.texture_units:
+            for part in submesh_parts[texture_unit.skin_section_index]:
+                part_unit = copy.copy(texture_unit)
+                part_unit.skin_section_index = part
+
+                if texture_unit.geoset_index == texture_unit.skin_section_index:
+                    part_unit.geoset_index = part
+
+                result.texture_units.append(part_unit)
+
+        if m2.version >= M2Versions.CATA:
+            for batch in skin.shadow_batches:
+                for part in submesh_parts[batch.submesh_id]:
+                    part_batch = copy.copy(batch)
+                    part_batch.submesh_id = part
+                    result.shadow_batches.append(part_batch)
+
+        root.bone_lookup_table.extend(lookup[n_lookup:].tolist())
+
+        result.vertex_indices.values = np.concatenate(part_vertex_indices).astype(np.uint16) \
+            if part_vertex_indices else np.empty(0, dtype=np.uint16)
+        result.bone_indices.values = np.concatenate(part_bone_indices).astype(np.uint8) \
+            if part_bone_indices else np.empty((0, 4), dtype=np.uint8)
+        result.triangle_indices.values = np.concatenate(part_triangle_indices).astype(np.uint16) \
+            if part_triangle_indices else np.empty(0, dtype=np.uint16)
+
+        result.bone_count_max = next((value for value in BONE_COUNT_MAX_VALUES if value >= bone_count_max),
+                                     bone_count_max)
+
+    return result
@@ -0,0 +1,155 @@
+import numpy as np
+
+from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .m2_pose import M2PoseEvaluator
+from ..file_formats.m2_format import M2Vertex
+from ..file_formats.wow_common_types import M2Versions, as_numpy
+
+
+Bounds = Tuple[Tuple[float, float, float], Tuple[float, float, float], float]
+
+# upper limit for the size of blended bone matrices computed at once, in bytes
+_BLEND_CHUNK_SIZE = 32 * 1024 * 1024
+
+
+def skin_positions(positions: np.ndarray, bone_indices: np.ndarray, bone_weights: np.ndarray,
+                   matrices: np.ndarray) -> np.ndarray:
+    """ Skin (V, 3) positions with (V, 4) bone indices and normalized weights using (T, B, 4, 4) bone matrices.
+        Returns (T, V, 3) float32 positions. Vertices without weights are left untransformed.
+    """
+
+    n_times, n_vertices = len(matrices), len(positions)
+    skinned = np.empty((n_times, n_vertices, 3), dtype=np.float32)
+
+    if not n_vertices:
+        return skinned
+
+    affine = matrices[:, :, :3, :]
+    unweighted = ~bone_weights.any(axis=1)
+    chunk = max(1, _BLEND_CHUNK_SIZE // (n_vertices * 12 * 8))
+
+    for start in range(0, n_times, chunk):
+        blended = np.zeros((min(chunk, n_times - start), n_vertices, 3, 4))
+
+        for k in range(4):
+            blended += bone_weights[:, k, None, None] * affine[start:start + chunk, bone_indices[:, k]]
+
+        result = np.einsum('tvij,vj->tvi', blended[..., :3], positions) + blended[..., 3]
+        result[:, unweighted] = positions[unweighted]
+        skinned[start:start + chunk] = result
+
+    return skinned
+
+
+def points_bounds(points: np.ndarray) -> Bounds:
+    """ Get the AABB of (..., 3) points and the radius of the sphere around the box center enclosing them. """
+
+    points = points.reshape(-1, 3)
+
+    if not len(points):
+        return (0.0, 0.0, 0.0), (0.0, 0.0, 0.0), 0.0
+
+    min_ = points.min(axis=0)
+    max_ = points.max(axis=0)
+    center = (min_.astype(np.float64) + max_) / 2
+    radius = float(np.sqrt(np.max(np.sum((points - center) ** 2, axis=1))))
+
+    return tuple(map(float, min_)), tuple(map(float, max_)), radius
+
+
+def sequence_bounds(evaluator: M2PoseEvaluator, positions: np.ndarray, bone_indices: np.ndarray,
+                    bone_weights: np.ndarray, sequence_index: int, time_step: float = 1000 / 30) -> Bounds:
+    """ Get the bounds of skinned vertices over a sequence sampled every time_step milliseconds and at its end. """
+
+    duration = evaluator.sequence_duration(sequence_index)
+    times = np.append(np.arange(0.0, duration, time_step), float(duration))
+
+    if len(evaluator.parents):
+        matrices = evaluator.evaluate(sequence_index, times)
+    else:
+        matrices = np.broadcast_to(np.eye(4), (len(times), 1, 4, 4))
+
+    return points_bounds(skin_positions(positions, bone_indices, bone_weights, matrices))
+
+
+# evaluator, vertex data and time step sent once to each worker process by _init_worker()
+_worker_arguments = None
+
+
+def _init_worker(*arguments):
+    global _worker_arguments
+    _worker_arguments = arguments
+
+
+def _worker_sequence_bounds(sequence_index: int) -> Bounds:
+    evaluator, positions, bone_indices, bone_weights, time_step = _worker_arguments
+    return sequence_bounds(evaluator, positions, bone_indices, bone_weights, sequence_index, time_step)
+
+
+def compute_bounds(m2, time_step: float = 1000 / 30, max_workers: int = 1, update_header: bool = True) -> List[Bounds]:
+    """ Compute animated bounds of all sequences of an M2 model and write them into the sequences.
+
+    Each sequence is sampled every time_step milliseconds (and at its end), vertices are skinned with their
+    4 bone weights for all samples at once. With update_header, the union of all sequences (or the rest pose
+    if there are none) is written to the bounding box and bounding sphere radius of the header.
+    With max_workers > 1 sequences are processed in a process pool: the pose evaluator, holding all decoded
+    track keys, and the vertex data are sent once to each worker, which evaluates poses and skins vertices
+    of the sequences it is given.
+    Sequences stored in .anim files need to be loaded with M2File.read_additional_files() first.
+
+    Returns a list of (min, max, radius) bounds per sequence.
+    """
+
+    root = m2.root
+
+    with m2.context.activate():
+        vertices = as_numpy(root.vertices.values, M2Vertex)
+
+    positions = vertices['pos'].astype(np.float64)
+    bone_indices = vertices['bone_indices'].astype(np.int64)
+    bone_weights = vertices['bone_weights'] / 255.0
+
+    n_bones = len(root.bones)
+    if not n_bones:
+        bone_indices = np.zeros_like(bone_indices)
+        bone_weights = np.zeros_like(bone_weights)
+    elif len(positions) and bone_indices.max() >= n_bones:
+        raise ValueError('Vertex references bone {}, model has only {} bones.'.format(bone_indices.max(), n_bones))
+
+    evaluator = M2PoseEvaluator(m2)
+    n_sequences = len(root.sequences)
+
+    if max_workers > 1 and n_sequences > 1:
+        arguments = (evaluator, positions, bone_indices, bone_weights, time_step)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=arguments) as executor:
+            bounds = list(executor.map(_worker_sequence_bounds, range(n_sequences)))
+    else:
+        bounds = [sequence_bounds(evaluator, positions, bone_indices, bone_weights, i, time_step)
+                  for i in range(n_sequences)]
+
+    for sequence, (min_, max_, radius) in zip(root.sequences, bounds):
+        sequence.bounds.extent.min = min_
+        sequence.bounds.extent.max = max_
+        sequence.bounds.radius = radius
+
+    if update_header:
+        if bounds:
+            corners = np.array([corner for min_, max_, _ in bounds for corner in (min_, max_)])
+            min_, max_, _ = points_bounds(corners)
+            center = (np.array(min_) + max_) / 2
+
+            # enclose each sequence sphere, centered on its own box, in a sphere around the union box center
+            radius = max(float(np.linalg.norm((np.array(s_min) + s_max) / 2 - center)) + s_radius
+                         for s_min, s_max, s_radius in bounds)
+            radius = min(radius, float(np.linalg.norm(np.array(max_) - min_)) / 2)
+        else:
+            min_, max_, radius = points_bounds(positions)
+
+        root.bounding_box.min = min_
+        root.bounding_box.max = max_
+        root.bounding_sphere_radius = radius
+
+    return bounds
@@ -0,0 +1,364 @@
+import json
+import shutil
+import struct
+import tempfile
+import numpy as np
+
+from typing import List, Optional
+
+from .m2_pose import M2Interpolation, M2PoseEvaluator
+from ..enums.m2_enums import M2SequenceNames
+from ..file_formats.m2_format import M2Vertex, M2SequenceFlags
+from ..file_formats.wow_common_types import M2Versions, as_numpy
+from ..io_utils.types import uint16
+
+
+GLB_MAGIC = 0x46546C67
+GLB_VERSION = 2
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+
+# accessor component types
+UNSIGNED_BYTE = 5121
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+FLOAT = 5126
+
+# buffer view targets
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+# WoW is Z-up, glTF is Y-up: the root node rotates the model by -90 degrees around X
+Z_UP_TO_Y_UP = [-0.7071067811865476, 0.0, 0.0, 0.7071067811865476]
+
+# attribute byte offsets in the 48 byte M2Vertex layout, used directly as the interleaved vertex buffer
+VERTEX_ATTRIBUTES = (
+    ('POSITION', 'pos', FLOAT, 'VEC3', False),
+    ('WEIGHTS_0', 'bone_weights', UNSIGNED_BYTE, 'VEC4', True),
+    ('JOINTS_0', 'bone_indices', UNSIGNED_BYTE, 'VEC4', False),
+    ('NORMAL', 'normal', FLOAT, 'VEC3', False),
+    ('TEXCOORD_0', 'tex_coords', FLOAT, 'VEC2', False),
+    ('TEXCOORD_1', 'tex_coords2', FLOAT, 'VEC2', False)
+)
+
+class GLBWriter:
+    """ Collects binary blobs, buffer views and accessors of a glTF document and writes it to a .glb file.
+
+    Blobs are spooled to a temporary file as they are added, so only the blob being added is held in memory.
+    write() emits the JSON chunk once every buffer view is known, then copies the spooled binary chunk after it.
+    """
+
+    def __init__(self):
+        self.gltf = {'asset': {'version': '2.0', 'generator': 'pywowlib'}, 'buffers': [], 'bufferViews': [],
+                     'accessors': []}
+        self.spool = tempfile.TemporaryFile()
+        self.size = 0
+
+    def add_view(self, data: np.ndarray, target: Optional[int] = None, stride: Optional[int] = None) -> int:
+        data = np.ascontiguousarray(data)
+
+        view = {'buffer': 0, 'byteOffset': self.size, 'byteLength': data.nbytes}
+        if target is not None:
+            view['target'] = target
+        if stride is not None:
+            view['byteStride'] = stride
+
+        # buffer views are aligned to 4 bytes
+        self.spool.write(memoryview(data).cast('B'))
+        self.spool.write(b'\x00' * ((4 - data.nbytes % 4) % 4))
+        self.size += (data.nbytes + 3) & ~3
+
+        self.gltf['bufferViews'].append(view)
+        return len(self.gltf['bufferViews']) - 1
+
+    def add_accessor(self, view: int, component_type: int, count: int, type_: str, offset: int = 0,
+                     normalized: bool = False, min_=None, max_=None) -> int:
+        accessor = {'bufferView': view, 'componentType': component_type, 'count': count, 'type': type_}
+
+        if offset:
+            accessor['byteOffset'] = offset
+        if normalized:
+            accessor['normalized'] = True
+        if min_ is not None:
+            accessor['min'] = [float(value) for value in min_]
+            accessor['max'] = [float(value) for value in max_]
+
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+    def add_array(self, data: np.ndarray, type_: str, with_bounds: bool = False) -> int:
+        """ Add a float32 array as its own buffer view and accessor. """
+
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        components = data.reshape(len(data), -1)
+
+        bounds = (components.min(axis=0), components.max(axis=0)) if with_bounds and len(data) else (None, None)
+        return self.add_accessor(self.add_view(data), FLOAT, len(data), type_, min_=bounds[0], max_=bounds[1])
+
+    def write(self, filepath: str):
+        self.gltf['buffers'] = [{'byteLength': self.size}] if self.size else []
+
+        json_data = json.dumps(self.gltf, separators=(',', ':')).encode('utf-8')
+        json_data += b' ' * ((4 - len(json_data) % 4) % 4)
+
+        length = 12 + 8 + len(json_data) + (8 + self.size if self.size else 0)
+
+        with open(filepath, 'wb') as f:
+            f.write(struct.pack('<III', GLB_MAGIC, GLB_VERSION, length))
+            f.write(struct.pack('<II', len(json_data), GLB_CHUNK_JSON))
+            f.write(json_data)
+
+            if self.size:
+                f.write(struct.pack('<II', self.size, GLB_CHUNK_BIN))
+
+                self.spool.seek(0)
+                shutil.copyfileobj(self.spool, f)
+
+    def close(self):
+        self.spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _texture_name(m2, texture_unit) -> str:
+    root = m2.root
+
+    if texture_unit.texture_combo_index < len(root.texture_lookup_table):
+        texture_index = root.texture_lookup_table[texture_unit.texture_combo_index]
+
+        if texture_index < len(root.textures):
+            texture = root.textures[texture_index]
+            return texture.filename.value or (str(texture.fdid) if texture.fdid else 'texture_{}'.format(texture_index))
+
+    return 'material_{}'.format(texture_unit.material_index)
+
+
+def _add_materials(writer: GLBWriter, m2, skin) -> dict:
+    """ Add a material per distinct (render flags, texture) pair of the skin, get the material of each submesh. """
+
+    root = m2.root
+    materials = {}
+    submesh_materials = {}
+
+    # the first texture unit of a submesh, by material layer, defines its material
+    for texture_unit in sorted(skin.texture_units, key=lambda unit: unit.material_layer):
+        if texture_unit.skin_section_index in submesh_materials:
+            continue
+
+        name = _texture_name(m2, texture_unit)
+        key = (texture_unit.material_index, name)
+
+        if key not in materials:
+            material = {'name': name, 'pbrMetallicRoughness': {'metallicFactor': 0.0}, 'extras': {'texture': name}}
+
+            if texture_unit.material_index < len(root.materials):
+                render_flags = root.materials[texture_unit.material_index]
+
+                if render_flags.flags & 0x4:
+                    material['doubleSided'] = True
+                if render_flags.blending_mode == 1:
+                    material['alphaMode'] = 'MASK'
+                elif render_flags.blending_mode > 1:
+                    material['alphaMode'] = 'BLEND'
+
+            materials[key] = len(materials)
+            writer.gltf.setdefault('materials', []).append(material)
+
+        submesh_materials[texture_unit.skin_section_index] = materials[key]
+
+    return submesh_materials
+
+
+def _spline_output(timestamps: np.ndarray, values: np.ndarray, interpolation: int) -> np.ndarray:
+    """ Convert M2 spline keys (value, in tangent, out tangent) to glTF CUBICSPLINE output, tangents per second. """
+
+    value, in_tangent, out_tangent = values[:, 0], values[:, 1], values[:, 2]
+
+    if interpolation == M2Interpolation.BEZIER:
+        # Bezier control points to Hermite tangents of the segments
+        out_tangent = 3.0 * (out_tangent - value)
+        in_tangent = 3.0 * (value - in_tangent)
+
+    span = np.diff(timestamps) / 1000.0
+    span = np.where(span > 0, span, 1.0)[:, None]
+
+    output = np.zeros((len(values), 3, values.shape[2]))
+    output[1:, 0] = in_tangent[1:] / span
+    output[:, 1] = value
+    output[:-1, 2] = out_tangent[:-1] / span
+
+    return output
+
+
+def _add_animations(writer: GLBWriter, m2, evaluator: M2PoseEvaluator, first_bone_node: int):
+    root = m2.root
+    names = M2SequenceNames()
+    animations = []
+
+    for sequence_index, sequence in enumerate(root.sequences):
+        if sequence.flags & M2SequenceFlags.is_alias:
+            continue
+
+        samplers = []
+        channels = []
+
+        for bone_index in range(len(root.bones)):
+            parent = evaluator.parents[bone_index]
+            offset = evaluator.pivots[bone_index] - (evaluator.pivots[parent] if parent >= 0 else 0.0)
+
+            for track_name in ('translation', 'rotation', 'scale'):
+                timestamps, values, interpolation = evaluator.track_keys(bone_index, track_name, sequence_index)
+
+                if not len(timestamps):
+                    continue
+
+                track = getattr(root.bones[bone_index], track_name)
+                if m2.version < M2Versions.WOTLK and track.global_sequence < 0:
+                    timestamps = timestamps - sequence.start_timestamp
+
+                # glTF needs strictly increasing times, keep the last key of equal timestamps
+                unique = np.append(timestamps[1:] > timestamps[:-1], True)
+                timestamps, values = timestamps[unique], values[unique]
+
+                if track_name == 'rotation':
+                    # glTF quaternions are unit (x, y, z, w)
+                    values = values[..., [1, 2, 3, 0]]
+                    key_values = values[:, 0] if values.ndim == 3 else values
+                    key_values /= np.maximum(np.linalg.norm(key_values, axis=-1, keepdims=True), 1e-12)
+
+                if values.ndim == 3:
+                    output = _spline_output(timestamps, values, interpolation)
+                    if track_name == 'translation':
+                        output[:, 1] += offset
+                    mode = 'CUBICSPLINE'
+                else:
+                    output = values + offset if track_name == 'translation' else values
+                    mode = 'STEP' if interpolation == M2Interpolation.NONE else 'LINEAR'
+
+                times = writer.add_array(timestamps / 1000.0, 'SCALAR', with_bounds=True)
+                output = writer.add_array(output.reshape(-1, output.shape[-1]),
+                                          'VEC4' if track_name == 'rotation' else 'VEC3')
+
+                samplers.append({'input': times, 'output': output, 'interpolation': mode})
+                channels.append({'sampler': len(samplers) - 1,
+                                 'target': {'node': first_bone_node + bone_index, 'path': track_name}})
+
+        if channels:
+            name = names.get_sequence_name(sequence.id) or 'Sequence'
+            animations.append({'name': '{}_{}_{}'.format(sequence_index, name, sequence.variation_index),
+                               'samplers': samplers, 'channels': channels,
+                               'extras': {'id': sequence.id, 'variation_index': sequence.variation_index}})
+
+    if animations:
+        writer.gltf['animations'] = animations
+
+
+def export_glb(m2, filepath: str, skin_index: int = 0, animations: bool = True):
+    """ Export the mesh of a skin profile, the skeleton and bone animations of an M2 model to a binary glTF file.
+
+    Model vertices are written as a single interleaved buffer in their M2 layout, each submesh is a primitive
+    indexing it. Bones become joint nodes with their pivot as origin, every sequence becomes an animation
+    with one channel per bone track; sequences stored in .anim files need to be loaded first.
+    Textures are referenced by name only (material name and extras), BLP images are not embedded.
+    Binary data is spooled to a temporary file while the model is exported, see GLBWriter.
+    """
+
+    root = m2.root
+
+    with GLBWriter() as writer:
+        gltf = writer.gltf
+
+        with m2.context.activate():
+            vertices = as_numpy(root.vertices.values, M2Vertex).copy()
+            skin = m2.skins[skin_index]
+
+            vertex_indices = as_numpy(skin.vertex_indices.values, uint16).astype(np.int64)
+            triangle_indices = as_numpy(skin.triangle_indices.values, uint16).astype(np.int64)
+
+            n_bones = len(root.bones)
+            n_vertices = len(vertices)
+
+            # glTF skins need a weight on every vertex, static vertices are bound to the first bone
+            unweighted = ~vertices['bone_weights'].any(axis=1)
+            vertices['bone_weights'][unweighted, 0] = 255
+            vertices['bone_indices'][unweighted, 0] = 0
+
+            vertex_view = writer.add_view(vertices, ARRAY_BUFFER, vertices.itemsize)
+            attributes = {}
+
+            for attribute, field, component_type, type_, normalized in VERTEX_ATTRIBUTES:
+                if not n_bones and attribute in ('WEIGHTS_0', 'JOINTS_0'):
+                    continue
+
+                bounds = (vertices[field].min(axis=0), vertices[field].max(axis=0)) \
+                    if attribute == 'POSITION' and n_vertices else (None, None)
+
+                attributes[attribute] = writer.add_accessor(vertex_view, component_type, n_vertices, type_,
+                                                            M2Vertex.dtype.fields[field][1], normalized, *bounds)
+
+            # skin triangles reference the skin vertex list, map them to model vertices
+            index_dtype, index_type = (np.uint16, UNSIGNED_SHORT) if n_vertices <= 0xFFFF else (np.uint32, UNSIGNED_INT)
+            indices = vertex_indices[triangle_indices].astype(index_dtype) if len(triangle_indices) \
+                else np.empty(0, dtype=index_dtype)
+            index_view = writer.add_view(indices, ELEMENT_ARRAY_BUFFER)
+
+            submesh_materials = _add_materials(writer, m2, skin)
+            primitives = []
+
+            for submesh_index, submesh in enumerate(skin.submeshes):
+                if not submesh.index_count:
+                    continue
+
+                primitive = {'attributes': attributes,
+                             'indices': writer.add_accessor(index_view, index_type, submesh.index_count, 'SCALAR',
+                                                            submesh.index_start * indices.itemsize),
+                             'extras': {'skin_section_id': submesh.skin_section_id}}
+
+                if submesh_index in submesh_materials:
+                    primitive['material'] = submesh_materials[submesh_index]
+
+                primitives.append(primitive)
+
+            name = root.name.value or 'model'
+
+            gltf['scene'] = 0
+            gltf['scenes'] = [{'nodes': [0]}]
+            gltf['nodes'] = [{'name': name, 'rotation': Z_UP_TO_Y_UP, 'children': [1]},
+                             {'name': name + '_mesh', 'mesh': 0}]
+            gltf['meshes'] = [{'name': name, 'primitives': primitives}]
+
+            if n_bones:
+                evaluator = M2PoseEvaluator(m2)
+                first_bone_node = len(gltf['nodes'])
+
+                for bone_index, bone in enumerate(root.bones):
+                    parent = evaluator.parents[bone_index]
+                    translation = evaluator.pivots[bone_index] - (evaluator.pivots[parent] if parent >= 0 else 0.0)
+
+                    node = {'name': getattr(bone, 'name', 'Bone') + '_{}'.format(bone_index),
+                            'translation': translation.tolist()}
+                    gltf['nodes'].append(node)
+
+                    if parent >= 0:
+                        gltf['nodes'][first_bone_node + parent].setdefault('children', []).append(
+                            first_bone_node + bone_index)
+                    else:
+                        gltf['nodes'][0]['children'].append(first_bone_node + bone_index)
+
+                # bind space is the unrotated model space: inverse bind matrices only remove the pivots
+                inverse_bind = np.tile(np.eye(4, dtype=np.float32), (n_bones, 1, 1))
+                inverse_bind[:, 3, :3] = -evaluator.pivots                 # column-major translation
+                inverse_bind_accessor = writer.add_array(inverse_bind.reshape(n_bones, 16), 'MAT4')
+
+                gltf['skins'] = [{'joints': list(range(first_bone_node, first_bone_node + n_bones)),
+                                  'inverseBindMatrices': inverse_bind_accessor, 'skeleton': 0}]
+                gltf['nodes'][1]['skin'] = 0
+
+                if animations:
+                    _add_animations(writer, m2, evaluator, first_bone_node)
+
+        writer.write(filepath)
@@ -0,0 +1,301 @@
+import numpy as np
+
+from typing import Iterator, Optional, Tuple
+from contextlib import contextmanager
+
+from ..file_formats.m2_format import M2Vertex
+from ..file_formats.wow_common_types import as_numpy
+from ..io_utils.types import uint8, uint16, Array
+
+# compiled vertex cache optimisation (see build.py), optimize_vertex_cache() runs in Python without it
+try:
+    from .vertex_cache.vertex_cache import optimize_vertex_cache as _optimize_vertex_cache_native
+except ImportError:
+    _optimize_vertex_cache_native = None
+
+
+# Forsyth's linear-speed vertex cache optimisation, scores of a simulated LRU cache
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+_MAX_VALENCE = 64
+
+
+def _score_table(cache_size: int) -> np.ndarray:
+    """ Get vertex scores indexed by [cache position + 1, remaining triangle count], position -1 is out of cache. """
+
+    positions = np.arange(-1, cache_size)[:, None]
+    valences = np.arange(_MAX_VALENCE + 1)[None, :]
+
+    cache_scores = np.where(positions < 3, LAST_TRIANGLE_SCORE,
+                            ((cache_size - positions) / max(cache_size - 3, 1)) ** CACHE_DECAY_POWER)
+    cache_scores = np.where(positions < 0, 0.0, cache_scores)
+
+    valence_scores = VALENCE_BOOST_SCALE * np.maximum(valences, 1) ** -VALENCE_BOOST_POWER
+    scores = cache_scores + valence_scores
+    scores[:, 0] = -1.0
+
+    return scores
+
+
+def optimize_vertex_cache(triangles, n_vertices: Optional[int] = None,
+                          cache_size: int = CACHE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """ Order (M, 3) triangles for post-transform vertex cache locality (Tom Forsyth's algorithm).
+
+    Returns the new triangle order and a boolean mask of the ordered triangles which start a new cluster
+    (all of their vertices missed the simulated cache), used for overdraw sorting.
+    Runs in the compiled vertex_cache extension if it is built, in _optimize_vertex_cache_python() otherwise.
+    """
+
+    triangles = np.ascontiguousarray(np.asarray(triangles, dtype=np.int64).reshape(-1, 3))
+    n_triangles = len(triangles)
+
+    if n_vertices is None:
+        n_vertices = int(triangles.max(initial=-1)) + 1
+
+    if n_triangles <= 1:
+        return np.arange(n_triangles), np.ones(n_triangles, dtype=bool)
+
+    if _optimize_vertex_cache_native is not None:
+        return _optimize_vertex_cache_native(triangles, n_vertices, cache_size, _score_table(cache_size))
+
+    return _optimize_vertex_cache_python(triangles, n_vertices, cache_size)
+
+
+def _optimize_vertex_cache_python(triangles: np.ndarray, n_vertices: int,
+                                  cache_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Pure Python fallback of optimize_vertex_cache(), for builds without the vertex_cache extension. """
+
+    n_triangles = len(triangles)
+
+    # triangles of each vertex, emitted triangles are skipped instead of removed
+    flat = triangles.ravel()
+    order = np.argsort(flat, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(flat, minlength=n_vertices))))
+    owners = (order // 3).tolist()
+    offsets = offsets.tolist()
+
+    vertex_triangles = [owners[offsets[v]:offsets[v + 1]] for v in range(n_vertices)]
+    live = [len(tris) for tris in vertex_triangles]
+    corners = triangles.tolist()
+
+    table = _score_table(cache_size).tolist()
+    max_valence = _MAX_VALENCE
+
+    vertex_score = [table[0][min(count, max_valence)] for count in live]
+    triangle_score = [vertex_score[a] + vertex_score[b] + vertex_score[c] for a, b, c in corners]
+    added = [False] * n_triangles
+
+    cache = []
+    result = []
+    restarts = []
+    best = max(range(n_triangles), key=triangle_score.__getitem__)
+    cursor = 0
+
+    for _ in range(n_triangles):
+        if best < 0:
+            # no candidate around the cache, continue with the next triangle not emitted yet
+            while added[cursor]:
+                cursor += 1
+            best = cursor
+
+        tri = corners[best]
+        added[best] = True
+        result.append(best)
+        restarts.append(not any(v in cache for v in tri))
+
+        for v in tri:
+            live[v] -= 1
+
+        cache = tri + [v for v in cache if v not in tri]
+        evicted = cache[cache_size:]
+        cache = cache[:cache_size]
+
+        for position, v in enumerate(cache):
+            vertex_score[v] = table[position + 1][min(live[v], max_valence)]
+
+        for v in evicted:
+            vertex_score[v] = table[0][min(live[v], max_valence)]
+
+        best, best_score = -1, -1.0
+        for v in cache:
+            if not live[v]:
+                continue
+
+            for t in vertex_triangles[v]:
+                if added[t]:
+                    continue
+
+                a, b, c = corners[t]
+                score = vertex_score[a] + vertex_score[b] + vertex_score[c]
+
+                if score > best_score:
+                    best, best_score = t, score
+
+    return np.array(result, dtype=np.int64), np.array(restarts, dtype=bool)
+
+
+def optimize_overdraw(positions, triangles, cluster_starts) -> np.ndarray:
+    """ Order clusters of cache-ordered (M, 3) triangles so that outward facing clusters are drawn first.
+
+    cluster_starts is a boolean mask of triangles starting a cluster (see optimize_vertex_cache()).
+    Clusters are sorted by the offset of their centroid from the mesh centroid along their average normal,
+    clusters which are likely to occlude the rest of the mesh come first. Returns the new triangle order.
+    """
+
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+    starts = np.flatnonzero(cluster_starts)
+    if len(starts) <= 1:
+        return np.arange(len(triangles))
+
+    if starts[0] != 0:
+        starts = np.concatenate(([0], starts))
+
+    p0, p1, p2 = (positions[triangles[:, k]] for k in range(3))
+    normals = np.cross(p1 - p0, p2 - p0)                             # area weighted
+    areas = np.linalg.norm(normals, axis=1)
+    centroids = (p0 + p1 + p2) / 3 * areas[:, None]
+
+    total_area = max(float(areas.sum()), np.finfo(np.float64).tiny)
+    mesh_centroid = centroids.sum(axis=0) / total_area
+
+    cluster_areas = np.maximum(np.add.reduceat(areas, starts), np.finfo(np.float64).tiny)
+    cluster_centroids = np.add.reduceat(centroids, starts) / cluster_areas[:, None]
+    cluster_normals = np.add.reduceat(normals, starts)
+
+    keys = np.einsum('ij,ij->i', cluster_centroids - mesh_centroid, cluster_normals) / cluster_areas
+    cluster_order = np.argsort(-keys, kind='stable')
+
+    sizes = np.diff(np.append(starts, len(triangles)))
+    return np.concatenate([np.arange(starts[i], starts[i] + sizes[i]) for i in cluster_order])
+
+
+def optimize_vertex_fetch(triangles: np.ndarray, vertex_start: int, vertex_count: int) -> Optional[np.ndarray]:
+    """ Get a permutation of the vertex range used by triangles, ordering vertices by first use.
+        Returns new -> old vertex indices, None if the triangles reference vertices outside of the range.
+    """
+
+    flat = triangles.ravel()
+
+    if len(flat) and (flat.min() < vertex_start or flat.max() >= vertex_start + vertex_count):
+        return None
+
+    used, first_use = np.unique(flat, return_index=True)
+    used = used[np.argsort(first_use, kind='stable')]
+
+    unused = np.ones(vertex_count, dtype=bool)
+    unused[used - vertex_start] = False
+
+    return np.concatenate((used, vertex_start + np.flatnonzero(unused)))
+
+
+def average_cache_miss_ratio(triangles, cache_size: int = CACHE_SIZE) -> float:
+    """ Get the vertex transforms per triangle of (M, 3) triangles with a FIFO post-transform cache. """
+
+    cache = []
+    misses = 0
+
+    for v in np.asarray(triangles, dtype=np.int64).ravel().tolist():
+        if v not in cache:
+            misses += 1
+            cache.append(v)
+
+            if len(cache) > cache_size:
+                del cache[0]
+
+    return misses / max(len(triangles), 1)
+
+
+def optimize_skin(m2, skin, overdraw: bool = True, cache_size: int = CACHE_SIZE):
+    """ Reorder the triangles of each submesh of a skin profile for vertex cache locality, and optionally overdraw,
+    then renumber the vertices of each submesh by first use for fetch locality.
+
+    Submesh vertex and index ranges stay valid. Submeshes sharing the same vertex range are renumbered
+    together; vertices of submeshes with partially overlapping ranges, or referencing vertices outside of
+    their range, keep their order.
+    """
+
+    with m2.context.activate():
+        vertex_indices = as_numpy(skin.vertex_indices.values, uint16).copy()
+        triangle_indices = as_numpy(skin.triangle_indices.values, uint16).astype(np.int64)
+        bone_indices = as_numpy(skin.bone_indices.values, Array << (uint8, 4)).copy()
+
+        positions = as_numpy(m2.root.vertices.values, M2Vertex)['pos'][vertex_indices] if overdraw else None
+        submeshes = list(skin.submeshes)
+
+    # triangle order of each submesh
+    for submesh in submeshes:
+        start, stop = submesh.index_start, submesh.index_start + submesh.index_count
+        triangles = triangle_indices[start:stop].reshape(-1, 3)
+
+        if len(triangles) <= 1:
+            continue
+
+        order, cluster_starts = optimize_vertex_cache(triangles, len(vertex_indices), cache_size)
+        triangles = triangles[order]
+
+        if overdraw:
+            triangles = triangles[optimize_overdraw(positions, triangles, cluster_starts)]
+
+        triangle_indices[start:stop] = triangles.ravel()
+
+    # vertex order of each vertex range
+    ranges = {}
+    for submesh in submeshes:
+        ranges.setdefault((submesh.vertex_start, submesh.vertex_count), []).append(submesh)
+
+    overlapping = {(start, count) for start, count in ranges for other_start, other_count in ranges
+                   if (start, count) != (other_start, other_count)
+                   and start < other_start + other_count and other_start < start + count}
+
+    for (vertex_start, vertex_count), range_submeshes in ranges.items():
+        if (vertex_start, vertex_count) in overlapping or vertex_count <= 1:
+            continue
+
+        slices = [slice(submesh.index_start, submesh.index_start + submesh.index_count)
+                  for submesh in range_submeshes]
+        permutation = optimize_vertex_fetch(np.concatenate([triangle_indices[s] for s in slices]),
+                                            vertex_start, vertex_count)
+        if permutation is None:
+            continue
+
+        remap = np.empty(vertex_count, dtype=np.int64)
+        remap[permutation - vertex_start] = np.arange(vertex_start, vertex_start + vertex_count)
+
+        for s in slices:
+            triangle_indices[s] = remap[triangle_indices[s] - vertex_start]
+
+        vertex_indices[vertex_start:vertex_start + vertex_count] = vertex_indices[permutation]
+
+        if len(bone_indices) == len(vertex_indices):
+            bone_indices[vertex_start:vertex_start + vertex_count] = bone_indices[permutation]
+
+    skin.vertex_indices.values = vertex_indices
+    skin.triangle_indices.values = triangle_indices.astype(np.uint16)
+    skin.bone_indices.values = bone_indices
+
+
+@contextmanager
+def optimized_skins(m2, overdraw: bool = True) -> Iterator[None]:
+    """ Optimize the skins of an M2 model for the duration of a with-block, e.g. to write optimized files,
+        then restore the original index arrays.
+    """
+
+    arrays = [(array, array.values) for skin in m2.skins
+              for array in (skin.vertex_indices, skin.triangle_indices, skin.bone_indices)]
+
+    try:
+        for skin in m2.skins:
+            optimize_skin(m2, skin, overdraw)
+
+        yield
+
+    finally:
+        # optimisation replaces values of arrays, it never modifies the original values
+        for array, values in arrays:
+            array.values = values
@@ -0,0 +1,262 @@
+import numpy as np
+
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from .m2_pose import M2Interpolation, slerp
+from ..file_formats.m2_format import M2CompQuaternion
+from ..file_formats.wow_common_types import M2Versions, M2ParseContext, as_numpy, get_numpy_dtype
+from ..io_utils.types import uint32
+
+
+class KeyframeReductionReport(NamedTuple):
+    keys_before: int
+    keys_after: int
+    bytes_saved: int
+
+
+def _rotation_floats(values: np.ndarray, value_type) -> np.ndarray:
+    """ Get (N, 4) (w, x, y, z) float quaternions from raw rotation track values. """
+
+    if value_type is M2CompQuaternion:
+        return M2CompQuaternion.decompress(values).astype(np.float64)
+
+    # uncompressed quaternions are stored as (x, y, z, w)
+    return np.asarray(values, dtype=np.float64).reshape(-1, 4)[:, [3, 0, 1, 2]]
+
+
+def _interpolation_error(timestamps: np.ndarray, values: np.ndarray, indices: np.ndarray, a: np.ndarray,
+                         b: np.ndarray, rotation: bool) -> np.ndarray:
+    """ Get the error of keys at indices when interpolated between keys a and b. """
+
+    span = timestamps[b] - timestamps[a]
+    t = np.clip((timestamps[indices] - timestamps[a]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+
+    if rotation:
+        interpolated = slerp(values[a], values[b], t)
+        dot = np.abs(np.sum(interpolated * values[indices], axis=1))
+        return 2.0 * np.arccos(np.clip(dot, 0.0, 1.0))
+
+    interpolated = values[a] + (values[b] - values[a]) * t[:, None]
+    return np.linalg.norm(interpolated - values[indices], axis=1)
+
+
+def reduce_track_keys(timestamps, values, tolerance: float, interpolation: int = M2Interpolation.LINEAR,
+                      rotation: bool = False) -> np.ndarray:
+    """ Find keys of a track which are needed to reproduce it within tolerance. Returns a boolean mask of kept keys.
+
+    values are (N, C) floats, (w, x, y, z) quaternions for rotations where the error is the rotation angle in
+    radians. Linear tracks are reduced by repeatedly dropping a non-adjacent set of keys whose removal keeps
+    every original key within tolerance of the interpolated track. Step tracks drop keys repeating the previous
+    value. First and last keys are always kept.
+    """
+
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), -1)
+    n_keys = len(timestamps)
+
+    keep = np.ones(n_keys, dtype=bool)
+    if n_keys <= 2 or interpolation >= M2Interpolation.BEZIER:
+        return keep
+
+    if interpolation == M2Interpolation.NONE:
+        keep[1:-1] = np.any(values[1:-1] != values[:-2], axis=1)
+        return keep
+
+    all_indices = np.arange(n_keys)
+
+    while True:
+        kept = np.flatnonzero(keep)
+        n_kept = len(kept)
+        if n_kept <= 2:
+            break
+
+        # kept segment of every original key
+        segment = np.clip(np.searchsorted(kept, all_indices, side='right') - 1, 0, n_kept - 2)
+        errors = np.zeros(n_kept)
+
+        # error with the left end of the segment removed
+        left = segment >= 1
+        error = _interpolation_error(timestamps, values, all_indices[left], kept[segment[left] - 1],
+                                     kept[segment[left] + 1], rotation)
+        np.maximum.at(errors, segment[left], error)
+
+        # error with the right end of the segment removed
+        right = segment + 2 <= n_kept - 1
+        error = _interpolation_error(timestamps, values, all_indices[right], kept[segment[right]],
+                                     kept[segment[right] + 2], rotation)
+        np.maximum.at(errors, segment[right] + 1, error)
+
+        removable = errors <= tolerance
+        removable[[0, -1]] = False
+
+        # remove every other key of a run of removable keys, so that merged segments do not overlap
+        run_start = removable & ~np.concatenate(([False], removable[:-1]))
+        run_start_index = np.maximum.accumulate(np.where(run_start, np.arange(n_kept), 0))
+        remove = removable & ((np.arange(n_kept) - run_start_index) % 2 == 0)
+
+        if not remove.any():
+            break
+
+        keep[kept[remove]] = False
+
+    return keep
+
+
+def _key_segments(track, n_keys: int) -> Optional[List[Tuple[int, int]]]:
+    """ Get (start, stop) key slices of the sequences of a pre-WotLK track, None if ranges can not be reduced safely. """
+
+    if track.global_sequence >= 0:
+        return [(0, n_keys)]
+
+    segments = sorted((key_range.minimum, key_range.maximum + 1) for key_range in track.interpolation_ranges
+                      if key_range.maximum >= key_range.minimum)
+
+    for (start, stop), (next_start, _) in zip(segments, segments[1:] + [(n_keys, n_keys)]):
+        if stop > next_start or stop > n_keys:
+            return None
+
+    return segments
+
+
+def _reduce_bone_keys(jobs: List[tuple]) -> List[np.ndarray]:
+    """ Get the kept key masks of the tracks of a bone, jobs are reduce_track_keys() arguments. """
+    return [reduce_track_keys(*job) for job in jobs]
+
+
+def reduce_keyframes(m2, translation_tolerance: float = 1e-3, rotation_tolerance: float = 1e-3,
+                     scale_tolerance: float = 1e-3, max_workers: int = 1) -> KeyframeReductionReport:
+    """ Drop redundant translation, rotation and scale keys of all bones of an M2 model, in place.
+
+    Kept keys retain their exact stored values, rotations are compared as quaternions (error in radians).
+    Spline tracks are left untouched, as are sequences stored in .anim files that were not loaded.
+    With max_workers > 1 bones are reduced in a process pool, each worker is sent the key arrays of the
+    bones it is given.
+    """
+
+    tolerances = {'translation': translation_tolerance, 'rotation': rotation_tolerance, 'scale': scale_tolerance}
+    is_wotlk = m2.version >= M2Versions.WOTLK
+
+    # collect key arrays per bone: (track name, sequence index or key segments, timestamps, raw values)
+    bone_tracks = []
+    with m2.context.activate():
+        for bone in m2.root.bones:
+            tracks = []
+
+            for name in ('translation', 'rotation', 'scale'):
+                track = getattr(bone, name)
+
+                if is_wotlk:
+                    for index in range(len(track.timestamps)):
+                        timestamps, values = track.get_sequence(index)
+                        if len(timestamps) > 2 and len(values) == len(timestamps):
+                            tracks.append((name, index, timestamps, values))
+                else:
+                    timestamps = as_numpy(track.timestamps.values, uint32)
+                    values = as_numpy(track.values.values, track.value_type)
+                    segments = _key_segments(track, len(timestamps))
+
+                    if segments and len(values) == len(timestamps):
+                        tracks.append((name, segments, timestamps, values))
+
+            bone_tracks.append(tracks)
+
+    # reduce_track_keys() arguments per bone, plain NumPy arrays and numbers which can be sent to workers
+    jobs = []
+
+    for bone, tracks in zip(m2.root.bones, bone_tracks):
+        bone_jobs = []
+
+        for name, index, timestamps, values in tracks:
+            track = getattr(bone, name)
+            floats = _rotation_floats(values, track.value_type) if name == 'rotation' else values
+
+            for start, stop in ([(0, len(timestamps))] if is_wotlk else index):
+                bone_jobs.append((timestamps[start:stop], floats[start:stop], tolerances[name],
+                                  track.interpolation_type, name == 'rotation'))
+
+        jobs.append(bone_jobs)
+
+    if max_workers > 1 and sum(1 for bone_jobs in jobs if bone_jobs) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            masks = list(executor.map(_reduce_bone_keys, jobs, chunksize=max(len(jobs) // (max_workers * 4), 1)))
+    else:
+        masks = [_reduce_bone_keys(bone_jobs) for bone_jobs in jobs]
+
+    keys_before = keys_after = bytes_saved = 0
+
+    with m2.context.activate():
+        for bone, tracks, bone_masks in zip(m2.root.bones, bone_tracks, masks):
+            bone_masks = iter(bone_masks)
+
+            for name, index, timestamps, values in tracks:
+                track = getattr(bone, name)
+
+                if is_wotlk:
+                    mask = next(bone_masks)
+                    track.set_sequence(index, timestamps[mask], values[mask])
+                else:
+                    mask = np.ones(len(timestamps), dtype=bool)
+                    for start, stop in index:
+                        mask[start:stop] = next(bone_masks)
+
+                    # remap sequence key ranges to the reduced arrays
+                    new_indices = np.cumsum(mask) - 1
+                    if track.global_sequence < 0:
+                        for key_range in track.interpolation_ranges:
+                            if key_range.maximum >= key_range.minimum:
+                                key_range.minimum = int(new_indices[key_range.minimum])
+                                key_range.maximum = int(new_indices[key_range.maximum])
+
+                    track.timestamps.values = timestamps[mask]
+                    track.values.values = values[mask]
+
+                    # outside of NumPy mode arrays hold lists of values, as if they were read from a file
+                    if not M2ParseContext.current().numpy_arrays:
+                        track.timestamps._as_list()
+                        track.values._as_list()
+
+                n_removed = len(mask) - int(np.count_nonzero(mask))
+                keys_before += len(mask)
+                keys_after += len(mask) - n_removed
+                bytes_saved += n_removed * (uint32.size() + get_numpy_dtype(track.value_type).itemsize)
+
+    return KeyframeReductionReport(keys_before, keys_after, bytes_saved)
+
+
+@contextmanager
+def reduced_keyframes(m2, translation_tolerance: float = 1e-3, rotation_tolerance: float = 1e-3,
+                      scale_tolerance: float = 1e-3, max_workers: int = 1) -> Iterator[KeyframeReductionReport]:
+    """ Reduce the keyframes of an M2 model for the duration of a with-block, e.g. to write a reduced file,
+        then restore the original keys. Yields the reduction report.
+    """
+
+    arrays = []
+    key_ranges = []
+
+    with m2.context.activate():
+        for bone in m2.root.bones:
+            for name in ('translation', 'rotation', 'scale'):
+                track = getattr(bone, name)
+
+                for array in (track.timestamps, track.values):
+                    arrays.append((array, array.values))
+
+                    if m2.version >= M2Versions.WOTLK:
+                        arrays.extend((sequence_array, sequence_array.values) for sequence_array in array.values)
+
+                if m2.version < M2Versions.WOTLK:
+                    key_ranges.extend((key_range, key_range.minimum, key_range.maximum)
+                                      for key_range in track.interpolation_ranges)
+
+    try:
+        yield reduce_keyframes(m2, translation_tolerance, rotation_tolerance, scale_tolerance, max_workers)
+
+    finally:
+        # reduction replaces values of arrays and edits key ranges, it never modifies the original values
+        for array, values in arrays:
+            array.values = values
+
+        for key_range, minimum, maximum in key_ranges:
+            key_range.minimum, key_range.maximum = minimum, maximum
@@ -0,0 +1,289 @@
+import copy
+import numpy as np
+
+from typing import Iterable, List, Optional
+
+from ..file_formats.m2_format import M2Vertex
+from ..file_formats.skin_format import M2SkinProfile
+from ..file_formats.wow_common_types import M2Versions, as_numpy
+from ..io_utils.types import uint8, uint16, Array
+
+
+# weight of the planes constraining open edges (mesh borders and UV seams), relative to face planes
+BOUNDARY_WEIGHT = 100.0
+
+
+def _face_planes(positions: np.ndarray, triangles: np.ndarray):
+    """ Get unit normals, plane offsets and areas of (M, 3) triangles. """
+
+    p0, p1, p2 = (positions[triangles[:, k]] for k in range(3))
+    normals = np.cross(p1 - p0, p2 - p0)
+    lengths = np.linalg.norm(normals, axis=1)
+
+    normals /= np.where(lengths > 0, lengths, 1.0)[:, None]
+    offsets = -np.einsum('ij,ij->i', normals, p0)
+
+    return normals, offsets, lengths / 2
+
+
+def _plane_quadrics(normals: np.ndarray, offsets: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """ Get weighted (N, 4, 4) error quadrics of planes n.p + d = 0. """
+
+    planes = np.concatenate((normals, offsets[:, None]), axis=1)
+    return weights[:, None, None] * planes[:, :, None] * planes[:, None, :]
+
+
+def _vertex_quadrics(positions: np.ndarray, triangles: np.ndarray, boundary_weight: float) -> np.ndarray:
+    """ Accumulate face quadrics, and border constraint quadrics of open edges, per vertex. """
+
+    quadrics = np.zeros((len(positions), 4, 4))
+
+    normals, offsets, areas = _face_planes(positions, triangles)
+    face_quadrics = _plane_quadrics(normals, offsets, areas)
+
+    for k in range(3):
+        np.add.at(quadrics, triangles[:, k], face_quadrics)
+
+    # open edges are used by a single triangle, constrain them with a plane perpendicular to their face
+    edges = np.concatenate([triangles[:, [k, (k + 1) % 3]] for k in range(3)])
+    faces = np.tile(np.arange(len(triangles)), 3)
+
+    _, inverse, counts = np.unique(np.sort(edges, axis=1), axis=0, return_inverse=True, return_counts=True)
+    open_ = counts[inverse.ravel()] == 1
+
+    edges, faces = edges[open_], faces[open_]
+    directions = positions[edges[:, 1]] - positions[edges[:, 0]]
+    edge_lengths = np.linalg.norm(directions, axis=1)
+
+    border_normals = np.cross(directions, normals[faces])
+    border_lengths = np.linalg.norm(border_normals, axis=1)
+    border_normals /= np.where(border_lengths > 0, border_lengths, 1.0)[:, None]
+    border_offsets = -np.einsum('ij,ij->i', border_normals, positions[edges[:, 0]])
+
+    border_quadrics = _plane_quadrics(border_normals, border_offsets, boundary_weight * edge_lengths ** 2)
+    np.add.at(quadrics, edges[:, 0], border_quadrics)
+    np.add.at(quadrics, edges[:, 1], border_quadrics)
+
+    return quadrics
+
+
+def quadric_decimate(positions, triangles, target_count: int, max_error: Optional[float] = None,
+                     boundary_weight: float = BOUNDARY_WEIGHT) -> np.ndarray:
+    """ Reduce (M, 3) triangles over (N, 3) positions to at most target_count triangles with quadric error metrics.
+
+    Vertices are collapsed onto neighbouring vertices (half-edge collapses), so the result only references
+    existing vertices and keeps their attributes. Every pass accepts the cheapest collapse of each
+    neighbourhood, so that no triangle is changed by two collapses at once, and rejects collapses flipping
+    a triangle. Open edges are weighted by boundary_weight to keep borders and seams in place.
+    Decimation stops early if no collapse with an error below max_error (squared distance) is left.
+
+    Returns the (K, 3) remaining triangles, in their original order.
+    """
+
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+    n_vertices = len(positions)
+    target_count = max(int(target_count), 0)
+
+    if len(triangles) <= target_count or not n_vertices:
+        return triangles
+
+    quadrics = _vertex_quadrics(positions, triangles, boundary_weight)
+    homogeneous = np.concatenate((positions, np.ones((n_vertices, 1))), axis=1)
+    blocked = np.empty(0, dtype=np.int64)      # rejected collapses, as source * n_vertices + target
+
+    while len(triangles) > target_count:
+        n_triangles = len(triangles)
+
+        # cost of moving each edge source onto the edge target
+        sources = triangles.ravel()
+        targets = triangles[:, [1, 2, 0, 2, 0, 1]].reshape(-1, 2)
+        sources, targets = np.repeat(sources, 2), targets.ravel()
+
+        keys = sources * n_vertices + targets
+        keys, unique_index = np.unique(keys, return_index=True)
+        sources, targets = sources[unique_index], targets[unique_index]
+
+        allowed = ~np.isin(keys, blocked)
+        sources, targets = sources[allowed], targets[allowed]
+
+        q = quadrics[sources] + quadrics[targets]
+        v = homogeneous[targets]
+        costs = np.einsum('ni,nij,nj->n', v, q, v)
+
+        if max_error is not None:
+            below = costs <= max_error
+            sources, targets, costs = sources[below], targets[below], costs[below]
+
+        if not len(sources):
+            break
+
+        # cheapest collapse of each source vertex
+        order = np.lexsort((targets, costs, sources))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sources[order[1:]] != sources[order[:-1]]
+        best = order[first]
+
+        vertex_cost = np.full(n_vertices, np.inf)
+        vertex_target = np.full(n_vertices, -1, dtype=np.int64)
+        vertex_cost[sources[best]] = costs[best]
+        vertex_target[sources[best]] = targets[best]
+
+        # rank collapses by cost, ties broken by vertex index, and accept local minima over incident triangles
+        ranked = np.argsort(vertex_cost, kind='stable')
+        rank = np.empty(n_vertices, dtype=np.int64)
+        rank[ranked] = np.arange(n_vertices)
+        rank[np.isinf(vertex_cost)] = n_vertices
+
+        triangle_rank = rank[triangles].min(axis=1)
+        ring_rank = np.full(n_vertices, n_vertices, dtype=np.int64)
+        for k in range(3):
+            np.minimum.at(ring_rank, triangles[:, k], triangle_rank)
+
+        accepted = (rank < n_vertices) & (rank == ring_rank)
+
+        # reject collapses flipping one of the triangles kept around their source
+        corner = np.argmax(accepted[triangles], axis=1)
+        touched = accepted[triangles].any(axis=1)
+
+        rows = np.flatnonzero(touched)
+        source = triangles[rows, corner[rows]]
+        target = vertex_target[source]
+        degenerate = (triangles[rows] == target[:, None]).any(axis=1)
+
+        moved = triangles[rows].copy()
+        moved[np.arange(len(rows)), corner[rows]] = target
+
+        old_normals, _, old_areas = _face_planes(positions, triangles[rows])
+        new_normals, _, new_areas = _face_planes(positions, moved)
+        flipped = ~degenerate & (old_areas > 0.0) \
+            & ((np.einsum('ij,ij->i', old_normals, new_normals) <= 0.0) | (new_areas <= 0.0))
+
+        rejected = np.zeros(n_vertices, dtype=bool)
+        rejected[source[flipped]] = True
+        blocked = np.union1d(blocked, np.flatnonzero(rejected) * n_vertices + vertex_target[rejected])
+        accepted &= ~rejected
+
+        if not accepted.any():
+            continue
+
+        # do not remove more triangles than needed: keep the cheapest collapses
+        removed = np.zeros(n_vertices, dtype=np.int64)
+        np.add.at(removed, source[degenerate & accepted[source]], 1)
+
+        candidates = np.flatnonzero(accepted)
+        candidates = candidates[np.argsort(rank[candidates])]
+        excess = n_triangles - target_count
+        n_accepted = int(np.searchsorted(np.cumsum(removed[candidates]), excess)) + 1
+        accepted[candidates[n_accepted:]] = False
+
+        # apply the collapses, dropping triangles which became degenerate
+        remap = np.arange(n_vertices)
+        remap[accepted] = vertex_target[accepted]
+        np.add.at(quadrics, vertex_target[accepted], quadrics[accepted])
+
+        triangles = remap[triangles]
+        valid = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) \
+            & (triangles[:, 2] != triangles[:, 0])
+        triangles = triangles[valid]
+
+    return triangles
+
+
+def _bone_influences(vertices: np.ndarray) -> int:
+    return max(int(np.count_nonzero(vertices['bone_weights'], axis=1).max(initial=0)), 1)
+
+
+def generate_lod_skin(m2, ratio: float, max_error: Optional[float] = None, source: int = 0) -> M2SkinProfile:
+    """ Build a reduced copy of a skin profile of an M2 model, keeping about ratio of the triangles of each submesh.
+
+    Submeshes, texture units, shadow batches and bone partitions (bone lookup ranges and counts) of the source
+    skin are kept as they are, only vertex and triangle ranges of submeshes change. Each submesh keeps at least
+    one triangle.
+    """
+
+    root = m2.root
+
+    with m2.context.activate():
+        skin = m2.skins[source]
+
+        vertex_indices = as_numpy(skin.vertex_indices.values, uint16).astype(np.int64)
+        triangle_indices = as_numpy(skin.triangle_indices.values, uint16).astype(np.int64)
+        bone_indices = as_numpy(skin.bone_indices.values, Array << (uint8, 4))
+        vertices = as_numpy(root.vertices.values, M2Vertex)
+
+        positions = vertices['pos'][vertex_indices]
+
+        lod = M2SkinProfile()
+        if hasattr(skin, 'magic'):
+            lod.magic = skin.magic
+
+        lod_vertex_indices = []
+        lod_triangle_indices = []
+        n_vertices = n_indices = 0
+
+        for submesh in skin.submeshes:
+            triangles = triangle_indices[submesh.index_start:submesh.index_start + submesh.index_count].reshape(-1, 3)
+
+            if len(triangles):
+                target_count = max(int(round(len(triangles) * ratio)), 1)
+                triangles = quadric_decimate(positions, triangles, target_count, max_error)
+
+            # renumber the vertices still in use, in their original order
+            used, local_triangles = np.unique(triangles, return_inverse=True)
+
+            lod_submesh = copy.copy(submesh)
+            lod_submesh.vertex_start = n_vertices
+            lod_submesh.vertex_count = len(used)
+            lod_submesh.index_start = n_indices
+            lod_submesh.index_count = triangles.size
+
+            if len(used):
+                lod_submesh.bone_influences = min(submesh.bone_influences,
+                                                  _bone_influences(vertices[vertex_indices[used]]))
+
+            lod_vertex_indices.append(used)
+            lod_triangle_indices.append(local_triangles.ravel() + n_vertices)
+            lod.submeshes.append(lod_submesh)
+
+            n_vertices += len(used)
+            n_indices += triangles.size
+
+        used = np.concatenate(lod_vertex_indices) if lod_vertex_indices else np.empty(0, dtype=np.int64)
+
+        lod.vertex_indices.values = vertex_indices[used].astype(np.uint16)
+        lod.bone_indices.values = bone_indices[used]
+        lod.triangle_indices.values = np.concatenate(lod_triangle_indices).astype(np.uint16) \
+            if lod_triangle_indices else np.empty(0, dtype=np.uint16)
+
+        # outside of NumPy mode arrays hold lists of values, as if they were read from a file
+        if not m2.context.numpy_arrays:
+            lod.vertex_indices._as_list()
+            lod.bone_indices._as_list()
+            lod.triangle_indices._as_list()
+
+        lod.texture_units.values = [copy.copy(texture_unit) for texture_unit in skin.texture_units]
+        lod.bone_count_max = skin.bone_count_max
+
+        if m2.version >= M2Versions.CATA:
+            lod.shadow_batches.values = [copy.copy(batch) for batch in skin.shadow_batches]
+
+    return lod
+
+
+def generate_lod_skins(m2, ratios: Iterable[float] = (0.5, 0.25), max_error: Optional[float] = None,
+                       source: int = 0) -> List[M2SkinProfile]:
+    """ Append reduced skin profiles built from a skin of an M2 model (skin 0 by default), one per triangle ratio.
+
+    The skin profile count of the header is updated, generated skins are written as the following .skin files.
+    Chunked models (SFID) need file data ids for the new skins to be assigned by the caller.
+    """
+
+    lods = [generate_lod_skin(m2, ratio, max_error, source) for ratio in ratios]
+    m2.skins.extend(lods)
+
+    if m2.version >= M2Versions.WOTLK:
+        m2.root.num_skin_profiles = len(m2.skins)
+
+    return lods
@@ -0,0 +1,341 @@
+import numpy as np
+
+from typing import Dict, List, Tuple
+
+from ..file_formats.m2_format import M2CompQuaternion, M2SequenceFlags
+from ..file_formats.wow_common_types import M2Versions, as_numpy
+from ..io_utils.types import uint32, quat
+
+
+class M2Interpolation:
+    NONE = 0
+    LINEAR = 1
+    BEZIER = 2
+    HERMITE = 3
+
+
+def quaternion_to_matrix(q: np.ndarray) -> np.ndarray:
+    """ Convert (N, 4) (w, x, y, z) quaternions to (N, 3, 3) rotation matrices. """
+
+    q = q / np.maximum(np.linalg.norm(q, axis=-1, keepdims=True), 1e-12)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+
+    m = np.empty(q.shape[:-1] + (3, 3))
+    m[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    m[..., 0, 1] = 2 * (x * y - z * w)
+    m[..., 0, 2] = 2 * (x * z + y * w)
+    m[..., 1, 0] = 2 * (x * y + z * w)
+    m[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    m[..., 1, 2] = 2 * (y * z - x * w)
+    m[..., 2, 0] = 2 * (x * z - y * w)
+    m[..., 2, 1] = 2 * (y * z + x * w)
+    m[..., 2, 2] = 1 - 2 * (x * x + y * y)
+
+    return m
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """ Spherical linear interpolation of (N, 4) quaternions along the shortest arc. """
+
+    dot = np.sum(q0 * q1, axis=-1)
+    q1 = np.where((dot < 0)[:, None], -q1, q1)
+    dot = np.abs(dot)
+
+    # fall back to normalized lerp for nearly identical rotations
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    small = sin_theta < 1e-6
+    safe_sin = np.where(small, 1.0, sin_theta)
+
+    w0 = np.where(small, 1.0 - t, np.sin((1.0 - t) * theta) / safe_sin)
+    w1 = np.where(small, t, np.sin(t * theta) / safe_sin)
+
+    q = w0[:, None] * q0 + w1[:, None] * q1
+    return q / np.maximum(np.linalg.norm(q, axis=-1, keepdims=True), 1e-12)
+
+
+class M2PoseEvaluator:
+    """ Samples bone animation of an M2 model and computes world-space bone matrices.
+
+    Tracks are evaluated for a whole array of times at once: keys are located with searchsorted and
+    interpolated with step, linear / slerp, Bezier or Hermite interpolation. Bones are processed in a
+    precomputed topological order so every parent is resolved before its children.
+
+    A world matrix includes the bone pivot, so a bind-pose vertex is skinned as `sum(weight * world[bone] @ v)`.
+    Sequences stored in .anim files need to be loaded with M2File.read_additional_files() first,
+    tracks without keys evaluate to their rest value.
+    """
+
+    default_values = {'translation': (0.0, 0.0, 0.0), 'rotation': (1.0, 0.0, 0.0, 0.0), 'scale': (1.0, 1.0, 1.0)}
+    track_names = ('translation', 'rotation', 'scale')
+
+    def __init__(self, m2):
+        self.m2 = m2
+        self.version = m2.version
+        self.bones = m2.root.bones
+        self.sequences = m2.root.sequences
+        self.global_sequences = np.array([int(duration) for duration in m2.root.global_sequences], dtype=np.float64)
+
+        self.pivots = np.array([bone.pivot for bone in self.bones], dtype=np.float64).reshape(-1, 3)
+        self.bone_order, self.parents = self._topological_order([bone.parent_bone for bone in self.bones])
+
+        # global sequence of each (bone index, track name), -1 for tracks animated per sequence
+        self.track_global_sequences = {(i, name): getattr(bone, name).global_sequence
+                                       for i, bone in enumerate(self.bones) for name in self.track_names}
+
+        # sequence data used for sampling: aliased sequence, start timestamp (before WotLK) and duration
+        self.sequence_aliases = [sequence.alias_next if sequence.flags & M2SequenceFlags.is_alias else i
+                                 for i, sequence in enumerate(self.sequences)]
+
+        if self.version < M2Versions.WOTLK:
+            self.sequence_starts = [sequence.start_timestamp for sequence in self.sequences]
+            self.sequence_durations = [sequence.end_timestamp - sequence.start_timestamp
+                                       for sequence in self.sequences]
+        else:
+            self.sequence_starts = [0] * len(self.sequences)
+            self.sequence_durations = [sequence.duration for sequence in self.sequences]
+
+        # decoded keys per (bone index, track name, sequence index)
+        self._keys: Dict[Tuple[int, str, int], Tuple[np.ndarray, np.ndarray, int]] = {}
+
+    def __getstate__(self):
+        """ Pickle the evaluator without the model, e.g. to send it to worker processes.
+            Keys of all tracks are decoded first, an unpickled evaluator never reads from the model.
+        """
+
+        for sequence_index in set(self.resolve_sequence(i) for i in range(len(self.sequence_aliases))):
+            for bone_index in range(len(self.parents)):
+                for track_name in self.track_names:
+                    self.track_keys(bone_index, track_name, sequence_index)
+
+        state = self.__dict__.copy()
+        state['m2'] = state['bones'] = state['sequences'] = None
+
+        return state
+
+    @staticmethod
+    def _topological_order(parents) -> Tuple[List[int], np.ndarray]:
+        """ Order bones so that parents always precede their children. Invalid or cyclic parents are treated as roots.
+            Returns the order and a copy of the parent indices with the parents of these roots set to -1.
+        """
+
+        parents = np.array(parents, dtype=np.int64)
+        n_bones = len(parents)
+        children = [[] for _ in range(n_bones)]
+        roots = []
+
+        for i, parent in enumerate(parents):
+            if 0 <= parent < n_bones and parent != i:
+                children[parent].append(i)
+            else:
+                parents[i] = -1
+                roots.append(i)
+
+        order = []
+        visited = np.zeros(n_bones, dtype=bool)
+        stack = roots[::-1]
+
+        while True:
+            while stack:
+                i = stack.pop()
+                if visited[i]:
+                    continue
+
+                visited[i] = True
+                order.append(i)
+                stack.extend(reversed(children[i]))
+
+            if len(order) == n_bones:
+                break
+
+            # bones caught in a parent cycle, break it at the first unvisited bone
+            root = int(np.flatnonzero(~visited)[0])
+            parents[root] = -1
+            stack.append(root)
+
+        return order, parents
+
+    def resolve_sequence(self, sequence_index: int) -> int:
+        """ Follow alias_next of aliased sequences to the sequence holding the animation data. """
+
+        for _ in range(len(self.sequence_aliases)):
+            alias = self.sequence_aliases[sequence_index]
+            if alias == sequence_index:
+                break
+
+            sequence_index = alias
+
+        return sequence_index
+
+    def sequence_duration(self, sequence_index: int) -> int:
+        """ Get the duration of a sequence in milliseconds, aliases resolved. """
+        return self.sequence_durations[self.resolve_sequence(sequence_index)]
+
+    def track_keys(self, bone_index: int, track_name: str, sequence_index: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """ Get timestamps, float values and interpolation type of a bone track for a sequence.
+            Values of spline tracks have shape (N, 3, C) holding value, in tangent and out tangent of each key.
+        """
+
+        key = (bone_index, track_name, sequence_index)
+        keys = self._keys.get(key)
+        if keys is not None:
+            return keys
+
+        track = getattr(self.bones[bone_index], track_name)
+        n_components = 4 if track_name == 'rotation' else 3
+
+        with self.m2.context.activate():
+            if self.version >= M2Versions.WOTLK:
+                index = 0 if track.global_sequence >= 0 else sequence_index
+
+                if index < len(track.timestamps):
+                    timestamps, values = track.get_sequence(index)
+                else:
+                    timestamps, values = np.empty(0, dtype=np.uint32), None
+
+            else:
+                timestamps = as_numpy(track.timestamps.values, uint32)
+                values = as_numpy(track.values.values, track.value_type)
+
+                if track.global_sequence < 0:
+                    if sequence_index < len(track.interpolation_ranges):
+                        key_range = track.interpolation_ranges[sequence_index]
+                        key_slice = slice(key_range.minimum, key_range.maximum + 1)
+                    else:
+                        key_slice = slice(0, 0)
+
+                    is_spline = track.interpolation_type >= M2Interpolation.BEZIER \
+                        and len(values) == len(timestamps) * 3
+                    timestamps = timestamps[key_slice]
+                    values = values[key_slice.start * 3:key_slice.stop * 3] if is_spline else values[key_slice]
+
+        n_keys = len(timestamps)
+        if not n_keys or values is None or not len(values):
+            keys = (np.empty(0), np.empty((0, n_components)), M2Interpolation.NONE)
+            self._keys[key] = keys
+            return keys
+
+        if track.value_type is M2CompQuaternion:
+            values = M2CompQuaternion.decompress(values)
+        elif track.value_type is quat:
+            # uncompressed quaternions are stored as (x, y, z, w)
+            values = np.asarray(values).reshape(-1, 4)[:, [3, 0, 1, 2]]
+
+        values = np.asarray(values, dtype=np.float64).reshape(-1, n_components)
+        interpolation = track.interpolation_type
+
+        if interpolation >= M2Interpolation.BEZIER:
+            if len(values) == n_keys * 3:
+                values = values.reshape(n_keys, 3, n_components)
+            else:
+                interpolation = M2Interpolation.LINEAR
+
+        keys = (np.asarray(timestamps, dtype=np.float64), values[:n_keys] if values.ndim == 2 else values,
+                interpolation)
+        self._keys[key] = keys
+
+        return keys
+
+    def _track_times(self, bone_index: int, track_name: str, sequence_index: int, times: np.ndarray) -> np.ndarray:
+        """ Map times relative to the sequence start to track timestamps. """
+
+        global_sequence = self.track_global_sequences[bone_index, track_name]
+
+        if global_sequence >= 0:
+            duration = self.global_sequences[global_sequence] if global_sequence < len(self.global_sequences) else 0.0
+            return np.mod(times, duration) if duration > 0 else np.zeros_like(times)
+
+        return times + self.sequence_starts[sequence_index]
+
+    def sample_track(self, bone_index: int, track_name: str, sequence_index: int, times) -> np.ndarray:
+        """ Sample the translation, rotation or scale track of a bone at times (ms) relative to the sequence start.
+            Returns (T, 3) vectors or (T, 4) (w, x, y, z) quaternions.
+        """
+
+        times = np.asarray(times, dtype=np.float64).ravel()
+        sequence_index = self.resolve_sequence(sequence_index)
+        timestamps, values, interpolation = self.track_keys(bone_index, track_name, sequence_index)
+        n_keys = len(timestamps)
+
+        if not n_keys:
+            return np.tile(np.array(self.default_values[track_name], dtype=np.float64), (len(times), 1))
+
+        key_values = values[:, 0] if values.ndim == 3 else values
+        times = self._track_times(bone_index, track_name, sequence_index, times)
+
+        if n_keys == 1 or interpolation == M2Interpolation.NONE:
+            index = np.clip(np.searchsorted(timestamps, times, side='right') - 1, 0, n_keys - 1)
+            return key_values[index]
+
+        i0 = np.clip(np.searchsorted(timestamps, times, side='right') - 1, 0, n_keys - 2)
+        i1 = i0 + 1
+
+        span = timestamps[i1] - timestamps[i0]
+        t = np.clip((times - timestamps[i0]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+
+        if interpolation == M2Interpolation.LINEAR:
+            if track_name == 'rotation':
+                return slerp(key_values[i0], key_values[i1], t)
+
+            return key_values[i0] + (key_values[i1] - key_values[i0]) * t[:, None]
+
+        # spline keys: (value, in tangent, out tangent)
+        p0, out_tan, in_tan, p1 = values[i0, 0], values[i0, 2], values[i1, 1], values[i1, 0]
+        t2 = t * t
+        t3 = t2 * t
+
+        if interpolation == M2Interpolation.BEZIER:
+            it = 1.0 - t
+            weights = (it * it * it, 3.0 * it * it * t, 3.0 * it * t2, t3)
+        else:
+            weights = (2.0 * t3 - 3.0 * t2 + 1.0, t3 - 2.0 * t2 + t, t3 - t2, -2.0 * t3 + 3.0 * t2)
+
+        result = weights[0][:, None] * p0 + weights[1][:, None] * out_tan \
+            + weights[2][:, None] * in_tan + weights[3][:, None] * p1
+
+        if track_name == 'rotation':
+            result /= np.maximum(np.linalg.norm(result, axis=-1, keepdims=True), 1e-12)
+
+        return result
+
+    def local_matrices(self, bone_index: int, sequence_index: int, times) -> np.ndarray:
+        """ Get (T, 4, 4) bone matrices relative to the parent bone: T(pivot) * T * R * S * T(-pivot). """
+
+        times = np.asarray(times, dtype=np.float64).ravel()
+
+        translation = self.sample_track(bone_index, 'translation', sequence_index, times)
+        rotation = self.sample_track(bone_index, 'rotation', sequence_index, times)
+        scale = self.sample_track(bone_index, 'scale', sequence_index, times)
+        pivot = self.pivots[bone_index]
+
+        rs = quaternion_to_matrix(rotation) * scale[:, None, :]
+
+        matrices = np.zeros((len(times), 4, 4))
+        matrices[:, :3, :3] = rs
+        matrices[:, :3, 3] = pivot + translation - rs @ pivot
+        matrices[:, 3, 3] = 1.0
+
+        return matrices
+
+    def evaluate(self, sequence_index: int, times) -> np.ndarray:
+        """ Get world-space matrices of all bones at times (ms) relative to the sequence start, shape (T, B, 4, 4). """
+
+        times = np.asarray(times, dtype=np.float64).ravel()
+        world = np.empty((len(times), len(self.parents), 4, 4))
+
+        for bone_index in self.bone_order:
+            local = self.local_matrices(bone_index, sequence_index, times)
+            parent = self.parents[bone_index]
+            world[:, bone_index] = local if parent < 0 else world[:, parent] @ local
+
+        return world
+
+    def evaluate_frames(self, sequence_index: int, fps: float = 30.0) -> Tuple[np.ndarray, np.ndarray]:
+        """ Sample a whole sequence at a fixed frame rate. Returns times and world matrices. """
+
+        duration = self.sequence_duration(sequence_index)
+
+        n_frames = max(int(np.ceil(duration * fps / 1000.0)), 0) + 1
+        times = np.linspace(0.0, duration, n_frames)
+
+        return times, self.evaluate(sequence_index, times)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+import sys
+import platform
+import argparse
+from setuptools import setup, Extension
+
+# build requirements are listed in requirements-build.txt at the repository root
+import numpy
+from Cython.Build import cythonize
+
+
+def print_error(*s: str):
+    print("\033[91m {}\033[00m".format(' '.join(s)))
+
+
+def print_succes(*s: str):
+    print("\033[92m {}\033[00m".format(' '.join(s)))
+
+
+def print_info(*s: str):
+    print("\033[93m {}\033[00m".format(' '.join(s)))
+
+
+def main(debug: bool):
+
+    print_info("\nBuilding vertex_cache extension...")
+    print(f'Target mode: {"Debug" if debug else "Release"}')
+
+    # compiler and linker settings
+    if platform.system() == 'Windows':
+        if debug:
+            extra_compile_args = ['/Zi']
+            extra_link_args = ['/DEBUG:FULL']
+        else:
+            extra_compile_args = ['/O2']
+            extra_link_args = []
+    else:
+        if debug:
+            extra_compile_args = ['-O0', '-g']
+            extra_link_args = []
+        else:
+            extra_compile_args = ['-O3']
+            extra_link_args = []
+
+    extensions = [Extension(
+        "vertex_cache",
+        sources=["vertex_cache.pyx"],
+        include_dirs=[numpy.get_include()],
+        define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")],
+        extra_compile_args=extra_compile_args,
+        extra_link_args=extra_link_args
+    )]
+
+    for e in extensions:
+        e.cython_directives = {'language_level': "3"}
+
+    setup(
+        name='Vertex Cache Optimizer',
+        ext_modules=cythonize(extensions),
+        requires=['Cython', 'numpy']
+    )
+
+    print_succes("\nSuccessfully built vertex_cache extension.")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wbs_debug', action='store_true', help='Compile vertex_cache extension in debug mode.')
+    args, unknown = parser.parse_known_args()
+
+    if args.wbs_debug:
+        sys.argv.remove('--wbs_debug')
+
+    main(args.wbs_debug)
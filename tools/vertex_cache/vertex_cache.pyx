@@ -0,0 +1,137 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
+
+import numpy as np
+
+from libc.stdlib cimport malloc, free
+from libc.string cimport memmove
+
+
+def optimize_vertex_cache(const long long[:, ::1] triangles, Py_ssize_t n_vertices, int cache_size,
+                          const double[:, ::1] table):
+    """ Forsyth's vertex cache optimisation of tools.m2_index_optimizer.optimize_vertex_cache(), same order. """
+
+    cdef Py_ssize_t n_triangles = triangles.shape[0]
+    cdef Py_ssize_t max_valence = table.shape[1] - 1
+
+    order = np.empty(n_triangles, dtype=np.int64)
+    restarts = np.empty(n_triangles, dtype=np.bool_)
+    cdef long long[::1] order_view = order
+    cdef char[::1] restarts_view = restarts.view(np.int8)
+
+    cdef Py_ssize_t *offsets = <Py_ssize_t *> malloc((n_vertices + 1) * sizeof(Py_ssize_t))
+    cdef Py_ssize_t *live = <Py_ssize_t *> malloc(n_vertices * sizeof(Py_ssize_t))
+    cdef Py_ssize_t *vertex_triangles = <Py_ssize_t *> malloc(3 * n_triangles * sizeof(Py_ssize_t))
+    cdef double *vertex_score = <double *> malloc(n_vertices * sizeof(double))
+    cdef char *added = <char *> malloc(n_triangles)
+    cdef Py_ssize_t *cache = <Py_ssize_t *> malloc((cache_size + 3) * sizeof(Py_ssize_t))
+    cdef Py_ssize_t *new_cache = <Py_ssize_t *> malloc((cache_size + 3) * sizeof(Py_ssize_t))
+
+    cdef Py_ssize_t i, j, k, v, t, start, n_cache = 0, n_new, best, cursor = 0
+    cdef double score, best_score
+    cdef bint restart, in_triangle
+
+    try:
+        if not (offsets and live and vertex_triangles and vertex_score and added and cache and new_cache):
+            raise MemoryError()
+
+        # triangles of each vertex, in triangle order
+        for v in range(n_vertices + 1):
+            offsets[v] = 0
+
+        for t in range(n_triangles):
+            for k in range(3):
+                offsets[triangles[t, k] + 1] += 1
+
+        for v in range(n_vertices):
+            offsets[v + 1] += offsets[v]
+            live[v] = 0
+
+        for t in range(n_triangles):
+            for k in range(3):
+                v = triangles[t, k]
+                vertex_triangles[offsets[v] + live[v]] = t
+                live[v] += 1
+
+        for v in range(n_vertices):
+            vertex_score[v] = table[0, min(live[v], max_valence)]
+
+        best, best_score = 0, -1.0
+        for t in range(n_triangles):
+            added[t] = False
+            score = vertex_score[triangles[t, 0]] + vertex_score[triangles[t, 1]] + vertex_score[triangles[t, 2]]
+
+            if score > best_score or t == 0:
+                best, best_score = t, score
+
+        for i in range(n_triangles):
+            if best < 0:
+                # no candidate around the cache, continue with the next triangle not emitted yet
+                while added[cursor]:
+                    cursor += 1
+                best = cursor
+
+            added[best] = True
+            order_view[i] = best
+
+            restart = True
+            for k in range(3):
+                v = triangles[best, k]
+                for j in range(n_cache):
+                    if cache[j] == v:
+                        restart = False
+
+                # remove the triangle from the live triangles of its vertices, keeping their order
+                start = offsets[v]
+                for j in range(live[v]):
+                    if vertex_triangles[start + j] == best:
+                        memmove(&vertex_triangles[start + j], &vertex_triangles[start + j + 1],
+                                (live[v] - j - 1) * sizeof(Py_ssize_t))
+                        break
+                live[v] -= 1
+
+            restarts_view[i] = restart
+
+            # the triangle moves to the front of the cache
+            for k in range(3):
+                new_cache[k] = triangles[best, k]
+            n_new = 3
+
+            for j in range(n_cache):
+                v = cache[j]
+                in_triangle = v == new_cache[0] or v == new_cache[1] or v == new_cache[2]
+                if not in_triangle:
+                    new_cache[n_new] = v
+                    n_new += 1
+
+            for j in range(min(n_new, cache_size)):
+                v = new_cache[j]
+                vertex_score[v] = table[j + 1, min(live[v], max_valence)]
+
+            for j in range(cache_size, n_new):
+                v = new_cache[j]
+                vertex_score[v] = table[0, min(live[v], max_valence)]
+
+            n_cache = min(n_new, cache_size)
+            cache, new_cache = new_cache, cache
+
+            best, best_score = -1, -1.0
+            for j in range(n_cache):
+                v = cache[j]
+                for k in range(offsets[v], offsets[v] + live[v]):
+                    t = vertex_triangles[k]
+                    score = vertex_score[triangles[t, 0]] + vertex_score[triangles[t, 1]] \
+                        + vertex_score[triangles[t, 2]]
+
+                    if score > best_score:
+                        best, best_score = t, score
+
+    finally:
+        free(offsets)
+        free(live)
+        free(vertex_triangles)
+        free(vertex_score)
+        free(added)
+        free(cache)
+        free(new_cache)
+
+    return order, restarts
@@ -1,4 +1,4 @@
-from ..io_utils.types import uint32
+from ..io_utils.types import uint32, ByteCursor
 from .. import WoWVersionManager, WoWVersions
 
 
@@ -6,6 +6,10 @@ class DBCString:
     @staticmethod
     def read(f, str_block_ofs):
         ofs = uint32.read(f)
+
+        if f.__class__ is ByteCursor:
+            return f.cstring(ofs + str_block_ofs).decode('utf-8') if ofs else ''
+
         pos = f.tell()
         f.seek(ofs + str_block_ofs)
 
@@ -5,13 +5,15 @@ from .file_formats import wmo_format_root
 from .file_formats.wmo_format_root import *
 from .file_formats import wmo_format_group
 from .file_formats.wmo_format_group import *
+from .io_utils.types import ByteCursor
 
 
 class WMOFile:
 
-    def __init__(self, version, filepath=None):
+    def __init__(self, version, filepath=None, use_mmap=False):
         self.version = version
         self.filepath = filepath
+        self.use_mmap = use_mmap
         self.display_name = os.path.basename(os.path.splitext(filepath)[0])
         self.groups : List[WMOGroupFile] = []
         self.export = True
@@ -51,67 +53,67 @@ class WMOFile:
                 if not os.path.isfile(group_path):
                     raise FileNotFoundError("\nNot all referenced WMO groups are present in the directory.\a")
 
-                group = WMOGroupFile(self.version, self, filepath=group_path)
+                group = WMOGroupFile(self.version, self, filepath=group_path, use_mmap=self.use_mmap)
                 group.read()
                 self.groups.append(group)
 
     def read_chunks(self):
-        with open(self.filepath, 'rb') as f:
+        f = ByteCursor.from_path(self.filepath, self.use_mmap)
 
-            is_root = False
+        is_root = False
 
-            while True:
-                try:
-                    magic = f.read(4).decode('utf-8')[::-1]
+        while True:
+            try:
+                magic = f.read(4).decode('utf-8')[::-1]
 
-                except EOFError:
-                    break
+            except EOFError:
+                break
 
-                except struct.error:
-                    break
+            except struct.error:
+                break
 
-                except UnicodeDecodeError:
-                    print('\nAttempted reading non-chunked data.')
-                    break
+            except UnicodeDecodeError:
+                print('\nAttempted reading non-chunked data.')
+                break
 
-                if not magic:
-                    break
+            if not magic:
+                break
 
-                if not is_root and magic == 'MOHD':
-                    is_root = True
+            if not is_root and magic == 'MOHD':
+                is_root = True
 
-                # getting the correct chunk parsing class
-                chunk = getattr(wmo_format_root, magic, None)
+            # getting the correct chunk parsing class
+            chunk = getattr(wmo_format_root, magic, None)
 
-                # skipping unknown chunks
-                if chunk is None:
-                    print("\nEncountered unknown chunk \"{}\"".format(magic))
-                    f.seek(ContentChunk().read(f).size, 1)
-                    continue
+            # skipping unknown chunks
+            if chunk is None:
+                print("\nEncountered unknown chunk \"{}\"".format(magic))
+                f.seek(ContentChunk().read(f).size, 1)
+                continue
 
-                magic_lower = magic.lower()
-                local_chunk = getattr(self, magic_lower, None)
+            magic_lower = magic.lower()
+            local_chunk = getattr(self, magic_lower, None)
 
-                if local_chunk:
-                    local_chunk.read(f)
+            if local_chunk:
+                local_chunk.read(f)
 
-                else:
-                    setattr(self, magic_lower, chunk().read(f)) \
-                        if magic != 'GFID' else setattr(self, magic_lower,
-                                                        chunk(use_lods=self.mohd.flags & MOHDFlags.UseLod,
-                                                              n_groups=self.mohd.n_groups,
-                                                              n_lods=self.mohd.n_lods).read(f))
-
-            # attempt automatically finding a root file if user tries to import the group
-            if is_root:
-                return self.mohd.n_groups
             else:
-                self.filepath = self.filepath[:-8]  # cutting away the group prefix
+                setattr(self, magic_lower, chunk().read(f)) \
+                    if magic != 'GFID' else setattr(self, magic_lower,
+                                                    chunk(use_lods=self.mohd.flags & MOHDFlags.UseLod,
+                                                          n_groups=self.mohd.n_groups,
+                                                          n_lods=self.mohd.n_lods).read(f))
+
+        # attempt automatically finding a root file if user tries to import the group
+        if is_root:
+            return self.mohd.n_groups
+        else:
+            self.filepath = self.filepath[:-8]  # cutting away the group prefix
 
-                if os.path.isfile(self.filepath):
-                    return self.read_chunks()
-                else:
-                    raise FileNotFoundError('\nError: Unable to find WMO root file or it is corrupted.')
+            if os.path.isfile(self.filepath):
+                return self.read_chunks()
+            else:
+                raise FileNotFoundError('\nError: Unable to find WMO root file or it is corrupted.')
 
     def write(self):
 
@@ -332,9 +334,10 @@ class WMOFile:
 
 class WMOGroupFile:
 
-    def __init__(self, version, root, filepath=None):
+    def __init__(self, version, root, filepath=None, use_mmap=False):
         self.version = version
         self.filepath = filepath
+        self.use_mmap = use_mmap
         self.root = root
         self.export = True
 
@@ -357,61 +360,61 @@ class WMOGroupFile:
         self.mocv2 = None
 
     def read(self):
-        with open(self.filepath, 'rb') as f:
+        f = ByteCursor.from_path(self.filepath, self.use_mmap)
 
-            is_mocv_processed = False
-            is_motv_processed = False
+        is_mocv_processed = False
+        is_motv_processed = False
 
-            while True:
-                try:
-                    magic = f.read(4).decode('utf-8')[::-1]
+        while True:
+            try:
+                magic = f.read(4).decode('utf-8')[::-1]
 
-                except EOFError:
-                    break
+            except EOFError:
+                break
 
-                except struct.error:
-                    break
+            except struct.error:
+                break
 
-                except UnicodeDecodeError:
-                    print('\nAttempted reading non-chunked data.')
-                    break
+            except UnicodeDecodeError:
+                print('\nAttempted reading non-chunked data.')
+                break
 
-                if not magic:
-                    break
+            if not magic:
+                break
 
-                # getting the correct chunk parsing class
-                chunk = getattr(wmo_format_group, magic, None)
+            # getting the correct chunk parsing class
+            chunk = getattr(wmo_format_group, magic, None)
 
-                # skipping unknown chunks
-                if chunk is None:
-                    print("\nEncountered unknown chunk \"{}\"".format(magic))
-                    f.seek(ContentChunk().read(f).size, 1)
-                    continue
+            # skipping unknown chunks
+            if chunk is None:
+                print("\nEncountered unknown chunk \"{}\"".format(magic))
+                f.seek(ContentChunk().read(f).size, 1)
+                continue
 
-                low_magic = magic.lower()
-                local_chunk = getattr(self, low_magic, None)
+            low_magic = magic.lower()
+            local_chunk = getattr(self, low_magic, None)
 
-                is_mocv = magic == 'MOCV'
-                is_motv = magic == 'MOTV'
+            is_mocv = magic == 'MOCV'
+            is_motv = magic == 'MOTV'
 
-                if local_chunk and not ((is_mocv and is_mocv_processed) or (is_motv and is_motv_processed)):
+            if local_chunk and not ((is_mocv and is_mocv_processed) or (is_motv and is_motv_processed)):
 
-                    if is_motv:
-                        is_motv_processed = True
+                if is_motv:
+                    is_motv_processed = True
 
-                    elif is_mocv:
-                        is_mocv_processed = True
+                elif is_mocv:
+                    is_mocv_processed = True
 
-                    local_chunk.read(f)
+                local_chunk.read(f)
 
-                else:
-                    local_chunk = chunk().read(f)
+            else:
+                local_chunk = chunk().read(f)
 
-                    # handle duplicate chunk reading
-                    if (is_mocv and is_mocv_processed) or (is_motv and is_motv_processed):
-                        low_magic += '2'
+                # handle duplicate chunk reading
+                if (is_mocv and is_mocv_processed) or (is_motv and is_motv_processed):
+                    low_magic += '2'
 
-                    setattr(self, low_magic, local_chunk)
+                setattr(self, low_magic, local_chunk)
 
     def write(self):
 